@@ -0,0 +1,19 @@
+-- Dashboard summaries in long format: one row per (aggregate, label).
+-- Scalar aggregates have a NULL label; position orders the rows of a chart.
+CREATE OR REPLACE TABLE AGGREGATES.ASTRONAUTS AS
+SELECT 'total_astronauts' AS aggregate, NULL::VARCHAR AS label, count(*)::DOUBLE AS value, 0 AS position
+FROM CLEANED.ASTRONAUTS
+UNION ALL
+SELECT 'average_age', NULL, avg(age), 0
+FROM CLEANED.ASTRONAUTS
+UNION ALL
+SELECT 'total_spacewalks', NULL, coalesce(sum(spacewalks_count), 0), 0
+FROM CLEANED.ASTRONAUTS
+UNION ALL
+SELECT 'unique_agencies', NULL, count(DISTINCT agency), 0
+FROM CLEANED.ASTRONAUTS
+UNION ALL
+SELECT 'agency_count', agency, count(*), row_number() OVER (ORDER BY count(*) DESC, agency)
+FROM CLEANED.ASTRONAUTS
+WHERE agency IS NOT NULL
+GROUP BY agency;
@@ -0,0 +1,8 @@
+-- Dashboard summaries in long format: one row per (aggregate, label).
+CREATE OR REPLACE TABLE AGGREGATES.NASA_DONKI AS
+SELECT 'total_alerts' AS aggregate, NULL::VARCHAR AS label, count(*)::DOUBLE AS value, 0 AS position
+FROM CLEANED.NASA_DONKI
+UNION ALL
+SELECT 'message_type_count', message_type, count(*), row_number() OVER (ORDER BY count(*) DESC, message_type)
+FROM CLEANED.NASA_DONKI
+GROUP BY message_type;
@@ -0,0 +1,53 @@
+-- Dashboard summaries in long format: one row per (aggregate, label).
+-- Radius histograms use 0.5-wide bins (planets 0-34.5 Earth radii, host stars 0-10 solar radii);
+-- empty bins are kept so charts have a continuous axis, the last bin includes its upper edge.
+CREATE OR REPLACE TABLE AGGREGATES.NASA_EXOPLANETS AS
+WITH radius_bins AS (
+    SELECT bin, bin * 0.5 AS lower_edge, (bin + 1) * 0.5 AS upper_edge
+    FROM range(69) t(bin)
+),
+planet_radius_counts AS (
+    SELECT least(floor(radius_earth_radii / 0.5), 68)::BIGINT AS bin, count(*) AS planets
+    FROM CLEANED.NASA_EXOPLANETS
+    WHERE radius_earth_radii BETWEEN 0 AND 34.5
+    GROUP BY ALL
+),
+star_radius_bins AS (
+    SELECT bin, bin * 0.5 AS lower_edge, (bin + 1) * 0.5 AS upper_edge
+    FROM range(20) t(bin)
+),
+star_radius_counts AS (
+    SELECT least(floor(star_radius_solar_radii / 0.5), 19)::BIGINT AS bin, count(*) AS planets
+    FROM CLEANED.NASA_EXOPLANETS
+    WHERE star_radius_solar_radii BETWEEN 0 AND 10
+    GROUP BY ALL
+)
+SELECT 'total_exoplanets' AS aggregate, NULL::VARCHAR AS label, count(*)::DOUBLE AS value, 0 AS position
+FROM CLEANED.NASA_EXOPLANETS
+UNION ALL
+SELECT 'average_system_distance', NULL, avg(system_distance), 0
+FROM CLEANED.NASA_EXOPLANETS
+UNION ALL
+SELECT 'unique_host_stars', NULL, count(DISTINCT host_star), 0
+FROM CLEANED.NASA_EXOPLANETS
+UNION ALL
+SELECT 'controversial_count', NULL, coalesce(sum(controversial_flag), 0), 0
+FROM CLEANED.NASA_EXOPLANETS
+UNION ALL
+SELECT 'discovery_year_count', discovery_year::VARCHAR, count(*), discovery_year
+FROM CLEANED.NASA_EXOPLANETS
+WHERE discovery_year IS NOT NULL
+GROUP BY discovery_year
+UNION ALL
+SELECT 'discovery_method_count', discovery_method, count(*), row_number() OVER (ORDER BY count(*) DESC, discovery_method)
+FROM CLEANED.NASA_EXOPLANETS
+WHERE discovery_method IS NOT NULL
+GROUP BY discovery_method
+UNION ALL
+SELECT 'radius_histogram', printf('%.1f–%.1f', lower_edge, upper_edge), coalesce(planets, 0), radius_bins.bin
+FROM radius_bins
+LEFT JOIN planet_radius_counts ON planet_radius_counts.bin = radius_bins.bin
+UNION ALL
+SELECT 'star_radius_histogram', printf('%.1f–%.1f', lower_edge, upper_edge), coalesce(planets, 0), star_radius_bins.bin
+FROM star_radius_bins
+LEFT JOIN star_radius_counts ON star_radius_counts.bin = star_radius_bins.bin;
@@ -1,4 +1,6 @@
-CREATE OR REPLACE TABLE CLEANED.ASTRONAUTS AS
+-- Applied as a diff so unchanged rows are not rewritten and the DuckLake change
+-- feed (ducklake_table_changes) only reports rows that actually changed.
+CREATE TABLE IF NOT EXISTS CLEANED.ASTRONAUTS AS
 SELECT
     id,
     name,
@@ -7,10 +9,102 @@ SELECT
     image_url,
     time_in_space,
     eva_time,
+    time_in_space_seconds,
+    eva_time_seconds,
     age,
     bio,
     wiki,
     spacewalks_count,
     url,
     thumbnail_url
-FROM STAGED.ASTRONAUTS;
\ No newline at end of file
+FROM STAGED.ASTRONAUTS
+LIMIT 0;
+
+-- tables created before these columns existed
+ALTER TABLE CLEANED.ASTRONAUTS ADD COLUMN IF NOT EXISTS time_in_space_seconds BIGINT;
+ALTER TABLE CLEANED.ASTRONAUTS ADD COLUMN IF NOT EXISTS eva_time_seconds BIGINT;
+
+-- columns are listed on both sides, so the diff does not depend on the table's column order
+BEGIN TRANSACTION;
+
+-- rows that were updated or removed in STAGED
+DELETE FROM CLEANED.ASTRONAUTS
+WHERE id IN (
+    SELECT id FROM (
+        SELECT
+            id,
+            name,
+            agency,
+            agency_abbrev,
+            image_url,
+            time_in_space,
+            eva_time,
+            time_in_space_seconds,
+            eva_time_seconds,
+            age,
+            bio,
+            wiki,
+            spacewalks_count,
+            url,
+            thumbnail_url
+        FROM CLEANED.ASTRONAUTS
+        EXCEPT
+        SELECT
+            id,
+            name,
+            agency,
+            agency_abbrev,
+            image_url,
+            time_in_space,
+            eva_time,
+            time_in_space_seconds,
+            eva_time_seconds,
+            age,
+            bio,
+            wiki,
+            spacewalks_count,
+            url,
+            thumbnail_url
+        FROM STAGED.ASTRONAUTS
+    )
+);
+
+-- updated and new rows
+INSERT INTO CLEANED.ASTRONAUTS BY NAME
+SELECT
+    id,
+    name,
+    agency,
+    agency_abbrev,
+    image_url,
+    time_in_space,
+    eva_time,
+    time_in_space_seconds,
+    eva_time_seconds,
+    age,
+    bio,
+    wiki,
+    spacewalks_count,
+    url,
+    thumbnail_url
+FROM STAGED.ASTRONAUTS
+EXCEPT
+SELECT
+    id,
+    name,
+    agency,
+    agency_abbrev,
+    image_url,
+    time_in_space,
+    eva_time,
+    time_in_space_seconds,
+    eva_time_seconds,
+    age,
+    bio,
+    wiki,
+    spacewalks_count,
+    url,
+    thumbnail_url
+FROM CLEANED.ASTRONAUTS;
+
+COMMIT;
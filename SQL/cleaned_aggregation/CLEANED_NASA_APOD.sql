@@ -1,4 +1,6 @@
-CREATE OR REPLACE TABLE CLEANED.NASA_APOD AS
+-- Applied as a diff so unchanged rows are not rewritten and the DuckLake change
+-- feed (ducklake_table_changes) only reports rows that actually changed.
+CREATE TABLE IF NOT EXISTS CLEANED.NASA_APOD AS
 SELECT
     title,
     explanation,
@@ -7,4 +9,58 @@ SELECT
     hdurl,
     thumbnail_url,
     copyright
-FROM STAGED.NASA_APOD;
\ No newline at end of file
+FROM STAGED.NASA_APOD
+LIMIT 0;
+
+-- columns are listed on both sides, so the diff does not depend on the table's column order
+BEGIN TRANSACTION;
+
+-- rows that were updated or removed in STAGED
+DELETE FROM CLEANED.NASA_APOD
+WHERE date IN (
+    SELECT date FROM (
+        SELECT
+            title,
+            explanation,
+            date,
+            url,
+            hdurl,
+            thumbnail_url,
+            copyright
+        FROM CLEANED.NASA_APOD
+        EXCEPT
+        SELECT
+            title,
+            explanation,
+            date,
+            url,
+            hdurl,
+            thumbnail_url,
+            copyright
+        FROM STAGED.NASA_APOD
+    )
+);
+
+-- updated and new rows
+INSERT INTO CLEANED.NASA_APOD BY NAME
+SELECT
+    title,
+    explanation,
+    date,
+    url,
+    hdurl,
+    thumbnail_url,
+    copyright
+FROM STAGED.NASA_APOD
+EXCEPT
+SELECT
+    title,
+    explanation,
+    date,
+    url,
+    hdurl,
+    thumbnail_url,
+    copyright
+FROM CLEANED.NASA_APOD;
+
+COMMIT;
@@ -1,7 +1,56 @@
-CREATE OR REPLACE TABLE CLEANED.NASA_DONKI AS
-SELECT
-    message_id,
+-- Same partitioning as STAGED.NASA_DONKI: message type and issue month.
+CREATE TABLE IF NOT EXISTS CLEANED.NASA_DONKI (
+    message_id VARCHAR,
+    message_type VARCHAR,
+    message_issue_timestamp TIMESTAMP,
+    message_issue_time VARCHAR,
+    message_body VARCHAR
+);
+
+-- tables created before partitioning have no timestamp column
+ALTER TABLE CLEANED.NASA_DONKI ADD COLUMN IF NOT EXISTS message_issue_timestamp TIMESTAMP;
+
+ALTER TABLE CLEANED.NASA_DONKI SET PARTITIONED BY (
     message_type,
-    message_issue_time_human_readable AS message_issue_time,
-    message_body
-FROM STAGED.NASA_DONKI;
\ No newline at end of file
+    year(message_issue_timestamp),
+    month(message_issue_timestamp)
+);
+
+-- applied as a diff, like the other CLEANED tables, so the change feed only
+-- reports messages that actually changed
+BEGIN TRANSACTION;
+
+-- messages that were updated or removed in STAGED
+DELETE FROM CLEANED.NASA_DONKI
+WHERE message_id IN (
+    SELECT message_id FROM (
+        SELECT message_id, message_type, message_issue_timestamp, message_issue_time, message_body
+        FROM CLEANED.NASA_DONKI
+        EXCEPT
+        SELECT
+            message_id,
+            message_type,
+            message_issue_timestamp,
+            message_issue_time_human_readable AS message_issue_time,
+            message_body
+        FROM STAGED.NASA_DONKI
+    )
+);
+
+-- updated and new messages
+INSERT INTO CLEANED.NASA_DONKI BY NAME
+SELECT * FROM (
+    SELECT
+        message_id,
+        message_type,
+        message_issue_timestamp,
+        message_issue_time_human_readable AS message_issue_time,
+        message_body
+    FROM STAGED.NASA_DONKI
+    EXCEPT
+    SELECT message_id, message_type, message_issue_timestamp, message_issue_time, message_body
+    FROM CLEANED.NASA_DONKI
+)
+ORDER BY message_type, message_issue_timestamp;
+
+COMMIT;
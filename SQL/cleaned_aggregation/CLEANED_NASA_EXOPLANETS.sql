@@ -1,4 +1,6 @@
-CREATE OR REPLACE TABLE CLEANED.NASA_EXOPLANETS AS
+-- Applied as a diff so unchanged rows are not rewritten and the DuckLake change
+-- feed (ducklake_table_changes) only reports rows that actually changed.
+CREATE TABLE IF NOT EXISTS CLEANED.NASA_EXOPLANETS AS
 SELECT
     planet_name,
     planet_letter,
@@ -13,4 +15,82 @@ SELECT
     radius_earth_radii,
     star_radius_solar_radii,
     orbital_semi_major_axis_in_au
-FROM STAGED.NASA_EXOPLANETS;
\ No newline at end of file
+FROM STAGED.NASA_EXOPLANETS
+LIMIT 0;
+
+-- columns are listed on both sides, so the diff does not depend on the table's column order
+BEGIN TRANSACTION;
+
+-- rows that were updated or removed in STAGED
+DELETE FROM CLEANED.NASA_EXOPLANETS
+WHERE planet_name IN (
+    SELECT planet_name FROM (
+        SELECT
+            planet_name,
+            planet_letter,
+            host_star,
+            system_distance,
+            discovery_year,
+            controversial_flag,
+            discovery_method,
+            discovery_facility,
+            discovery_instrument,
+            orbital_period_days,
+            radius_earth_radii,
+            star_radius_solar_radii,
+            orbital_semi_major_axis_in_au
+        FROM CLEANED.NASA_EXOPLANETS
+        EXCEPT
+        SELECT
+            planet_name,
+            planet_letter,
+            host_star,
+            system_distance,
+            discovery_year,
+            controversial_flag,
+            discovery_method,
+            discovery_facility,
+            discovery_instrument,
+            orbital_period_days,
+            radius_earth_radii,
+            star_radius_solar_radii,
+            orbital_semi_major_axis_in_au
+        FROM STAGED.NASA_EXOPLANETS
+    )
+);
+
+-- updated and new rows
+INSERT INTO CLEANED.NASA_EXOPLANETS BY NAME
+SELECT
+    planet_name,
+    planet_letter,
+    host_star,
+    system_distance,
+    discovery_year,
+    controversial_flag,
+    discovery_method,
+    discovery_facility,
+    discovery_instrument,
+    orbital_period_days,
+    radius_earth_radii,
+    star_radius_solar_radii,
+    orbital_semi_major_axis_in_au
+FROM STAGED.NASA_EXOPLANETS
+EXCEPT
+SELECT
+    planet_name,
+    planet_letter,
+    host_star,
+    system_distance,
+    discovery_year,
+    controversial_flag,
+    discovery_method,
+    discovery_facility,
+    discovery_instrument,
+    orbital_period_days,
+    radius_earth_radii,
+    star_radius_solar_radii,
+    orbital_semi_major_axis_in_au
+FROM CLEANED.NASA_EXOPLANETS;
+
+COMMIT;
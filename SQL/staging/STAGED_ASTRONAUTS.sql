@@ -1,12 +1,16 @@
+-- Keyed on the upstream Space Devs id, which stays stable when the API reorders or
+-- inserts astronauts; concurrently fetched pages can repeat a record, so ids are deduplicated.
 CREATE OR REPLACE TABLE STAGED.ASTRONAUTS AS
-SELECT
-    _record_id AS id,
+SELECT DISTINCT ON (id)
+    id,
     name,
     agency_name AS agency,
     agency_abbrev,
     image_url,
     time_in_space_human_readable AS time_in_space,
     eva_time_human_readable AS eva_time,
+    time_in_space_seconds,
+    eva_time_seconds,
     age,
     bio,
     wiki,
@@ -14,4 +18,6 @@ SELECT
     url,
     thumbnail_url
 FROM RAW_DATA.ASTRONAUTS
-WHERE name IS NOT NULL;
\ No newline at end of file
+WHERE id IS NOT NULL
+    AND name IS NOT NULL
+ORDER BY id, _record_id;
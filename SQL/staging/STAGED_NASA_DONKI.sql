@@ -1,11 +1,39 @@
-CREATE OR REPLACE TABLE STAGED.NASA_DONKI AS
+-- Partitioned by message type and issue month so filtered reads prune files.
+-- DuckLake applies partitioning to data written after SET PARTITIONED BY, so the
+-- table is kept (not replaced) and its rows are rewritten on every build.
+CREATE TABLE IF NOT EXISTS STAGED.NASA_DONKI (
+    message_id VARCHAR,
+    message_type VARCHAR,
+    message_issue_timestamp TIMESTAMP,
+    message_issue_time_human_readable VARCHAR,
+    message_body VARCHAR
+);
+
+-- tables created before partitioning have no timestamp column
+ALTER TABLE STAGED.NASA_DONKI ADD COLUMN IF NOT EXISTS message_issue_timestamp TIMESTAMP;
+
+ALTER TABLE STAGED.NASA_DONKI SET PARTITIONED BY (
+    message_type,
+    year(message_issue_timestamp),
+    month(message_issue_timestamp)
+);
+
+BEGIN TRANSACTION;
+
+DELETE FROM STAGED.NASA_DONKI;
+
+INSERT INTO STAGED.NASA_DONKI BY NAME
 SELECT
     messageID AS message_id,
     messageType AS message_type,
+    STRPTIME(messageIssueTime, '%Y-%m-%dT%H:%MZ') AS message_issue_timestamp,
     STRFTIME(STRPTIME(messageIssueTime, '%Y-%m-%dT%H:%MZ'), '%B %d, %Y %H:%M UTC') AS message_issue_time_human_readable,
     messageBody AS message_body
 FROM RAW_DATA.NASA_DONKI
 WHERE messageID IS NOT NULL
     AND messageType IS NOT NULL
     AND messageIssueTime IS NOT NULL
-    AND messageBody IS NOT NULL;
\ No newline at end of file
+    AND messageBody IS NOT NULL
+ORDER BY message_type, message_issue_timestamp;
+
+COMMIT;
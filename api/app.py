@@ -1,18 +1,54 @@
 import os
 import sys
 import datetime
-from fastapi import FastAPI, HTTPException, Query
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 current_path = os.path.dirname(os.path.abspath(__file__))
 parent_path = os.path.abspath(os.path.join(current_path, ".."))
 sys.path.append(parent_path)
 from src.logger import setup_logging # noqa: E402
-from api.utils import get_datasets_list, fetch_single_dataset # noqa: E402
+from api.utils import ( # noqa: E402
+    get_datasets_list,
+    fetch_single_dataset,
+    fetch_dataset_aggregates,
+    fetch_dataset_changes,
+    connection_manager,
+    catalog_poller,
+    negotiate_response_format,
+    serialize_arrow_table,
+    validate_export_request,
+    export_dataset_stream,
+    dataset_etag,
+    etag_matches,
+    DATASET_CONFIG,
+    RESPONSE_MEDIA_TYPES
+)
 
 
-app = FastAPI()
 logger = setup_logging()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if catalog_poller is not None:
+        try:
+            catalog_poller.start()
+        except Exception as e:
+            logger.error(f"Failed to fetch the published catalog, using {connection_manager.catalog_path}: {e}")
+    try:
+        connection_manager.start()
+    except Exception as e:
+        # the manager retries the attach on the first request
+        logger.error(f"Failed to start DuckLake connection manager: {e}")
+    yield
+    if catalog_poller is not None:
+        catalog_poller.stop()
+    connection_manager.close()
+
+app = FastAPI(lifespan=lifespan)
+
 origins = [
     "http://localhost:3000",
     "https://example-production-domain.com"
@@ -24,6 +60,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Snapshot-Id", "ETag"],
 )
 
 @app.get("/", tags=["Root"])
@@ -55,16 +92,155 @@ def read_datasets_list():
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
 @app.get("/datasets/{dataset_id}", tags=["Datasets"])
-async def read_dataset(
+def read_dataset(
+    request: Request,
     dataset_id: int,
     offset: int = Query(0, ge=0, description="Pagination offset (default: 0)"),
-    limit: int = Query(1000, ge=1, le=7500, description="Pagination limit (default: 1000, max: 7500)")
+    limit: int = Query(1000, ge=1, le=7500, description="Pagination limit (default: 1000, max: 7500)"),
+    cursor: str | None = Query(None, description="Opaque cursor from a previous page's X-Next-Cursor header"),
+    format: str | None = Query(None, description="Response format: json (default), arrow, parquet or ndjson"),
+    columns: str | None = Query(None, description="Comma-separated columns to return (default: all)"),
+    filter: list[str] | None = Query(
+        None,
+        description="Repeatable column:operator:value filter; operators eq, gt, gte, lt, lte, in (values separated by |)"
+    ),
+    order_by: str | None = Query(None, description="Column to sort by, prefixed with - for descending"),
+    as_of_snapshot: int | None = Query(None, ge=0, description="Read the dataset as of this DuckLake snapshot")
 ):
     try:
-        dataset = fetch_single_dataset(dataset_id, offset, limit)
-        if not dataset:
+        response_format = negotiate_response_format(format, request.headers.get("accept"))
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+    try:
+        snapshot_id = connection_manager.current_snapshot_id()
+        etag_params = (dataset_id, offset, limit, cursor, response_format, columns, filter, order_by, as_of_snapshot)
+        etag = dataset_etag(snapshot_id, *etag_params)
+        if etag_matches(etag, request.headers.get("if-none-match")):
+            return Response(status_code=304, headers={"ETag": etag})
+
+        table, next_cursor, read_snapshot_id = fetch_single_dataset(
+            dataset_id, offset, limit, cursor, snapshot_id, columns, filter, order_by, as_of_snapshot
+        )
+        # an empty filtered page is a valid answer, not a missing dataset
+        if table.num_rows == 0 and cursor is None and not filter:
             raise HTTPException(status_code=404, detail="Dataset not found")
-        return dataset
+
+        # the page may come from a catalog attached after the If-None-Match check
+        headers = {
+            "ETag": dataset_etag(read_snapshot_id, *etag_params),
+            "X-Snapshot-Id": str(as_of_snapshot if as_of_snapshot is not None else read_snapshot_id)
+        }
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+
+        if response_format == "json":
+            response = JSONResponse(content=jsonable_encoder(table.to_pylist()), headers=headers)
+        else:
+            response = Response(
+                content=serialize_arrow_table(table, response_format),
+                media_type=RESPONSE_MEDIA_TYPES[response_format],
+                headers=headers
+            )
+        return response
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching dataset {dataset_id}: {e}")
-        raise HTTPException(status_code=500, detail="Internal Server Error")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+@app.get("/datasets/{dataset_id}/changes", tags=["Datasets"])
+def read_dataset_changes(
+    request: Request,
+    dataset_id: int,
+    since_snapshot: int = Query(..., ge=0, description="Snapshot id from a previous read (its X-Snapshot-Id header)"),
+    limit: int = Query(1000, ge=1, le=7500, description="Pagination limit (default: 1000, max: 7500)"),
+    cursor: str | None = Query(None, description="Opaque cursor from a previous page's X-Next-Cursor header"),
+    format: str | None = Query(None, description="Response format: json (default), arrow, parquet or ndjson")
+):
+    try:
+        response_format = negotiate_response_format(format, request.headers.get("accept"))
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+    try:
+        snapshot_id = connection_manager.current_snapshot_id()
+        etag = dataset_etag(snapshot_id, dataset_id, "changes", since_snapshot, limit, cursor, response_format)
+        if etag_matches(etag, request.headers.get("if-none-match")):
+            return Response(status_code=304, headers={"ETag": etag})
+
+        table, next_cursor, until_snapshot = fetch_dataset_changes(dataset_id, since_snapshot, limit, cursor, snapshot_id)
+        headers = {"ETag": etag, "X-Snapshot-Id": str(until_snapshot)}
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+
+        if response_format == "json":
+            response = JSONResponse(content=jsonable_encoder(table.to_pylist()), headers=headers)
+        else:
+            response = Response(
+                content=serialize_arrow_table(table, response_format),
+                media_type=RESPONSE_MEDIA_TYPES[response_format],
+                headers=headers
+            )
+        return response
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching changes to dataset {dataset_id}: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+@app.get("/datasets/{dataset_id}/aggregates", tags=["Datasets"])
+def read_dataset_aggregates(request: Request, dataset_id: int):
+    try:
+        snapshot_id = connection_manager.current_snapshot_id()
+        etag = dataset_etag(snapshot_id, dataset_id, "aggregates")
+        if etag_matches(etag, request.headers.get("if-none-match")):
+            return Response(status_code=304, headers={"ETag": etag})
+
+        aggregates, read_snapshot_id = fetch_dataset_aggregates(dataset_id, snapshot_id)
+        response = JSONResponse(
+            content=jsonable_encoder(aggregates), headers={"ETag": dataset_etag(read_snapshot_id, dataset_id, "aggregates")}
+        )
+        return response
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching aggregates for dataset {dataset_id}: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+@app.get("/datasets/{dataset_id}/export", tags=["Datasets"])
+def export_dataset(
+    request: Request,
+    dataset_id: int,
+    format: str = Query("ndjson", description="Export format: ndjson (default) or arrow"),
+    compression: str | None = Query(None, description="Optional content encoding: gzip or zstd")
+):
+    try:
+        validate_export_request(dataset_id, format, compression)
+    except ValueError as ve:
+        logger.error(f"ValueError: {ve}")
+        raise HTTPException(status_code=400, detail=str(ve))
+
+    try:
+        snapshot_id = connection_manager.current_snapshot_id()
+        etag = dataset_etag(snapshot_id, dataset_id, "export", format, compression)
+        if etag_matches(etag, request.headers.get("if-none-match")):
+            return Response(status_code=304, headers={"ETag": etag})
+
+        dataset_name = DATASET_CONFIG[dataset_id]["table_name"].split("CLEANED.")[-1]
+        headers = {
+            "Content-Disposition": f'attachment; filename="{dataset_name}.{format}"',
+            "ETag": etag
+        }
+        if compression:
+            headers["Content-Encoding"] = compression
+
+        response = StreamingResponse(
+            export_dataset_stream(dataset_id, format, compression),
+            media_type=RESPONSE_MEDIA_TYPES[format],
+            headers=headers
+        )
+        return response
+    except Exception as e:
+        logger.error(f"Error exporting dataset {dataset_id}: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
@@ -0,0 +1,65 @@
+from src.logger import setup_logging
+from collections import OrderedDict
+import threading
+logger = setup_logging()
+
+
+class SnapshotLRUCache:
+    """
+    In-process LRU cache for query results, bounded by total size in bytes.
+
+    Entries are keyed by the DuckLake snapshot they were read from, so a result is only
+    ever served for that snapshot. Entries from older snapshots are dropped once a newer
+    snapshot is seen (db_sync has published new data); requests still reading an older
+    snapshot while the new catalog is attached do not empty the cache.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.snapshot_id = None
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, snapshot_id, key):
+        with self._lock:
+            self._roll_snapshot(snapshot_id)
+            entry = self._entries.get((snapshot_id, key))
+            if entry is None:
+                return None
+            self._entries.move_to_end((snapshot_id, key))
+            value, size_bytes = entry
+            return value
+
+    def put(self, snapshot_id, key, value, size_bytes):
+        if size_bytes > self.max_bytes:
+            logger.info(f"Result of {size_bytes} bytes exceeds cache capacity, not caching")
+            return
+
+        with self._lock:
+            self._roll_snapshot(snapshot_id)
+            entry_key = (snapshot_id, key)
+            if entry_key in self._entries:
+                self.current_bytes -= self._entries.pop(entry_key)[1]
+
+            self._entries[entry_key] = (value, size_bytes)
+            self.current_bytes += size_bytes
+
+            while self.current_bytes > self.max_bytes:
+                evicted_key, (evicted_value, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def _roll_snapshot(self, snapshot_id):
+        # caller must hold self._lock
+        if self.snapshot_id is None or snapshot_id > self.snapshot_id:
+            stale_keys = [entry_key for entry_key in self._entries if entry_key[0] != snapshot_id]
+            if stale_keys:
+                logger.info(f"Snapshot advanced to {snapshot_id}, dropping {len(stale_keys)} cached result(s)")
+            for entry_key in stale_keys:
+                self.current_bytes -= self._entries.pop(entry_key)[1]
+            self.snapshot_id = snapshot_id
@@ -0,0 +1,55 @@
+from src.catalog_sync import download_catalog_if_changed, prune_local_catalogs
+from src.logger import setup_logging
+import threading
+logger = setup_logging()
+
+
+class CatalogPoller:
+    """
+    Keeps the API's catalog in step with the latest published catalog generation.
+
+    Every interval_seconds the CURRENT pointer is fetched with a generation-match
+    precondition, which costs one small request while nothing changes. When a new
+    generation is published its catalog is downloaded and handed to the connection
+    manager, which attaches a private copy of it on the next request and retires the
+    old connection once its in-flight queries finish.
+    """
+
+    def __init__(self, connection_manager, bucket_name, local_directory, interval_seconds):
+        self.connection_manager = connection_manager
+        self.bucket_name = bucket_name
+        self.local_directory = local_directory
+        self.interval_seconds = interval_seconds
+        self.pointer_generation = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def poll(self):
+        """Check for a new catalog generation once; returns True if one was installed."""
+        download = download_catalog_if_changed(self.bucket_name, self.local_directory, self.pointer_generation)
+        if download is None:
+            return False
+
+        self.pointer_generation, catalog_path = download
+        self.connection_manager.use_catalog(catalog_path)
+        # connections attach private copies, so older downloads are not needed anymore
+        prune_local_catalogs(self.local_directory, {catalog_path})
+        return True
+
+    def start(self):
+        self.poll()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        logger.info(f"Polling for new catalog generations every {self.interval_seconds} seconds")
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval_seconds)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval_seconds):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Catalog poll failed, keeping the current catalog: {e}")
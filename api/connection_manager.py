@@ -0,0 +1,288 @@
+from src.utils import duckdb_con_init, ducklake_init, ducklake_attach_gcp
+from src.logger import setup_logging
+from contextlib import contextmanager
+import glob
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+import duckdb
+logger = setup_logging()
+
+
+def build_replica(con, replica_path, schemas, snapshot_id=None):
+    """
+    Copy every table of the given schemas from my_ducklake into a local DuckDB file.
+    Tables are read AT the given DuckLake snapshot so the replica matches it exactly
+    (None copies the current state). The file is written under a temporary name and
+    renamed into place, so a replica path never refers to a partial copy.
+    """
+    build_path = f"{replica_path}.building"
+    for stale_path in (build_path, f"{build_path}.wal"):
+        if os.path.exists(stale_path):
+            os.remove(stale_path)
+
+    at_clause = f" AT (VERSION => {int(snapshot_id)})" if snapshot_id is not None else ""
+    con.execute(f"ATTACH '{build_path}' AS replica_build")
+    try:
+        for schema_name in schemas:
+            table_names = [row[0] for row in con.execute(
+                """
+                SELECT table_name FROM information_schema.tables
+                WHERE table_catalog = 'my_ducklake' AND table_schema = ? AND table_type = 'BASE TABLE'
+                """,
+                [schema_name]
+            ).fetchall()]
+            con.execute(f"CREATE SCHEMA IF NOT EXISTS replica_build.{schema_name}")
+            for table_name in table_names:
+                con.execute(
+                    f"CREATE TABLE replica_build.{schema_name}.{table_name} AS "
+                    f"SELECT * FROM my_ducklake.{schema_name}.{table_name}{at_clause}"
+                )
+            logger.info(f"Copied {len(table_names)} {schema_name} table(s) into the local replica")
+    finally:
+        con.execute("DETACH replica_build")
+    os.replace(build_path, replica_path)
+
+
+def copy_catalog(catalog_path, attempts=3):
+    """
+    Copy the shared catalog file to a private temporary file and return its path.
+    Attaching the shared file, even READ_ONLY, holds a DuckDB file lock that stops
+    db_sync from opening it for writing. The copy is retried if the file changed
+    while it was being read.
+    """
+    copy_file, copy_path = tempfile.mkstemp(prefix="catalog-", suffix=".ducklake")
+    os.close(copy_file)
+    for attempt in range(attempts):
+        modified_before = os.stat(catalog_path).st_mtime_ns
+        shutil.copyfile(catalog_path, copy_path)
+        if os.stat(catalog_path).st_mtime_ns == modified_before:
+            return copy_path
+        logger.warning(f"Catalog {catalog_path} changed while it was copied, retrying")
+    os.remove(copy_path)
+    raise RuntimeError(f"Catalog {catalog_path} kept changing while it was copied")
+
+
+def attach_ducklake(catalog_path, data_path):
+    """Attach a DuckLake catalog READ_ONLY as my_ducklake; returns (connection, latest snapshot id)."""
+    con = duckdb_con_init()
+    ducklake_init(con, data_path, catalog_path, read_only=True)
+    ducklake_attach_gcp(con)
+    snapshot_id = con.execute("SELECT max(snapshot_id) FROM ducklake_snapshots('my_ducklake')").fetchone()[0]
+    return con, snapshot_id
+
+
+class CatalogGeneration:
+    """A single attached DuckLake connection, tied to one version of the catalog file."""
+
+    def __init__(self, connection, catalog_version, snapshot_id, replica_path=None, catalog_copy_path=None):
+        self.connection = connection
+        self.catalog_version = catalog_version
+        self.snapshot_id = snapshot_id
+        self.replica_path = replica_path
+        self.catalog_copy_path = catalog_copy_path
+        self.active_cursors = 0
+        self.retired = False
+
+    def close_if_idle(self):
+        if self.retired and self.active_cursors == 0:
+            try:
+                self.connection.close()
+                logger.info(f"Closed retired DuckLake connection for catalog version {self.catalog_version}")
+                if self.replica_path:
+                    os.remove(self.replica_path)
+                    logger.info(f"Removed retired replica {self.replica_path}")
+                if self.catalog_copy_path:
+                    os.remove(self.catalog_copy_path)
+            except Exception as e:
+                logger.warning(f"Failed to close retired DuckLake connection: {e}")
+
+
+class DuckLakeConnectionManager:
+    """
+    Keeps an attached DuckLake connection alive for the lifetime of the API process.
+    Each catalog version is attached from a private copy (see copy_catalog), so the
+    shared catalog file stays writable by db_sync.
+
+    Requests borrow cursors through cursor(), which also caps the number of queries
+    running at once. When the catalog file changes on disk or use_catalog() points at
+    a new one (a new db_sync has been published) a fresh connection is attached in the
+    background while the current one keeps serving, then swapped in; connections from
+    the previous catalog are closed once their in-flight cursors are returned.
+
+    With serving_mode="replica" each catalog version is instead copied (replica_schemas
+    only, at its latest snapshot) into a local DuckDB file that is attached as my_ducklake,
+    so requests never touch object storage.
+    """
+
+    def __init__(self, catalog_path, data_path, max_concurrent_queries=8, serving_mode="ducklake",
+                 replica_directory=None, replica_schemas=("CLEANED", "AGGREGATES"), max_concurrent_exports=2):
+        if serving_mode not in ("ducklake", "replica"):
+            raise ValueError(f"Unsupported serving mode: {serving_mode}")
+        self.catalog_path = catalog_path
+        self.data_path = data_path
+        self.max_concurrent_queries = max_concurrent_queries
+        self.serving_mode = serving_mode
+        self.replica_directory = replica_directory
+        self.replica_schemas = replica_schemas
+        self.max_concurrent_exports = max_concurrent_exports
+        self._query_slots = threading.BoundedSemaphore(max_concurrent_queries)
+        self._export_slots = threading.BoundedSemaphore(max_concurrent_exports)
+        self._lock = threading.Lock()
+        self._generation = None
+        self._refreshing_version = None
+        # a version that failed to attach is not retried until the catalog changes again
+        self._failed_version = None
+
+    def start(self):
+        if self.serving_mode == "replica":
+            os.makedirs(self.replica_directory, exist_ok=True)
+            # replicas left behind by a previous process are never reused
+            for stale_path in glob.glob(os.path.join(self.replica_directory, "replica-*.duckdb*")):
+                os.remove(stale_path)
+        with self._lock:
+            if self._generation is None:
+                self._generation = self._attach(self._catalog_version())
+        logger.info(
+            f"DuckLake connection manager started in {self.serving_mode} mode "
+            f"(max concurrent queries: {self.max_concurrent_queries}, exports: {self.max_concurrent_exports})"
+        )
+
+    def close(self):
+        with self._lock:
+            if self._generation is not None:
+                self._generation.retired = True
+                self._generation.close_if_idle()
+                self._generation = None
+        logger.info("DuckLake connection manager closed")
+
+    def current_snapshot_id(self):
+        """Latest DuckLake snapshot visible to the API; changes whenever a new catalog is attached."""
+        with self._lock:
+            generation = self._current_generation()
+            return generation.snapshot_id
+
+    @contextmanager
+    def cursor(self, export=False):
+        """
+        Borrow a cursor for one query. export=True draws from the separate export slots:
+        an export holds its cursor for the whole download, so slow clients must not use
+        up the slots that page and aggregate queries need.
+        """
+        with self.snapshot_cursor(export) as (cursor, snapshot_id):
+            yield cursor
+
+    @contextmanager
+    def snapshot_cursor(self, export=False):
+        """
+        Like cursor(), but yields (cursor, snapshot_id) where snapshot_id belongs to the
+        generation the cursor was checked out from, which may be newer than an earlier
+        current_snapshot_id().
+        """
+        query_slots = self._export_slots if export else self._query_slots
+        with query_slots:
+            generation, cursor = self._checkout()
+            try:
+                cursor.execute("USE my_ducklake")
+                yield cursor, generation.snapshot_id
+            finally:
+                cursor.close()
+                self._checkin(generation)
+
+    def use_catalog(self, catalog_path):
+        """Switch to another catalog file (e.g. a newly downloaded generation); the next request attaches it."""
+        with self._lock:
+            self.catalog_path = catalog_path
+        logger.info(f"Using DuckLake catalog {catalog_path}")
+
+    def _catalog_version(self):
+        try:
+            result = (self.catalog_path, os.stat(self.catalog_path).st_mtime_ns)
+            return result
+        except FileNotFoundError:
+            return None
+
+    def _attach(self, catalog_version):
+        # the version names the file it was read from, which use_catalog() may since have replaced
+        catalog_path = catalog_version[0] if catalog_version else self.catalog_path
+        logger.info(f"Attaching a private copy of DuckLake catalog {catalog_path}")
+        catalog_copy_path = copy_catalog(catalog_path)
+        try:
+            con, snapshot_id = attach_ducklake(catalog_copy_path, self.data_path)
+        except Exception:
+            os.remove(catalog_copy_path)
+            raise
+        logger.info(f"Attached DuckLake catalog at snapshot {snapshot_id}")
+        if self.serving_mode == "replica":
+            result = self._attach_replica(con, catalog_version, snapshot_id, catalog_copy_path)
+            return result
+        result = CatalogGeneration(con, catalog_version, snapshot_id, catalog_copy_path=catalog_copy_path)
+        return result
+
+    def _attach_replica(self, ducklake_con, catalog_version, snapshot_id, catalog_copy_path):
+        replica_path = os.path.join(self.replica_directory, f"replica-{snapshot_id}-{uuid.uuid4().hex[:12]}.duckdb")
+        try:
+            build_replica(ducklake_con, replica_path, self.replica_schemas, snapshot_id)
+        finally:
+            ducklake_con.close()
+            os.remove(catalog_copy_path)
+
+        con = duckdb.connect(":memory:")
+        con.execute(f"ATTACH '{replica_path}' AS my_ducklake (READ_ONLY)")
+        logger.info(f"Serving snapshot {snapshot_id} from local replica {replica_path}")
+        result = CatalogGeneration(con, catalog_version, snapshot_id, replica_path)
+        return result
+
+    def _current_generation(self):
+        # caller must hold self._lock; only the very first attach happens here, later
+        # catalog versions are attached in the background so requests never wait on them
+        catalog_version = self._catalog_version()
+        if self._generation is None:
+            self._generation = self._attach(catalog_version)
+        elif catalog_version != self._generation.catalog_version:
+            self._start_refresh(catalog_version)
+        return self._generation
+
+    def _swap_generation(self, new_generation):
+        # caller must hold self._lock
+        old_generation = self._generation
+        self._generation = new_generation
+        old_generation.retired = True
+        old_generation.close_if_idle()
+
+    def _start_refresh(self, catalog_version):
+        # caller must hold self._lock; the current generation keeps serving until the new one is ready
+        if self._refreshing_version is not None or catalog_version == self._failed_version:
+            return
+        logger.info("DuckLake catalog changed on disk, attaching it in the background")
+        self._refreshing_version = catalog_version
+        threading.Thread(target=self._refresh_generation, args=(catalog_version,), daemon=True).start()
+
+    def _refresh_generation(self, catalog_version):
+        try:
+            new_generation = self._attach(catalog_version)
+        except Exception as e:
+            logger.error(f"Failed to attach catalog version {catalog_version}, retrying once it changes: {e}")
+            with self._lock:
+                self._failed_version = catalog_version
+                self._refreshing_version = None
+            return
+        with self._lock:
+            self._swap_generation(new_generation)
+            self._refreshing_version = None
+            self._failed_version = None
+
+    def _checkout(self):
+        with self._lock:
+            generation = self._current_generation()
+            # DuckDB connections are not thread-safe, so cursors are handed out under the lock
+            cursor = generation.connection.cursor()
+            generation.active_cursors += 1
+            return generation, cursor
+
+    def _checkin(self, generation):
+        with self._lock:
+            generation.active_cursors -= 1
+            generation.close_if_idle()
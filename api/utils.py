@@ -1,63 +1,473 @@
-from src.utils import duckdb_con_init, ducklake_init, ducklake_attach_gcp
 from src.logger import setup_logging
+from api.connection_manager import DuckLakeConnectionManager
+from api.cache import SnapshotLRUCache
+from api.catalog_poller import CatalogPoller
 from fastapi import HTTPException
 import os
+import io
+import json
+import base64
+import binascii
+import hashlib
+import duckdb
+import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
 current_path = os.path.dirname(os.path.abspath(__file__))
 parent_path = os.path.abspath(os.path.join(current_path, ".."))
 logger = setup_logging()
 
+connection_manager = DuckLakeConnectionManager(
+    catalog_path=os.path.join(parent_path, "catalog.ducklake"),
+    data_path=f"gs://{os.getenv('GCP_BUCKET_NAME')}/CATALOG_DATA_SNAPSHOTS",
+    max_concurrent_queries=int(os.getenv("API_MAX_CONCURRENT_QUERIES", "8")),
+    # exports hold their cursor for the whole download, so they are limited separately
+    max_concurrent_exports=int(os.getenv("API_MAX_CONCURRENT_EXPORTS", "2")),
+    # "replica" serves CLEANED/AGGREGATES from a local DuckDB copy of the latest snapshot
+    serving_mode=os.getenv("API_SERVING_MODE", "ducklake"),
+    replica_directory=os.getenv("API_REPLICA_DIRECTORY", os.path.join(parent_path, ".replica"))
+)
+
+# with a poll interval the API follows the catalog generations published by db_sync
+# instead of a catalog.ducklake file managed outside the process
+catalog_poller = None
+if int(os.getenv("API_CATALOG_POLL_SECONDS", "0")) > 0:
+    catalog_poller = CatalogPoller(
+        connection_manager,
+        bucket_name=os.getenv("GCP_BUCKET_NAME"),
+        local_directory=os.getenv("API_CATALOG_DIRECTORY", os.path.join(parent_path, ".catalog")),
+        interval_seconds=int(os.getenv("API_CATALOG_POLL_SECONDS"))
+    )
+
+result_cache = SnapshotLRUCache(max_bytes=int(os.getenv("API_CACHE_MAX_BYTES", str(256 * 1024 * 1024))))
+
+# sort_key must be unique per table; it orders every page and backs keyset cursors.
+# columns may be projected with columns= (without it every column of the table is returned);
+# filter_columns may be used in filter= and order_by=.
+# aggregates_table holds the precomputed summaries served by /datasets/{id}/aggregates.
 DATASET_CONFIG = {
     1: {
-        "table_name": "CLEANED.ASTRONAUTS"
+        "table_name": "CLEANED.ASTRONAUTS",
+        # the upstream Space Devs id, not the row's position in the RAW file
+        "sort_key": "id",
+        "aggregates_table": "AGGREGATES.ASTRONAUTS",
+        "columns": [
+            "id", "name", "agency", "agency_abbrev", "image_url", "time_in_space", "eva_time",
+            "time_in_space_seconds", "eva_time_seconds", "age", "bio", "wiki", "spacewalks_count",
+            "url", "thumbnail_url"
+        ],
+        "filter_columns": [
+            "id", "name", "agency", "agency_abbrev", "age", "spacewalks_count",
+            "time_in_space_seconds", "eva_time_seconds"
+        ]
     },
     2: {
-        "table_name": "CLEANED.NASA_APOD"
+        "table_name": "CLEANED.NASA_APOD",
+        "sort_key": "date",
+        "columns": ["title", "explanation", "date", "url", "hdurl", "thumbnail_url", "copyright"],
+        "filter_columns": ["date", "title", "copyright"]
     },
     3: {
-        "table_name": "CLEANED.NASA_DONKI"
+        "table_name": "CLEANED.NASA_DONKI",
+        "sort_key": "message_id",
+        "aggregates_table": "AGGREGATES.NASA_DONKI",
+        "columns": ["message_id", "message_type", "message_issue_timestamp", "message_issue_time", "message_body"],
+        "filter_columns": ["message_id", "message_type", "message_issue_timestamp"]
     },
     4: {
-        "table_name": "CLEANED.NASA_EXOPLANETS"
+        "table_name": "CLEANED.NASA_EXOPLANETS",
+        "sort_key": "planet_name",
+        "aggregates_table": "AGGREGATES.NASA_EXOPLANETS",
+        "columns": [
+            "planet_name", "planet_letter", "host_star", "system_distance", "discovery_year",
+            "controversial_flag", "discovery_method", "discovery_facility", "discovery_instrument",
+            "orbital_period_days", "radius_earth_radii", "star_radius_solar_radii", "orbital_semi_major_axis_in_au"
+        ],
+        "filter_columns": [
+            "planet_name", "host_star", "system_distance", "discovery_year", "controversial_flag",
+            "discovery_method", "discovery_facility", "orbital_period_days", "radius_earth_radii"
+        ]
     }
 }
 
-def fetch_single_dataset(dataset_id, offset, limit):
+FILTER_OPERATORS = {
+    "eq": "=",
+    "gt": ">",
+    "gte": ">=",
+    "lt": "<",
+    "lte": "<="
+}
+FILTER_MAX_IN_VALUES = int(os.getenv("API_FILTER_MAX_IN_VALUES", "100"))
+
+def encode_cursor(dataset_id, sort_value, order_by=None):
+    """
+    Build an opaque pagination cursor pointing just past sort_value.
+    The dataset id and order_by are embedded so a cursor cannot be replayed against
+    another dataset or ordering.
+    """
+    payload = json.dumps({"dataset_id": dataset_id, "order_by": order_by, "after": sort_value}, default=str)
+    result = base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+    return result
+
+def decode_cursor(dataset_id, cursor, order_by=None):
+    try:
+        padded_cursor = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded_cursor.encode("ascii")))
+        cursor_dataset_id = payload["dataset_id"]
+        cursor_order_by = payload.get("order_by")
+        sort_value = payload["after"]
+    except (binascii.Error, UnicodeError, json.JSONDecodeError, KeyError, TypeError, AttributeError):
+        raise ValueError("Invalid cursor")
+
+    if cursor_dataset_id != dataset_id:
+        raise ValueError("Cursor does not belong to this dataset")
+    if cursor_order_by != order_by:
+        raise ValueError("Cursor was issued for a different order_by")
+    return sort_value
+
+def parse_columns(dataset, columns):
+    """
+    Validate a comma-separated columns= value against the dataset's columns. Returns None
+    without columns=, meaning every column of the table (not only the listed ones).
+    """
+    if not columns:
+        return None
+    result = []
+    for column in columns.split(","):
+        column = column.strip()
+        if column not in dataset["columns"]:
+            raise ValueError(f"Unknown column: {column}")
+        if column not in result:
+            result.append(column)
+    return result
+
+def parse_filters(dataset, filters):
+    """
+    Turn filter= values of the form column:operator:value into parameterized SQL conditions.
+    Operators are eq, gt, gte, lt, lte and in (values separated by |); only filter_columns may be used.
+    """
+    conditions = []
+    params = []
+    for filter_expression in filters or []:
+        parts = filter_expression.split(":", 2)
+        if len(parts) != 3:
+            raise ValueError(f"Invalid filter (expected column:operator:value): {filter_expression}")
+        column, operator, value = parts
+        if column not in dataset["filter_columns"]:
+            raise ValueError(f"Filtering is not supported on column: {column}")
+
+        if operator == "in":
+            values = value.split("|")
+            if len(values) > FILTER_MAX_IN_VALUES:
+                raise ValueError(f"At most {FILTER_MAX_IN_VALUES} values are allowed in an in filter")
+            conditions.append(f'"{column}" IN ({", ".join("?" for _ in values)})')
+            params.extend(values)
+        elif operator in FILTER_OPERATORS:
+            conditions.append(f'"{column}" {FILTER_OPERATORS[operator]} ?')
+            params.append(value)
+        else:
+            raise ValueError(f"Unsupported filter operator: {operator}")
+    return conditions, params
+
+def parse_order_by(dataset, order_by):
+    """Returns (column, descending) for order_by=column or order_by=-column, or (None, False)."""
+    if not order_by:
+        return None, False
+    descending = order_by.startswith("-")
+    column = order_by[1:] if descending else order_by
+    if column not in dataset["filter_columns"]:
+        raise ValueError(f"Ordering is not supported on column: {column}")
+    return column, descending
+
+class SnapshotExpiredError(Exception):
+    """The requested snapshot has been removed by the snapshot retention policy."""
+
+def snapshot_table_reference(table_name, snapshot_id=None):
+    """table_name as of a DuckLake snapshot; snapshot ids are validated integers, so they are inlined."""
+    if snapshot_id is None:
+        return table_name
+    result = f"{table_name} AT (VERSION => {int(snapshot_id)})"
+    return result
+
+def validate_snapshot(snapshot_id, retained_snapshot_ids, current_snapshot_id):
+    """Raise ValueError for a snapshot that does not exist yet and SnapshotExpiredError for one that has been expired."""
+    if snapshot_id > current_snapshot_id:
+        raise ValueError(f"Snapshot {snapshot_id} does not exist (latest is {current_snapshot_id})")
+    if snapshot_id not in retained_snapshot_ids:
+        raise SnapshotExpiredError(
+            f"Snapshot {snapshot_id} has expired; the oldest available snapshot is {min(retained_snapshot_ids)}"
+        )
+
+def retained_snapshot_ids(snapshot_id):
+    """Ids of the snapshots still available for time travel, as seen from snapshot_id."""
+    if connection_manager.serving_mode == "replica":
+        raise ValueError("Snapshot reads are not available while the API serves from a local replica")
+    cache_key = ("snapshots",)
+    cached_ids = result_cache.get(snapshot_id, cache_key)
+    if cached_ids is not None:
+        return cached_ids
+
+    with connection_manager.cursor() as db_cursor:
+        rows = db_cursor.execute("SELECT snapshot_id FROM ducklake_snapshots('my_ducklake')").fetchall()
+    result = frozenset(row[0] for row in rows)
+    result_cache.put(snapshot_id, cache_key, result, 8 * len(result))
+    return result
+
+def build_changes_query(dataset_id, since_snapshot, until_snapshot, limit, after_key=None, table_recreated=False):
+    """
+    Build the query for the net changes to a dataset between two snapshots, one row per
+    changed sort_key with change_type insert, update or delete (deletes carry the old row).
+
+    Only keys that appear in DuckLake's change feed (ducklake_table_changes) are compared,
+    so unchanged rows are never read. If the table was recreated after since_snapshot its
+    change feed does not reach back that far, and both versions are compared in full.
+    """
+    dataset = DATASET_CONFIG[dataset_id]
+    sort_key = dataset["sort_key"]
+    schema_name, table_name = dataset["table_name"].split(".")
+    select_list = ", ".join(f'"{column}"' for column in dataset["columns"])
+    previous_table = snapshot_table_reference(dataset["table_name"], since_snapshot)
+    latest_table = snapshot_table_reference(dataset["table_name"], until_snapshot)
+
+    if table_recreated:
+        touched_keys = f'SELECT "{sort_key}" FROM {previous_table} UNION SELECT "{sort_key}" FROM {latest_table}'
+    else:
+        touched_keys = (
+            f'SELECT DISTINCT "{sort_key}" FROM ducklake_table_changes('
+            f"'my_ducklake', '{schema_name}', '{table_name}', {int(since_snapshot) + 1}, {int(until_snapshot)})"
+        )
+
+    params = []
+    after_clause = ""
+    if after_key is not None:
+        after_clause = f'WHERE "{sort_key}" > ?'
+        params.append(after_key)
+    params.append(limit)
+
+    query = f"""
+    WITH touched AS ({touched_keys}),
+    previous AS (
+        SELECT {select_list} FROM {previous_table} WHERE "{sort_key}" IN (SELECT "{sort_key}" FROM touched)
+    ),
+    latest AS (
+        SELECT {select_list} FROM {latest_table} WHERE "{sort_key}" IN (SELECT "{sort_key}" FROM touched)
+    ),
+    changed AS (
+        SELECT * FROM latest EXCEPT SELECT * FROM previous
+    ),
+    net_changes AS (
+        SELECT
+            CASE WHEN "{sort_key}" IN (SELECT "{sort_key}" FROM previous) THEN 'update' ELSE 'insert' END AS change_type,
+            *
+        FROM changed
+        UNION ALL
+        SELECT 'delete' AS change_type, * FROM previous
+        WHERE "{sort_key}" NOT IN (SELECT "{sort_key}" FROM latest)
+    )
+    SELECT * FROM net_changes {after_clause} ORDER BY "{sort_key}" LIMIT ?
+    """
+    return query, params
+
+def build_dataset_query(dataset_id, offset, limit, cursor=None, columns=None, filters=None, order_by=None, as_of_snapshot=None):
+    """
+    Build the parameterized page query for a dataset so projection, filters and ordering
+    are pushed down into the DuckLake scan. With as_of_snapshot the table is read as of
+    that DuckLake snapshot (time travel).
+
+    Returns (query, params, helper_columns); helper_columns are the sort columns read only
+    to build the next cursor, which the caller drops before responding.
+    """
+    dataset = DATASET_CONFIG[dataset_id]
+    sort_key = dataset["sort_key"]
+    selected_columns = parse_columns(dataset, columns)
+    conditions, params = parse_filters(dataset, filters)
+    order_column, descending = parse_order_by(dataset, order_by)
+
+    helper_columns = []
+    if selected_columns is not None:
+        helper_columns = [
+            column for column in dict.fromkeys([order_column, sort_key])
+            if column is not None and column not in selected_columns
+        ]
+
+    if cursor is not None:
+        after = decode_cursor(dataset_id, cursor, order_by)
+        if order_column is None:
+            conditions.append(f'"{sort_key}" > ?')
+            params.append(after)
+        else:
+            # compound keyset over (order_column NULLS LAST, sort_key)
+            order_value, sort_value = after
+            if order_value is None:
+                conditions.append(f'("{order_column}" IS NULL AND "{sort_key}" > ?)')
+                params.append(sort_value)
+            else:
+                comparison = "<" if descending else ">"
+                conditions.append(
+                    f'("{order_column}" {comparison} ? OR ("{order_column}" = ? AND "{sort_key}" > ?) OR "{order_column}" IS NULL)'
+                )
+                params.extend([order_value, order_value, sort_value])
+
+    if order_column is None:
+        order_clause = f'ORDER BY "{sort_key}"'
+    else:
+        order_clause = f'ORDER BY "{order_column}" {"DESC" if descending else "ASC"} NULLS LAST, "{sort_key}"'
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    select_list = "*"
+    if selected_columns is not None:
+        select_list = ", ".join(f'"{column}"' for column in selected_columns + helper_columns)
+    table_reference = snapshot_table_reference(dataset["table_name"], as_of_snapshot)
+
+    if cursor is not None:
+        query = f"SELECT {select_list} FROM {table_reference} {where_clause} {order_clause} LIMIT ?"
+        params.append(limit)
+    else:
+        query = f"SELECT {select_list} FROM {table_reference} {where_clause} {order_clause} OFFSET ? LIMIT ?"
+        params.extend([offset, limit])
+    return query, params, helper_columns
+
+EXPORT_BATCH_SIZE = int(os.getenv("API_EXPORT_BATCH_SIZE", "10000"))
+EXPORT_FORMATS = ("ndjson", "arrow")
+EXPORT_COMPRESSIONS = ("gzip", "zstd")
+
+RESPONSE_MEDIA_TYPES = {
+    "json": "application/json",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+    "ndjson": "application/x-ndjson"
+}
+
+def negotiate_response_format(requested_format, accept_header):
+    """
+    An explicit format query parameter wins; otherwise the first supported media
+    type in the Accept header is used, falling back to JSON.
+    """
+    if requested_format:
+        if requested_format not in RESPONSE_MEDIA_TYPES:
+            raise ValueError(f"Unsupported format: {requested_format}")
+        return requested_format
+
+    if accept_header:
+        for accepted in accept_header.split(","):
+            media_type = accepted.split(";")[0].strip()
+            for response_format, format_media_type in RESPONSE_MEDIA_TYPES.items():
+                if media_type == format_media_type:
+                    return response_format
+    return "json"
+
+def serialize_arrow_table(table, response_format):
+    """
+    Encode an Arrow table for a non-JSON response without building Python row objects.
+    """
+    match response_format:
+        case "arrow":
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            result = sink.getvalue().to_pybytes()
+        case "parquet":
+            sink = pa.BufferOutputStream()
+            pq.write_table(table, sink)
+            result = sink.getvalue().to_pybytes()
+        case "ndjson":
+            buffer = io.BytesIO()
+            pl.from_arrow(table).write_ndjson(buffer)
+            result = buffer.getvalue()
+        case _:
+            raise ValueError(f"Unsupported format: {response_format}")
+    return result
+
+def dataset_etag(snapshot_id, *request_params):
+    """
+    Strong ETag for a response: the DuckLake snapshot it was read from plus a digest
+    of the parameters that shape the representation.
+    """
+    params_digest = hashlib.sha1(repr(request_params).encode("utf-8")).hexdigest()[:16]
+    result = f'"{snapshot_id}-{params_digest}"'
+    return result
+
+def etag_matches(etag, if_none_match):
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    result = "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+    return result
+
+def fetch_single_dataset(dataset_id, offset, limit, cursor=None, snapshot_id=None, columns=None, filters=None, order_by=None,
+                         as_of_snapshot=None):
+    """
+    Returns one page of a dataset as (arrow_table, next_cursor, snapshot_id).
+
+    Pages are ordered by order_by (if given) and then the dataset's sort_key. When a
+    cursor is given the page starts after the cursor's key (keyset pagination) instead
+    of scanning past offset rows. next_cursor is None once the last page has been reached.
+    columns, filters and order_by are validated against DATASET_CONFIG and pushed down
+    into the query (see build_dataset_query). as_of_snapshot reads the dataset as of an
+    earlier DuckLake snapshot that is still retained.
+
+    Results are cached per DuckLake snapshot. snapshot_id is the snapshot to look the page
+    up for; the returned snapshot_id is the one the page was actually read from (a newer
+    catalog may have been attached in between), so callers build their ETag from it.
+    """
     try:
         dataset_id = int(dataset_id)
         offset = int(offset)
         limit = int(limit)
-        logger.info(f"Fetching dataset {dataset_id} with offset={offset}, limit={limit}")
+        logger.info(
+            f"Fetching dataset {dataset_id} with offset={offset}, limit={limit}, cursor={cursor}, "
+            f"columns={columns}, filters={filters}, order_by={order_by}, as_of_snapshot={as_of_snapshot}"
+        )
+
+        if snapshot_id is None:
+            snapshot_id = connection_manager.current_snapshot_id()
+        if as_of_snapshot is not None:
+            validate_snapshot(as_of_snapshot, retained_snapshot_ids(snapshot_id), snapshot_id)
+        cache_key = ("page", dataset_id, offset, limit, cursor, columns, tuple(filters or ()), order_by, as_of_snapshot)
+        cached_page = result_cache.get(snapshot_id, cache_key)
+        if cached_page is not None:
+            logger.info(f"Serving dataset {dataset_id} from cache (snapshot {snapshot_id})")
+            table, next_cursor = cached_page
+            return table, next_cursor, snapshot_id
         
         if dataset_id not in DATASET_CONFIG:
             raise ValueError(f"Invalid dataset_id: {dataset_id}")
+        if cursor is not None and offset:
+            raise ValueError("offset cannot be combined with cursor")
         
         dataset = DATASET_CONFIG[dataset_id]
+        sort_key = dataset["sort_key"]
         logger.info(f"Using dataset: {dataset['table_name']}")
 
-        gcp_bucket = os.getenv('GCP_BUCKET_NAME')
-        data_path = f"gs://{gcp_bucket}/CATALOG_DATA_SNAPSHOTS"
-        catalog_path = os.path.join(parent_path, "catalog.ducklake")
-        
-        con = duckdb_con_init()
-        ducklake_init(con, data_path, catalog_path)
-        ducklake_attach_gcp(con)
-
         # Use a fully parameterized query
-        query = f"""
-            SELECT * FROM {dataset['table_name']}
-            OFFSET ?
-            LIMIT ?
-        """
+        query, params, helper_columns = build_dataset_query(
+            dataset_id, offset, limit, cursor, columns, filters, order_by, as_of_snapshot
+        )
+
         logger.info(f"Executing parameterized query on table: {dataset['table_name']}")
-        result = con.execute(query, [offset, limit]).fetchall()
-        columns = [desc[0] for desc in con.description]
+        with connection_manager.snapshot_cursor() as (db_cursor, snapshot_id):
+            table = db_cursor.execute(query, params).fetch_arrow_table()
 
-        data = [dict(zip(columns, row)) for row in result]
+        next_cursor = None
+        if table.num_rows == limit:
+            order_column, descending = parse_order_by(dataset, order_by)
+            last_sort_value = table.column(sort_key)[-1].as_py()
+            if order_column is None:
+                next_cursor = encode_cursor(dataset_id, last_sort_value)
+            else:
+                last_order_value = table.column(order_column)[-1].as_py()
+                next_cursor = encode_cursor(dataset_id, [last_order_value, last_sort_value], order_by)
+        if helper_columns:
+            table = table.drop_columns(helper_columns)
 
-        logger.info(f"Retrieved {len(data)} records")
-        return data
+        logger.info(f"Retrieved {table.num_rows} records")
+        result_cache.put(snapshot_id, cache_key, (table, next_cursor), table.nbytes)
+        return table, next_cursor, snapshot_id
         
-    except ValueError as ve:
+    except SnapshotExpiredError as se:
+        logger.error(f"SnapshotExpiredError: {se}")
+        raise HTTPException(status_code=410, detail=str(se))
+    except (ValueError, duckdb.ConversionException) as ve:
+        # ConversionException: a filter or cursor value does not fit the column type
         logger.error(f"ValueError: {ve}")
         raise HTTPException(status_code=400, detail=str(ve))
     except KeyError as ke:
@@ -66,10 +476,212 @@ def fetch_single_dataset(dataset_id, offset, limit):
     except Exception as e:
         logger.error(f"Error fetching dataset {dataset_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
-    finally:
-        con.close()
 
 
+def table_recreated_since(db_cursor, table_name, since_snapshot):
+    """True if the current version of table_name was created after since_snapshot (e.g. by CREATE OR REPLACE)."""
+    schema_name, table_name = table_name.split(".")
+    row = db_cursor.execute(
+        """
+        SELECT t.begin_snapshot
+        FROM __ducklake_metadata_my_ducklake.ducklake_table t
+        JOIN __ducklake_metadata_my_ducklake.ducklake_schema s ON t.schema_id = s.schema_id
+        WHERE s.schema_name = ? AND t.table_name = ? AND t.end_snapshot IS NULL AND s.end_snapshot IS NULL
+        """,
+        [schema_name, table_name]
+    ).fetchone()
+    result = row is not None and row[0] > since_snapshot
+    return result
+
+def fetch_dataset_changes(dataset_id, since_snapshot, limit, cursor=None, snapshot_id=None):
+    """
+    Returns (arrow_table, next_cursor, until_snapshot): the rows of a dataset inserted,
+    updated or deleted after since_snapshot, up to until_snapshot (the latest snapshot
+    when the first page was requested; cursors keep every page on the same one).
+    Clients pass until_snapshot as since_snapshot on their next sync.
+    """
+    try:
+        dataset_id = int(dataset_id)
+        since_snapshot = int(since_snapshot)
+        limit = int(limit)
+        if dataset_id not in DATASET_CONFIG:
+            raise ValueError(f"Invalid dataset_id: {dataset_id}")
+        dataset = DATASET_CONFIG[dataset_id]
+        sort_key = dataset["sort_key"]
+
+        if snapshot_id is None:
+            snapshot_id = connection_manager.current_snapshot_id()
+        # the cursor pins the snapshot the first page was read up to
+        cursor_tag = f"changes:{since_snapshot}"
+        until_snapshot, after_key = snapshot_id, None
+        if cursor is not None:
+            until_snapshot, after_key = decode_cursor(dataset_id, cursor, cursor_tag)
+            until_snapshot = int(until_snapshot)
+        retained_ids = retained_snapshot_ids(snapshot_id)
+        validate_snapshot(since_snapshot, retained_ids, snapshot_id)
+        validate_snapshot(until_snapshot, retained_ids, snapshot_id)
+        logger.info(f"Fetching changes to dataset {dataset_id} between snapshots {since_snapshot} and {until_snapshot}")
+
+        cache_key = ("changes", dataset_id, since_snapshot, until_snapshot, limit, after_key)
+        cached_changes = result_cache.get(snapshot_id, cache_key)
+        if cached_changes is not None:
+            return cached_changes
+
+        with connection_manager.cursor() as db_cursor:
+            if since_snapshot == until_snapshot:
+                select_list = ", ".join(f'"{column}"' for column in dataset["columns"])
+                table = db_cursor.execute(
+                    f"SELECT NULL::VARCHAR AS change_type, {select_list} FROM {dataset['table_name']} LIMIT 0"
+                ).fetch_arrow_table()
+                return table, None, until_snapshot
+            table_recreated = table_recreated_since(db_cursor, dataset["table_name"], since_snapshot)
+            query, params = build_changes_query(dataset_id, since_snapshot, until_snapshot, limit, after_key, table_recreated)
+            table = db_cursor.execute(query, params).fetch_arrow_table()
+
+        next_cursor = None
+        if table.num_rows == limit:
+            next_cursor = encode_cursor(dataset_id, [until_snapshot, table.column(sort_key)[-1].as_py()], cursor_tag)
+
+        logger.info(f"Retrieved {table.num_rows} changed records")
+        result = (table, next_cursor, until_snapshot)
+        result_cache.put(snapshot_id, cache_key, result, table.nbytes)
+        return result
+
+    except SnapshotExpiredError as se:
+        logger.error(f"SnapshotExpiredError: {se}")
+        raise HTTPException(status_code=410, detail=str(se))
+    except (ValueError, duckdb.ConversionException, duckdb.CatalogException) as ve:
+        # CatalogException: the table did not exist yet at since_snapshot
+        logger.error(f"ValueError: {ve}")
+        raise HTTPException(status_code=400, detail=str(ve))
+    except KeyError as ke:
+        logger.error(f"KeyError: {ke}")
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    except Exception as e:
+        logger.error(f"Error fetching changes to dataset {dataset_id}: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+def fetch_dataset_aggregates(dataset_id, snapshot_id=None):
+    """
+    Returns (aggregates, snapshot_id): the precomputed summaries of a dataset as
+    {aggregate: value}, where value is a number for scalar aggregates and an ordered list
+    of {label, value} for breakdowns, and the snapshot they were read from.
+    """
+    try:
+        dataset_id = int(dataset_id)
+        if dataset_id not in DATASET_CONFIG:
+            raise ValueError(f"Invalid dataset_id: {dataset_id}")
+        aggregates_table = DATASET_CONFIG[dataset_id]["aggregates_table"]
+
+        if snapshot_id is None:
+            snapshot_id = connection_manager.current_snapshot_id()
+        cache_key = ("aggregates", dataset_id)
+        cached_aggregates = result_cache.get(snapshot_id, cache_key)
+        if cached_aggregates is not None:
+            return cached_aggregates, snapshot_id
+
+        with connection_manager.snapshot_cursor() as (db_cursor, snapshot_id):
+            rows = db_cursor.execute(
+                f"SELECT aggregate, label, value FROM {aggregates_table} ORDER BY aggregate, position"
+            ).fetchall()
+
+        result = {}
+        for aggregate, label, value in rows:
+            if label is None:
+                result[aggregate] = value
+            else:
+                result.setdefault(aggregate, []).append({"label": label, "value": value})
+
+        logger.info(f"Retrieved {len(result)} aggregates for dataset {dataset_id}")
+        result_cache.put(snapshot_id, cache_key, result, len(json.dumps(result)))
+        return result, snapshot_id
+
+    except ValueError as ve:
+        logger.error(f"ValueError: {ve}")
+        raise HTTPException(status_code=400, detail=str(ve))
+    except KeyError as ke:
+        logger.error(f"KeyError: {ke}")
+        raise HTTPException(status_code=404, detail="No aggregates for this dataset")
+    except duckdb.CatalogException as ce:
+        # the aggregates table is built by the next db_sync
+        logger.error(f"CatalogException: {ce}")
+        raise HTTPException(status_code=503, detail="Aggregates for this dataset have not been built yet")
+    except Exception as e:
+        logger.error(f"Error fetching aggregates for dataset {dataset_id}: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+class ChunkSink(io.RawIOBase):
+    """Write-only file object that collects written bytes until they are drained."""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        result = b"".join(self.chunks)
+        self.chunks.clear()
+        return result
+
+def validate_export_request(dataset_id, response_format, compression):
+    if dataset_id not in DATASET_CONFIG:
+        raise ValueError(f"Invalid dataset_id: {dataset_id}")
+    if response_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {response_format}")
+    if compression is not None and compression not in EXPORT_COMPRESSIONS:
+        raise ValueError(f"Unsupported compression: {compression}")
+
+def export_dataset_stream(dataset_id, response_format="ndjson", compression=None, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Generator yielding an entire CLEANED table as encoded (and optionally compressed) bytes.
+
+    Record batches are pulled from DuckDB one at a time and each is flushed to the
+    client before the next is read, so memory use is bounded by batch_size rather
+    than the table size. Call validate_export_request first; errors raised here
+    surface mid-stream.
+    """
+    dataset = DATASET_CONFIG[dataset_id]
+    logger.info(f"Exporting {dataset['table_name']} as {response_format} (compression: {compression})")
+
+    sink = ChunkSink()
+    output = pa.CompressedOutputStream(sink, compression) if compression else sink
+    rows_exported = 0
+
+    with connection_manager.cursor(export=True) as db_cursor:
+        reader = db_cursor.execute(f"SELECT * FROM {dataset['table_name']}").fetch_record_batch(batch_size)
+        ipc_writer = pa.ipc.new_stream(output, reader.schema) if response_format == "arrow" else None
+
+        for batch in reader:
+            if ipc_writer:
+                ipc_writer.write_batch(batch)
+            else:
+                output.write(pl.from_arrow(batch).write_ndjson().encode("utf-8"))
+            if compression:
+                output.flush()
+            rows_exported += batch.num_rows
+
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+
+        if ipc_writer:
+            ipc_writer.close()
+        if compression:
+            output.close()
+
+    final_chunk = sink.drain()
+    if final_chunk:
+        yield final_chunk
+    logger.info(f"Exported {rows_exported} records from {dataset['table_name']}")
+
 def get_datasets_list():
     result = []
     for dataset_id, config in DATASET_CONFIG.items():
@@ -0,0 +1,124 @@
+"""
+Bytes read by a DONKI query filtered on message type and issue month, against an
+unpartitioned table and one partitioned like STAGED/CLEANED.NASA_DONKI.
+
+Bytes read are taken from rchar in /proc/self/io (Linux), which counts every byte
+DuckDB reads from the data files, whether or not they are in the page cache.
+
+Usage: uv run python -m benchmarks.bench_donki_partitioning [rows] [ducklake|parquet]
+    ducklake: a local DuckLake with SET PARTITIONED BY (needs the ducklake extension)
+    parquet: the same data as one parquet file vs. a hive-partitioned parquet layout
+"""
+import os
+import sys
+import tempfile
+import time
+import duckdb
+
+MESSAGE_TYPES = ["FLR", "CME", "GST", "IPS", "SEP", "MPC", "RBE", "HSS", "Report"]
+QUERY_FILTER = """
+message_type = 'FLR'
+AND message_issue_timestamp >= TIMESTAMP '2024-03-01'
+AND message_issue_timestamp < TIMESTAMP '2024-04-01'
+"""
+PARTITION_FILTER = "message_type = 'FLR' AND issue_year = 2024 AND issue_month = 3"
+
+
+def bytes_read():
+    with open("/proc/self/io", "r") as file:
+        io_counters = dict(line.split(": ") for line in file.read().splitlines())
+    result = int(io_counters["rchar"])
+    return result
+
+
+def synthetic_donki_query(row_count, seed=42):
+    # five years of notifications with ~2 KB message bodies, like the real feed
+    result = f"""
+    SELECT
+        'msg-' || i AS message_id,
+        {MESSAGE_TYPES}[1 + (hash(i + {seed}) % {len(MESSAGE_TYPES)})::INTEGER] AS message_type,
+        TIMESTAMP '2020-01-01' + to_minutes((hash(i * 7 + {seed}) % (5 * 365 * 24 * 60))::BIGINT) AS message_issue_timestamp,
+        repeat(md5(i::VARCHAR), 64) AS message_body
+    FROM range({row_count}) t(i)
+    """
+    return result
+
+
+def measure(con, query):
+    con.execute("SELECT 1").fetchall()
+    before = bytes_read()
+    tick = time.perf_counter()
+    rows = con.execute(query).fetchall()
+    tock = time.perf_counter() - tick
+    result = {"bytes": bytes_read() - before, "seconds": tock, "rows": rows}
+    return result
+
+
+def setup_ducklake(con, work_directory, row_count):
+    con.execute("INSTALL ducklake; LOAD ducklake;")
+    con.execute(
+        f"ATTACH 'ducklake:{work_directory}/catalog.ducklake' AS bench (DATA_PATH '{work_directory}/data/')"
+    )
+    con.execute("USE bench")
+    con.execute(f"CREATE TABLE donki_unpartitioned AS {synthetic_donki_query(row_count)}")
+    con.execute(f"CREATE TABLE donki_partitioned AS {synthetic_donki_query(row_count)} LIMIT 0")
+    con.execute("""
+        ALTER TABLE donki_partitioned SET PARTITIONED BY (
+            message_type, year(message_issue_timestamp), month(message_issue_timestamp)
+        )
+    """)
+    con.execute(f"INSERT INTO donki_partitioned {synthetic_donki_query(row_count)}")
+    query_template = "SELECT count(*), sum(length(message_body)) FROM {table} WHERE " + QUERY_FILTER
+    result = (
+        query_template.format(table="donki_unpartitioned"),
+        query_template.format(table="donki_partitioned")
+    )
+    return result
+
+
+def setup_parquet(con, work_directory, row_count):
+    con.execute(f"COPY ({synthetic_donki_query(row_count)}) TO '{work_directory}/donki.parquet'")
+    con.execute(f"""
+        COPY (
+            SELECT *, year(message_issue_timestamp) AS issue_year, month(message_issue_timestamp) AS issue_month
+            FROM ({synthetic_donki_query(row_count)})
+        ) TO '{work_directory}/donki_partitioned' (FORMAT parquet, PARTITION_BY (message_type, issue_year, issue_month))
+    """)
+    select_list = "SELECT count(*), sum(length(message_body))"
+    result = (
+        f"{select_list} FROM read_parquet('{work_directory}/donki.parquet') WHERE {QUERY_FILTER}",
+        f"{select_list} FROM read_parquet('{work_directory}/donki_partitioned/**/*.parquet', hive_partitioning = true) "
+        f"WHERE {PARTITION_FILTER} AND {QUERY_FILTER}"
+    )
+    return result
+
+
+def run_benchmark(row_count, layout):
+    with tempfile.TemporaryDirectory() as work_directory:
+        con = duckdb.connect()
+        tick = time.perf_counter()
+        if layout == "ducklake":
+            unpartitioned_query, partitioned_query = setup_ducklake(con, work_directory, row_count)
+        else:
+            unpartitioned_query, partitioned_query = setup_parquet(con, work_directory, row_count)
+        print(f"Wrote {row_count} synthetic DONKI rows ({layout}) in {time.perf_counter() - tick:.2f} s")
+
+        unpartitioned = measure(con, unpartitioned_query)
+        partitioned = measure(con, partitioned_query)
+        con.close()
+
+    if unpartitioned["rows"] != partitioned["rows"]:
+        raise AssertionError("partitioned and unpartitioned queries returned different results")
+
+    print(f"Matching rows (count, body bytes): {partitioned['rows'][0]}")
+    print(f"Unpartitioned: {unpartitioned['bytes'] / 1024 / 1024:8.2f} MiB read in {unpartitioned['seconds']:.3f} s")
+    print(f"Partitioned:   {partitioned['bytes'] / 1024 / 1024:8.2f} MiB read in {partitioned['seconds']:.3f} s")
+    print(f"Bytes read reduced {unpartitioned['bytes'] / max(partitioned['bytes'], 1):.1f}x")
+
+
+if __name__ == "__main__":
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    layout = sys.argv[2] if len(sys.argv) > 2 else "ducklake"
+    if not os.path.exists("/proc/self/io"):
+        sys.exit("This benchmark reads /proc/self/io and only runs on Linux")
+    run_benchmark(row_count, layout)
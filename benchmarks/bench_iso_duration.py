@@ -0,0 +1,53 @@
+"""
+Compare the per-row iso_to_human path with the vectorized polars expressions
+used by preprocess_astronaut_data.
+
+Usage: uv run python -m benchmarks.bench_iso_duration [rows]
+"""
+import sys
+import time
+import random
+import polars as pl
+from src.utils import iso_to_human, iso_duration_seconds_expr, human_duration_expr
+
+
+def synthetic_durations(row_count, seed=42):
+    random_generator = random.Random(seed)
+    durations = []
+    for _ in range(row_count):
+        days = random_generator.randint(0, 900)
+        hours = random_generator.randint(0, 23)
+        minutes = random_generator.randint(0, 59)
+        seconds = random_generator.randint(0, 59)
+        durations.append(f"P{days}DT{hours}H{minutes}M{seconds}S")
+    result = pl.DataFrame({"time_in_space": durations})
+    return result
+
+
+def run_benchmark(row_count):
+    durations_dataframe = synthetic_durations(row_count)
+
+    tick = time.perf_counter()
+    per_row_result = durations_dataframe.with_columns(
+        pl.col("time_in_space").map_elements(iso_to_human, return_dtype=pl.Utf8).alias("human_readable")
+    )
+    per_row_seconds = time.perf_counter() - tick
+
+    tick = time.perf_counter()
+    vectorized_result = durations_dataframe.with_columns(
+        iso_duration_seconds_expr("time_in_space").alias("seconds")
+    ).with_columns(
+        human_duration_expr(pl.col("seconds")).alias("human_readable")
+    )
+    vectorized_seconds = time.perf_counter() - tick
+
+    identical = per_row_result["human_readable"].equals(vectorized_result["human_readable"])
+    print(f"rows:            {row_count}")
+    print(f"map_elements:    {per_row_seconds:.2f} s")
+    print(f"vectorized:      {vectorized_seconds:.2f} s")
+    print(f"speedup:         {per_row_seconds / vectorized_seconds:.1f}x")
+    print(f"identical:       {identical}")
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -2,7 +2,6 @@ import os
 import requests
 import pandas as pd
 import streamlit as st
-import numpy as np
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -25,6 +24,32 @@ def get_dataset(name, url):
     except Exception as e:
         st.error(f"Failed to load {name}: {e}")
 
+def aggregates_url(dataset_url):
+    # e.g. http://api/datasets/4?limit=7500 -> http://api/datasets/4/aggregates
+    result = f"{dataset_url.split('?')[0].rstrip('/')}/aggregates"
+    return result
+
+@st.cache_data
+def get_aggregates(name, url):
+    try:
+        response = requests.get(aggregates_url(url))
+        response.raise_for_status()
+        aggregates = response.json()
+        return aggregates
+    except Exception as e:
+        st.error(f"Failed to load {name} summaries: {e}")
+
+def breakdown_chart_data(breakdown, label_names=None):
+    # keeps the order computed by the API (e.g. histogram bins) instead of sorting labels
+    labels = [item["label"] for item in breakdown]
+    if label_names:
+        labels = [label_names.get(label, label) for label in labels]
+    result = pd.DataFrame({
+        "Bin": pd.CategoricalIndex(labels, categories=list(dict.fromkeys(labels)), ordered=True),
+        "Count": [item["value"] for item in breakdown]
+    }).groupby("Bin", observed=True).sum()
+    return result
+
 def set_page_config():
     st.set_page_config(page_title="Rapid Dashboard", layout="wide")
 
@@ -33,30 +58,20 @@ def set_page_title():
 
 def astronauts_section():
     st.header("Astronauts")
-    astro_dataframe = get_dataset("Astronauts", dataset_url_endpoints["Astronauts"])
-
-    # conversions
-    astro_dataframe["age"] = pd.to_numeric(astro_dataframe["age"], errors="coerce")
-    astro_dataframe["eva_time"] = pd.to_numeric(astro_dataframe["eva_time"], errors="coerce")
-    astro_dataframe["spacewalks_count"] = pd.to_numeric(astro_dataframe["spacewalks_count"], errors="coerce")
-    astro_dataframe["agency_abbrev"] = pd.to_numeric(astro_dataframe["agency_abbrev"], errors="coerce")
-
-    # aggregation
-    total_astronauts = len(astro_dataframe)
-    average_age = round(astro_dataframe["age"].mean())
-    total_spacewalks = astro_dataframe["spacewalks_count"].sum()
-    number_of_agencies = astro_dataframe["agency"].nunique()
+    astro_aggregates = get_aggregates("Astronauts", dataset_url_endpoints["Astronauts"])
+    if not astro_aggregates:
+        st.warning("No astronaut data available.")
+        return
 
     # display
     col1, col2, col3, col4 = st.columns(4)
-    col1.metric("Astronauts In Space", total_astronauts)
-    col2.metric("Unique Space Agencies", number_of_agencies)
-    col3.metric("Average Age", average_age)
-    col4.metric("Total Spacewalks", total_spacewalks)
+    col1.metric("Astronauts In Space", int(astro_aggregates.get("total_astronauts", 0)))
+    col2.metric("Unique Space Agencies", int(astro_aggregates.get("unique_agencies", 0)))
+    col3.metric("Average Age", round(astro_aggregates["average_age"]) if astro_aggregates.get("average_age") is not None else "-")
+    col4.metric("Total Spacewalks", int(astro_aggregates.get("total_spacewalks", 0)))
 
     st.subheader("Top Agencies")
-    agency_counts = astro_dataframe["agency"].value_counts()
-    st.bar_chart(agency_counts)
+    st.bar_chart(breakdown_chart_data(astro_aggregates.get("agency_count", [])))
 
 
 def APOD_section():
@@ -92,9 +107,9 @@ def DONKI_section():
     st.header("Space Weather Alerts")
     st.markdown("This section analyzes space weather alerts from NASA's DONKI (Space Weather Database Of Notifications, Knowledge, Information).")
 
-    donki_dataframe = get_dataset("DONKI", dataset_url_endpoints["DONKI"])
+    donki_aggregates = get_aggregates("DONKI", dataset_url_endpoints["DONKI"])
 
-    if donki_dataframe is not None and not donki_dataframe.empty:
+    if donki_aggregates and donki_aggregates.get("total_alerts"):
         message_type_mapping = {
             "CME": "Coronal Mass Ejection",
             "CMEAnalysis": "Coronal Mass Ejection Analysis",
@@ -108,10 +123,9 @@ def DONKI_section():
             "Notifications": "Notifications"
         }
 
-        donki_dataframe['message_type_name'] = donki_dataframe['message_type'].map(message_type_mapping)
-        type_counts = donki_dataframe['message_type_name'].value_counts()
+        type_counts = breakdown_chart_data(donki_aggregates.get("message_type_count", []), message_type_mapping)
 
-        total_alerts = len(donki_dataframe)
+        total_alerts = int(donki_aggregates["total_alerts"])
         st.metric("Total Alerts (5-year period)", total_alerts)
 
         st.subheader("Number of Messages by Type")
@@ -123,59 +137,35 @@ def DONKI_section():
 
 def exoplanets_section():
     st.header("Exoplanets Overview")
-    exoplanets_dataframe = get_dataset("Exoplanets", dataset_url_endpoints["Exoplanets"])
+    exoplanets_aggregates = get_aggregates("Exoplanets", dataset_url_endpoints["Exoplanets"])
 
-    if exoplanets_dataframe is not None and not exoplanets_dataframe.empty:
+    if exoplanets_aggregates and exoplanets_aggregates.get("total_exoplanets"):
         # --- Glance Metrics ---
-        total_exoplanets = len(exoplanets_dataframe)
-        avg_distance = round(exoplanets_dataframe["system_distance"].mean(), 2)
-        unique_host_stars = exoplanets_dataframe["host_star"].nunique()
-        controversial_count = exoplanets_dataframe["controversial_flag"].sum()
+        average_distance = exoplanets_aggregates.get("average_system_distance")
 
         col1, col2, col3, col4 = st.columns(4)
-        col1.metric("Total Exoplanets", total_exoplanets)
-        col2.metric("Average Distance to Host Star (ly)", avg_distance)
-        col3.metric("Number of Host Stars", unique_host_stars)
-        col4.metric("Controversial Discoveries", controversial_count)
+        col1.metric("Total Exoplanets", int(exoplanets_aggregates["total_exoplanets"]))
+        col2.metric("Average Distance to Host Star (ly)", round(average_distance, 2) if average_distance is not None else "-")
+        col3.metric("Number of Host Stars", int(exoplanets_aggregates.get("unique_host_stars", 0)))
+        col4.metric("Controversial Discoveries", int(exoplanets_aggregates.get("controversial_count", 0)))
 
         st.markdown("---")
 
         # --- Histograms / Charts ---
         st.subheader("Exoplanet Discoveries by Year")
-        discovery_year_counts = exoplanets_dataframe["discovery_year"].value_counts().sort_index()
-        st.bar_chart(discovery_year_counts)
+        st.bar_chart(breakdown_chart_data(exoplanets_aggregates.get("discovery_year_count", [])))
 
         # --- Planets by Discovery Method ---
         st.subheader("Planets by Discovery Method")
-        method_counts = exoplanets_dataframe["discovery_method"].value_counts()
-        st.bar_chart(method_counts)
+        st.bar_chart(breakdown_chart_data(exoplanets_aggregates.get("discovery_method_count", [])))
 
         # --- Exoplanet Radius Compared to Earth ---
         st.subheader("Exoplanet Radius Compared to Earth")
-        radii = exoplanets_dataframe["radius_earth_radii"].dropna()
-        bins = np.arange(0, 35, 0.5)
-        counts, bin_edges = np.histogram(radii, bins=bins)
-        # loops over bin_edges and formats the numbers to one decimal place with a hyphen between
-        labels = [f"{bin_edges[i]:.1f}–{bin_edges[i+1]:.1f}" for i in range(len(bin_edges)-1)] 
-        radius_df = pd.DataFrame({
-            "Bin": pd.Categorical(labels, categories=labels, ordered=True), 
-            "Count": counts
-            })
-        st.bar_chart(radius_df.set_index("Bin"))
-
+        st.bar_chart(breakdown_chart_data(exoplanets_aggregates.get("radius_histogram", [])))
 
         # --- Host Star Radius Compared to Sun ---
         st.subheader("Host Star Ratio Compared to Sun")
-        star_radii = exoplanets_dataframe["star_radius_solar_radii"].dropna()
-        max_star_radius = min(star_radii.max(), 10)
-        bins = np.arange(0, max_star_radius, 0.5)
-        counts, bin_edges = np.histogram(star_radii, bins=bins)
-        labels = [f"{bin_edges[i]:.1f}–{bin_edges[i+1]:.1f}" for i in range(len(bin_edges)-1)]
-        star_radius_df = pd.DataFrame({
-            "Bin": labels,
-            "Count": counts
-        })
-        st.bar_chart(star_radius_df.set_index("Bin"))
+        st.bar_chart(breakdown_chart_data(exoplanets_aggregates.get("star_radius_histogram", [])))
 
     else:
         st.warning("No exoplanets data available.")
@@ -1,6 +1,7 @@
 from .db_sync import db_sync
-from .data_quality import passed_data_quality_checks
+from .data_quality import run_data_quality_checks
 from .logger import setup_logging
+from .sql_dag import load_sql_nodes, run_sql_dag
 from .data_ingestion import fetch_api_dataframe, query_confirmed_planets, ingest_exoplanets, ingest_API_data
 from .utils import (
     gcs_path_exists,
@@ -10,17 +11,31 @@ from .utils import (
     ducklake_attach_minio,
     ducklake_attach_gcp,
     schema_creation,
-    ducklake_refresh,
+    ducklake_apply_retention,
+    snapshots_to_expire,
     update_data,
     write_data_to_minio,
     add_query_params,
     iso_to_human,
+    iso_duration_seconds_expr,
+    human_duration_expr,
     convert_dataframe_to_parquet,
+    stream_csv_to_parquet,
+    peak_memory_usage,
     preprocess_astronaut_data,
     handle_date_adjustment,
     preprocess_apod_data,
+    preprocess_donki_data,
+    normalize_to_schema,
+    detect_schema_drift,
     write_data_to_gcs,
-    update_catalog_to_gcs
+    update_catalog_to_gcs,
+    read_pipeline_state,
+    write_pipeline_state,
+    record_watermarks,
+    incremental_start_date,
+    compute_content_hash,
+    table_name_from_file
 )
 
 __all__ = [
@@ -29,7 +44,9 @@ __all__ = [
     "ducklake_init",
     "ducklake_attach_gcp",
     "db_sync",
-    "passed_data_quality_checks",
+    "load_sql_nodes",
+    "run_sql_dag",
+    "run_data_quality_checks",
     "fetch_api_dataframe",
     "query_confirmed_planets",
     "ingest_exoplanets",
@@ -38,15 +55,29 @@ __all__ = [
     "execute_SQL_file_list",
     "ducklake_attach_minio",
     "schema_creation",
-    "ducklake_refresh",
+    "ducklake_apply_retention",
+    "snapshots_to_expire",
     "update_data",
     "write_data_to_minio",
     "add_query_params",
     "iso_to_human",
+    "iso_duration_seconds_expr",
+    "human_duration_expr",
     "convert_dataframe_to_parquet",
+    "stream_csv_to_parquet",
+    "peak_memory_usage",
     "preprocess_astronaut_data",
     "handle_date_adjustment",
     "preprocess_apod_data",
+    "preprocess_donki_data",
+    "normalize_to_schema",
+    "detect_schema_drift",
     "write_data_to_gcs",
-    "update_catalog_to_gcs"
+    "update_catalog_to_gcs",
+    "read_pipeline_state",
+    "write_pipeline_state",
+    "record_watermarks",
+    "incremental_start_date",
+    "compute_content_hash",
+    "table_name_from_file"
 ]
\ No newline at end of file
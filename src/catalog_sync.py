@@ -0,0 +1,128 @@
+from src.logger import setup_logging
+from src.object_store import get_gcs_client
+from google.api_core.exceptions import NotFound, NotModified, PreconditionFailed
+import datetime
+import hashlib
+import json
+import os
+from dotenv import load_dotenv
+load_dotenv()
+
+logger = setup_logging()
+
+# Every published catalog is an immutable object under CATALOG_GENERATIONS/; CURRENT.json
+# points at the latest one and is only ever replaced with a generation-match precondition.
+CATALOG_GENERATIONS_PREFIX = "CATALOG_GENERATIONS"
+CATALOG_POINTER_OBJECT = f"{CATALOG_GENERATIONS_PREFIX}/CURRENT.json"
+CATALOG_GENERATIONS_TO_KEEP = int(os.getenv("CATALOG_GENERATIONS_TO_KEEP", "5"))
+
+
+def file_sha256(file_path, chunk_size=1024 * 1024):
+    content_hash = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            content_hash.update(chunk)
+    result = content_hash.hexdigest()
+    return result
+
+
+def read_catalog_pointer(bucket, known_generation=None):
+    """
+    Returns (pointer, pointer_generation) for CURRENT.json, or (None, 0) if nothing has been
+    published. With known_generation the download is conditional and returns (None, known_generation)
+    when the pointer has not changed, so polling costs a single metadata round trip.
+    """
+    pointer_blob = bucket.blob(CATALOG_POINTER_OBJECT)
+    try:
+        if known_generation:
+            pointer_bytes = pointer_blob.download_as_bytes(if_generation_not_match=known_generation)
+        else:
+            pointer_bytes = pointer_blob.download_as_bytes()
+    except NotModified:
+        return None, known_generation
+    except NotFound:
+        return None, 0
+    result = (json.loads(pointer_bytes), pointer_blob.generation)
+    return result
+
+
+def prune_catalog_generations(bucket, keep=CATALOG_GENERATIONS_TO_KEEP):
+    catalog_blobs = sorted(
+        (blob for blob in bucket.list_blobs(prefix=f"{CATALOG_GENERATIONS_PREFIX}/catalog-")),
+        key=lambda blob: blob.name
+    )
+    for blob in catalog_blobs[:-keep]:
+        blob.delete()
+        logger.info(f"Deleted old catalog generation {blob.name}")
+
+
+def publish_catalog(gcp_bucket, catalog_path):
+    """
+    Upload catalog_path as a new immutable catalog generation and move CURRENT.json to it.
+
+    The pointer is replaced only if it still has the generation read at the start, so
+    two concurrent publishers cannot silently overwrite each other: the later one fails
+    with PreconditionFailed and its orphaned upload is removed. Returns the new pointer.
+    """
+    bucket = get_gcs_client().bucket(gcp_bucket)
+    current_pointer, pointer_generation = read_catalog_pointer(bucket)
+    sequence = (current_pointer or {}).get("sequence", 0) + 1
+    object_name = f"{CATALOG_GENERATIONS_PREFIX}/catalog-{sequence:010d}.ducklake"
+
+    catalog_blob = bucket.blob(object_name)
+    catalog_blob.upload_from_filename(catalog_path, if_generation_match=0)
+    pointer = {
+        "sequence": sequence,
+        "object_name": object_name,
+        "sha256": file_sha256(catalog_path),
+        "published_at": datetime.datetime.now(datetime.timezone.utc).isoformat()
+    }
+
+    try:
+        bucket.blob(CATALOG_POINTER_OBJECT).upload_from_string(
+            json.dumps(pointer),
+            content_type="application/json",
+            if_generation_match=pointer_generation
+        )
+    except PreconditionFailed:
+        logger.error(f"Catalog pointer changed while publishing generation {sequence}; another publisher won")
+        catalog_blob.delete()
+        raise
+
+    logger.info(f"Published catalog generation {sequence} as {object_name}")
+    prune_catalog_generations(bucket)
+    return pointer
+
+
+def download_catalog_if_changed(gcp_bucket, local_directory, known_generation=None):
+    """
+    Poll CURRENT.json and, if it moved past known_generation, download the catalog it points at.
+    Returns (pointer_generation, local_catalog_path), or None when nothing changed or
+    nothing has been published yet. The file is verified and renamed into place, so a
+    returned path always holds a complete catalog.
+    """
+    bucket = get_gcs_client().bucket(gcp_bucket)
+    pointer, pointer_generation = read_catalog_pointer(bucket, known_generation)
+    if pointer is None:
+        return None
+
+    os.makedirs(local_directory, exist_ok=True)
+    local_path = os.path.join(local_directory, os.path.basename(pointer["object_name"]))
+    download_path = f"{local_path}.download"
+    bucket.blob(pointer["object_name"]).download_to_filename(download_path)
+    if file_sha256(download_path) != pointer["sha256"]:
+        os.remove(download_path)
+        raise ValueError(f"Downloaded catalog {pointer['object_name']} does not match its published checksum")
+    os.replace(download_path, local_path)
+
+    logger.info(f"Downloaded catalog generation {pointer['sequence']} to {local_path}")
+    result = (pointer_generation, local_path)
+    return result
+
+
+def prune_local_catalogs(local_directory, keep_paths):
+    """Remove downloaded catalogs other than keep_paths."""
+    for file_name in os.listdir(local_directory):
+        file_path = os.path.join(local_directory, file_name)
+        if file_name.startswith("catalog-") and file_path not in keep_paths:
+            os.remove(file_path)
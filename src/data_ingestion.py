@@ -1,64 +1,190 @@
-from src.utils import preprocess_astronaut_data, convert_dataframe_to_parquet, preprocess_apod_data, write_data_to_gcs
+from src.utils import preprocess_astronaut_data, convert_dataframe_to_parquet, preprocess_apod_data, preprocess_donki_data, write_data_to_gcs, compute_content_hash, stream_csv_to_parquet, peak_memory_usage, add_query_params
+from src.http_client import fetch_bytes, read_json_dataframe, read_json_page, get_http_session, HTTP_TIMEOUT_SECONDS
 from src.logger import setup_logging
+from concurrent.futures import ThreadPoolExecutor
 import time
 import os
-import requests
+import tempfile
 from dotenv import load_dotenv
 import polars as pl
+import pyarrow as pa
 from prefect import task
-from astroquery.ipac.nexsci.nasa_exoplanet_archive import NasaExoplanetArchive
 logger = setup_logging()
 
 load_dotenv()
 
+SPACE_DEVS_PAGE_SIZE = int(os.getenv("SPACE_DEVS_PAGE_SIZE", "100"))
+SPACE_DEVS_MAX_CONCURRENCY = int(os.getenv("SPACE_DEVS_MAX_CONCURRENCY", "4"))
+
+def fetch_paginated_dataframe(base_url, page_size=SPACE_DEVS_PAGE_SIZE, max_concurrency=SPACE_DEVS_MAX_CONCURRENCY):
+    """
+    Fetch every page of a limit/offset paginated API (count, next, results) into one frame.
+    The first page gives the total count; the remaining pages are then fetched concurrently,
+    at most max_concurrency at a time. Without a count, next links are followed one by one.
+    """
+    def fetch_page(page_url):
+        result = read_json_page(fetch_bytes(page_url))
+        return result
+
+    first_records, first_metadata = fetch_page(add_query_params(base_url, {"limit": page_size, "offset": 0}))
+    total_count = first_metadata.get("count")
+    pages = [first_records]
+
+    if total_count is None:
+        next_url = first_metadata.get("next")
+        while next_url:
+            records, metadata = fetch_page(next_url)
+            pages.append(records)
+            next_url = metadata.get("next")
+    else:
+        # the API may cap limit below what was asked for; step by what it actually returned
+        if 0 < first_records.height < min(page_size, total_count):
+            page_size = first_records.height
+        page_urls = [
+            add_query_params(base_url, {"limit": page_size, "offset": offset})
+            for offset in range(page_size, total_count, page_size)
+        ]
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            pages.extend(records for records, metadata in executor.map(fetch_page, page_urls))
+
+    pages = [page for page in pages if not page.is_empty()]
+    if not pages:
+        result = pl.DataFrame()
+        return result
+    # pages infer their schemas independently, so nulls in one page are relaxed to the other pages' types
+    result = pl.concat(pages, how="diagonal_relaxed")
+    logger.info(f"Fetched {result.height} of {total_count} records from {base_url.split('?')[0]} in {len(pages)} pages")
+    return result
+
 def fetch_api_dataframe(base_url):
     astro_base_url = os.getenv("THE_SPACE_DEVS_API")
     apod_base_url = os.getenv("NASA_APOD_API")
+    donki_base_url = os.getenv("NASA_DONKI_API")
 
-    response = requests.get(base_url)
-    response.raise_for_status()
-    data = response.json()
-    if astro_base_url not in base_url and apod_base_url not in base_url:
-        result = pl.DataFrame(data)
+    if donki_base_url and donki_base_url in base_url:
+        donki_dataframe = read_json_dataframe(fetch_bytes(base_url))
+        result = preprocess_donki_data(donki_dataframe)
+        return result
+    elif astro_base_url not in base_url and apod_base_url not in base_url:
+        result = read_json_dataframe(fetch_bytes(base_url))
         return result
     elif astro_base_url in base_url:
-        astronauts_dataframe = pl.DataFrame(data["results"])
+        astronauts_dataframe = fetch_paginated_dataframe(base_url)
+        if astronauts_dataframe.is_empty():
+            return astronauts_dataframe
         processed_astronaut_dataframe = preprocess_astronaut_data(astronauts_dataframe)
         result = processed_astronaut_dataframe
         return result
     else:
-        apod_dataframe = pl.DataFrame(data)
+        apod_dataframe = read_json_dataframe(fetch_bytes(base_url))
         preprocessed_apod_dataframe = preprocess_apod_data(apod_dataframe)
         result = preprocessed_apod_dataframe
         return result
    
 
-def query_confirmed_planets():
+EXOPLANET_ARCHIVE_TAP_URL = os.getenv("EXOPLANET_ARCHIVE_TAP_URL", "https://exoplanetarchive.ipac.caltech.edu/TAP/sync")
+EXOPLANET_SPOOL_MAX_BYTES = int(os.getenv("EXOPLANET_SPOOL_MAX_BYTES", str(64 * 1024 * 1024)))
+EXOPLANET_CSV_BLOCK_BYTES = int(os.getenv("EXOPLANET_CSV_BLOCK_BYTES", str(8 * 1024 * 1024)))
+
+# columns read by SQL/staging/STAGED_NASA_EXOPLANETS.sql, plus rowupdate for incremental syncs;
+# types are fixed up front so every streamed block parses to the same schema
+EXOPLANET_COLUMNS = {
+    "pl_name": pa.string(),
+    "pl_letter": pa.string(),
+    "hostname": pa.string(),
+    "sy_dist": pa.float64(),
+    "disc_year": pa.int64(),
+    "pl_controv_flag": pa.int64(),
+    "discoverymethod": pa.string(),
+    "disc_facility": pa.string(),
+    "disc_instrument": pa.string(),
+    "pl_orbper": pa.float64(),
+    "pl_rade": pa.float64(),
+    "st_rad": pa.float64(),
+    "pl_orbsmax": pa.float64(),
+    "rowupdate": pa.string()
+}
+
+def query_confirmed_planets(updated_since=None):
+    """
+    Query pscomppars for the columns the pipeline uses and stream the CSV response
+    through Arrow into parquet row groups, without materialising the whole table.
+    With updated_since (a date) only rows whose rowupdate is on or after it are returned.
+
+    Returns a SpooledTemporaryFile positioned at 0; it spills to disk above
+    EXOPLANET_SPOOL_MAX_BYTES and must be closed by the caller.
+    """
+    tick = time.time()
+    logger.info("Querying confirmed exoplanets from NASA Exoplanet Archive")
+    query = f"select {','.join(EXOPLANET_COLUMNS)} from pscomppars"
+    if updated_since:
+        query += f" where rowupdate >= '{updated_since.strftime('%Y-%m-%d')}'"
+
+    exoplanets_parquet_file = tempfile.SpooledTemporaryFile(max_size=EXOPLANET_SPOOL_MAX_BYTES)
     try:
-        tick = time.time()
-        logger.info("Querying confirmed exoplanets from NASA Exoplanet Archive")
-        target_table = "pscomppars"
-        all_planets = NasaExoplanetArchive.query_criteria(table=target_table, select="*")
-        tock = time.time()
-        logger.info(f"Query completed in {tock - tick:.2f} seconds")
-        planets_df = all_planets.to_pandas()
-        exoplanets_dataframe = pl.from_pandas(planets_df)
-        exoplanets_parquet_buffer = convert_dataframe_to_parquet(exoplanets_dataframe)
-        return exoplanets_parquet_buffer
+        with get_http_session().get(
+            EXOPLANET_ARCHIVE_TAP_URL,
+            params={"query": query, "format": "csv"},
+            stream=True,
+            timeout=HTTP_TIMEOUT_SECONDS
+        ) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            row_count = stream_csv_to_parquet(
+                response.raw, EXOPLANET_COLUMNS, exoplanets_parquet_file, EXOPLANET_CSV_BLOCK_BYTES
+            )
     except Exception as e:
+        exoplanets_parquet_file.close()
         logger.error(f"Query failed: {e}")
+        raise
+
+    tock = time.time()
+    logger.info(f"Query completed in {tock - tick:.2f} seconds ({row_count} rows)")
+    result = exoplanets_parquet_file
+    return result
+
+def upload_if_changed(parquet_buffer, output_file_name, previous_hash=None):
+    """
+    Fingerprint the parquet buffer and upload it to RAW_DATA only if it differs from
+    the previous run's hash. Returns (content_hash, changed).
+    """
+    content_hash = compute_content_hash(parquet_buffer)
+    if content_hash == previous_hash:
+        logger.info(f"{output_file_name} is unchanged since the last run, skipping upload")
+        return content_hash, False
+
+    logger.info(f"Writing {output_file_name} to Cloud Storage")
+    write_data_to_gcs(parquet_buffer, output_file_name, "RAW_DATA")
+    return content_hash, True
 
 @task(name="exoplanet_data_ingestion")
-def ingest_exoplanets(output_file_name): 
-    exoplanets_parquet_buffer = query_confirmed_planets()
-    logger.info("Writing Exoplanets Data to Cloud Storage")
-    write_data_to_gcs(exoplanets_parquet_buffer, output_file_name, "RAW_DATA")
+def ingest_exoplanets(output_file_name, updated_since=None, previous_hash=None): 
+    tick = time.time()
+    with query_confirmed_planets(updated_since) as exoplanets_parquet_file:
+        content_hash, changed = upload_if_changed(exoplanets_parquet_file, output_file_name, previous_hash)
+    tock = time.time() - tick
+    memory_usage = peak_memory_usage()
+    logger.info(
+        f"Ingestion of {output_file_name} completed in {tock:.2f} seconds "
+        f"(peak RSS {memory_usage['peak_rss_mib']:.1f} MiB, peak Arrow {memory_usage['peak_arrow_mib']:.1f} MiB)"
+    )
+    result = {"file_name": output_file_name, "seconds": tock, "content_hash": content_hash, "changed": changed, **memory_usage}
+    return result
 
 
 @task(name="api_data_ingestion")
-def ingest_API_data(API_url, output_file_name):
+def ingest_API_data(API_url, output_file_name, previous_hash=None):
+    tick = time.time()
     logger.info("Fetching Data from API")
     api_dataframe = fetch_api_dataframe(API_url)
+    if api_dataframe.is_empty():
+        # e.g. an incremental DONKI window with no new notifications
+        logger.info(f"No records returned for {output_file_name}, skipping upload")
+        result = {"file_name": output_file_name, "seconds": time.time() - tick, "content_hash": previous_hash, "changed": False}
+        return result
     api_parquet_buffer = convert_dataframe_to_parquet(api_dataframe)
-    logger.info("Writing API Data to Cloud Storage")
-    write_data_to_gcs(api_parquet_buffer, output_file_name, "RAW_DATA")
+    content_hash, changed = upload_if_changed(api_parquet_buffer, output_file_name, previous_hash)
+    tock = time.time() - tick
+    logger.info(f"Ingestion of {output_file_name} completed in {tock:.2f} seconds")
+    result = {"file_name": output_file_name, "seconds": tock, "content_hash": content_hash, "changed": changed}
+    return result
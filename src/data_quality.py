@@ -1,55 +1,151 @@
 from src.logger import setup_logging
-from src.utils import duckdb_con_init, ducklake_init, ducklake_attach_minio
-import os
-current_path = os.path.dirname(os.path.abspath(__file__))
-parent_path = os.path.abspath(os.path.join(current_path, ".."))
-
 
 logger = setup_logging()
 
-def passed_data_quality_checks():
-    logger.info("Starting Data Quality Checks")
-    data_path = os.path.join(parent_path, "data")
-    catalog_path = os.path.join(parent_path, "catalog.ducklake")
-
-    con = duckdb_con_init()
-    ducklake_init(con, data_path, catalog_path)
-    ducklake_attach_minio(con)
-
-    data_quality_queries = [
-        "SQL/data_quality/QUALITY_ASTRONAUTS.sql",
-        "SQL/data_quality/QUALITY_NASA_APOD.sql",
-        "SQL/data_quality/QUALITY_NASA_EXOPLANETS.sql",
-        "SQL/data_quality/QUALITY_NASA_DONKI.sql"
-    ]
-
-    all_pass = True
-    details = {} # used only for debug details
-
-    for rel_path in data_quality_queries:
-        full_path = os.path.join(parent_path, rel_path)
-        logger.info(f"Running data quality SQL for: {rel_path}")
-        with open(full_path, "r") as file:
-            data_quality_query = file.read()
-
-        try:
-            response = con.execute(data_quality_query)
-            # fetchall will return [] for non-selects or selects with 0 rows
-            rows = response.fetchall()
-            if rows:
-                logger.error(f"Data quality FAILED for {rel_path}: {len(rows)} row(s) returned")
-                details[rel_path] = {"passed": False, "rows": rows}
-                all_pass = False
-            else:
-                logger.info(f"Data quality passed for {rel_path}")
-                details[rel_path] = {"passed": True, "rows": []}
-        except Exception as e:
-            logger.error(f"Error executing {rel_path}: {e}")
-            con.close()
-
-    try:
-        con.close()
-    except Exception as e:
-        logger.warning(f"Failed to close DuckDB connection: {e}")
-
-    return all_pass
\ No newline at end of file
+# Declarative rules per STAGED table.
+#   not_null: columns that must never be NULL
+#   not_all_null: columns that must not all be NULL in the same row
+#   unique: columns whose non-NULL values must be distinct
+#   ranges: column -> (min, max), either bound may be None
+#   max_row_count_drop: largest allowed fractional drop in rows versus the last passing run
+# The tables carry the checks of the former SQL/data_quality files.
+DATA_QUALITY_RULES = {
+    "STAGED.ASTRONAUTS": {
+        "not_all_null": ["name", "agency"]
+    },
+    "STAGED.NASA_APOD": {
+        "not_null": ["title"]
+    },
+    "STAGED.NASA_DONKI": {
+        "not_all_null": ["message_id", "message_type", "message_issue_time_human_readable", "message_body"]
+    },
+    "STAGED.NASA_EXOPLANETS": {
+        "not_null": ["planet_name"]
+    }
+}
+
+def range_violation_predicate(column, bounds):
+    minimum, maximum = bounds
+    conditions = []
+    if minimum is not None:
+        conditions.append(f'"{column}" < {minimum}')
+    if maximum is not None:
+        conditions.append(f'"{column}" > {maximum}')
+    result = " OR ".join(conditions)
+    return result
+
+
+def compile_quality_checks(table_name, rules):
+    """
+    Turn a table's rules into a list of checks, each with the aggregate expression that
+    counts its violations and the predicate used to sample violating rows.
+    """
+    checks = []
+    for column in rules.get("not_null", []):
+        checks.append({
+            "rule": "not_null",
+            "column": column,
+            "count_expression": f'count(*) FILTER (WHERE "{column}" IS NULL)',
+            "violation_predicate": f'"{column}" IS NULL'
+        })
+    if rules.get("not_all_null"):
+        columns = rules["not_all_null"]
+        predicate = " AND ".join(f'"{column}" IS NULL' for column in columns)
+        checks.append({
+            "rule": "not_all_null",
+            "column": ", ".join(columns),
+            "count_expression": f"count(*) FILTER (WHERE {predicate})",
+            "violation_predicate": predicate
+        })
+    for column in rules.get("unique", []):
+        checks.append({
+            "rule": "unique",
+            "column": column,
+            "count_expression": f'count("{column}") - count(DISTINCT "{column}")',
+            "violation_predicate": f'"{column}" IN (SELECT "{column}" FROM {table_name} GROUP BY "{column}" HAVING count(*) > 1)'
+        })
+    for column, bounds in rules.get("ranges", {}).items():
+        predicate = range_violation_predicate(column, bounds)
+        checks.append({
+            "rule": "range",
+            "column": column,
+            "count_expression": f"count(*) FILTER (WHERE {predicate})",
+            "violation_predicate": predicate
+        })
+    return checks
+
+
+def compile_quality_query(table_name, checks):
+    """One aggregate scan returning the row count followed by a violation count per check."""
+    select_list = ["count(*) AS row_count"]
+    for check_index, check in enumerate(checks):
+        select_list.append(f"{check['count_expression']} AS check_{check_index}")
+    result = f"SELECT {', '.join(select_list)} FROM {table_name}"
+    return result
+
+
+def run_data_quality_checks(con, tables=None, previous_row_counts=None, sample_size=5, rules_by_table=None):
+    """
+    Evaluate DATA_QUALITY_RULES (or rules_by_table) on the caller's DuckLake connection.
+
+    Every table is checked with a single aggregate query that returns counts, not rows;
+    up to sample_size violating rows are fetched only for checks that failed.
+    Returns {table_name: report} where report holds passed, row_count and checks.
+    """
+    previous_row_counts = previous_row_counts or {}
+    rules_by_table = rules_by_table or DATA_QUALITY_RULES
+    reports = {}
+
+    for table_name, rules in rules_by_table.items():
+        if tables is not None and table_name not in tables:
+            continue
+
+        logger.info(f"Running data quality checks for: {table_name}")
+        checks = compile_quality_checks(table_name, rules)
+        counts = con.execute(compile_quality_query(table_name, checks)).fetchone()
+        row_count = counts[0]
+
+        check_results = []
+        for check, violations in zip(checks, counts[1:]):
+            check_result = {
+                "rule": check["rule"],
+                "column": check["column"],
+                "violations": violations,
+                "passed": violations == 0,
+                "samples": []
+            }
+            if violations:
+                sample_cursor = con.execute(
+                    f"SELECT * FROM {table_name} WHERE {check['violation_predicate']} LIMIT {sample_size}"
+                )
+                sample_columns = [description[0] for description in sample_cursor.description]
+                check_result["samples"] = [dict(zip(sample_columns, row)) for row in sample_cursor.fetchall()]
+            check_results.append(check_result)
+
+        previous_row_count = previous_row_counts.get(table_name)
+        max_row_count_drop = rules.get("max_row_count_drop")
+        if max_row_count_drop is not None and previous_row_count:
+            minimum_row_count = previous_row_count * (1 - max_row_count_drop)
+            check_results.append({
+                "rule": "row_count_drop",
+                "column": None,
+                "violations": max(0, round(minimum_row_count - row_count)),
+                "passed": row_count >= minimum_row_count,
+                "samples": [],
+                "previous_row_count": previous_row_count
+            })
+
+        table_passed = all(check_result["passed"] for check_result in check_results)
+        reports[table_name] = {"passed": table_passed, "row_count": row_count, "checks": check_results}
+
+        if table_passed:
+            logger.info(f"Data quality passed for {table_name} ({row_count} rows)")
+        else:
+            failed_checks = [
+                f"{check_result['rule']}({check_result['column']}): {check_result['violations']}"
+                for check_result in check_results if not check_result["passed"]
+            ]
+            logger.error(f"Data quality FAILED for {table_name}: {', '.join(failed_checks)}")
+
+    return reports
+
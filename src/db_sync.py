@@ -1,7 +1,8 @@
 from src.logger import setup_logging
 import os
-from src.utils import duckdb_con_init, ducklake_init, ducklake_refresh, execute_SQL_file_list, update_data, ducklake_attach_gcp, gcs_path_exists, update_catalog_to_gcs
-from src.data_quality import passed_data_quality_checks
+from src.utils import duckdb_con_init, ducklake_init, ducklake_apply_retention, schema_creation, update_data, ducklake_attach_gcp, gcs_path_exists, update_catalog_to_gcs, record_watermarks, read_pipeline_state, write_pipeline_state
+from src.sql_dag import load_sql_nodes, run_sql_dag
+from src.data_quality import run_data_quality_checks
 from dotenv import load_dotenv
 from prefect import task
 current_path = os.path.dirname(os.path.abspath(__file__))
@@ -11,9 +12,16 @@ load_dotenv()
 
 logger = setup_logging()
 
+SQL_DAG_MAX_WORKERS = int(os.getenv("SQL_DAG_MAX_WORKERS", "4"))
+
 @task(name="database_sync")
-def db_sync():
-    logger.info("Starting Orbital database sync")
+def db_sync(full_refresh_tables=(), changed_tables=None):
+    """
+    Loads RAW_DATA and rebuilds STAGED/CLEANED, plus the AGGREGATES summaries of the CLEANED tables.
+    changed_tables limits the work to those source tables and their downstream tables;
+    None rebuilds everything.
+    """
+    logger.info(f"Starting Orbital database sync (changed tables: {changed_tables or 'all'})")
     gcp_bucket = os.getenv('GCP_BUCKET_NAME')
     data_path = f"gs://{gcp_bucket}/CATALOG_DATA_SNAPSHOTS"
     catalog_path = os.path.join(parent_path, "catalog.ducklake")
@@ -21,35 +29,47 @@ def db_sync():
     con = duckdb_con_init()
     ducklake_init(con, data_path, catalog_path)
     ducklake_attach_gcp(con)
-    update_data(con, logger, gcp_bucket, "RAW_DATA", storage_type="s3")
-    ducklake_refresh(con)
-
-    staged_queries = [
-        'SQL/staging/STAGED_ASTRONAUTS.sql',
-        'SQL/staging/STAGED_NASA_APOD.sql',
-        'SQL/staging/STAGED_NASA_DONKI.sql',
-        'SQL/staging/STAGED_NASA_EXOPLANETS.sql'
-    ]
-
-    cleaned_queries = [
-        'SQL/cleaned_aggregation/CLEANED_ASTRONAUTS.sql',
-        'SQL/cleaned_aggregation/CLEANED_NASA_APOD.sql',
-        'SQL/cleaned_aggregation/CLEANED_NASA_DONKI.sql',
-        'SQL/cleaned_aggregation/CLEANED_NASA_EXOPLANETS.sql'
-    ]
-
-    execute_SQL_file_list(con, staged_queries)
-    ducklake_refresh(con)
+    # idempotent; picks up schemas added since the lakehouse was set up
+    schema_creation(con)
+    update_data(con, logger, gcp_bucket, "RAW_DATA", storage_type="s3", full_refresh_tables=full_refresh_tables, tables=changed_tables)
+    # sources that failed or did not change keep their stored watermark
+    record_watermarks(con, tables=changed_tables)
+
+    # table dependencies are read from the SQL itself; independent lineages build in parallel
+    staged_nodes = load_sql_nodes(["SQL/staging"])
+    # aggregates depend on CLEANED tables, so they are built in the same DAG right after them
+    cleaned_nodes = load_sql_nodes(["SQL/cleaned_aggregation", "SQL/aggregates"])
+    changed_raw_tables = None
+    if changed_tables is not None:
+        changed_raw_tables = [f"RAW_DATA.{table_name}" for table_name in changed_tables]
+
+    staged_timings = run_sql_dag(con, staged_nodes, changed_raw_tables, max_workers=SQL_DAG_MAX_WORKERS)
+    logger.info(f"Staging timings (seconds): {staged_timings}")
 
     staged_dir = f"gs://{gcp_bucket}/CATALOG_DATA_SNAPSHOTS/STAGED"
-    if gcs_path_exists(staged_dir):
-        if passed_data_quality_checks():
-            execute_SQL_file_list(con, cleaned_queries)
-            ducklake_refresh(con)
-        else:
-            logger.warning("Data quality checks failed. Continuing to use most recent successful data.")
-            pass
-    
+    passed_tables = []
+    failed_tables = []
+    if staged_timings and gcs_path_exists(staged_dir):
+        # each lineage is gated on its own STAGED table, so one failing source does not hold back the others
+        row_counts = read_pipeline_state("dq_row_counts", {})
+        quality_reports = run_data_quality_checks(con, tables=list(staged_timings), previous_row_counts=row_counts)
+        passed_tables = [table_name for table_name, report in quality_reports.items() if report["passed"]]
+        failed_tables = [table_name for table_name, report in quality_reports.items() if not report["passed"]]
+        if failed_tables:
+            logger.warning(f"Data quality checks failed for {failed_tables}. Continuing to use most recent successful data for them.")
+        for table_name in passed_tables:
+            row_counts[table_name] = quality_reports[table_name]["row_count"]
+
+    # runs even without passed tables, so CLEANED/AGGREGATES tables that do not exist yet are still built
+    cleaned_timings = run_sql_dag(
+        con, cleaned_nodes, passed_tables, max_workers=SQL_DAG_MAX_WORKERS, blocked_tables=failed_tables
+    )
+    logger.info(f"Cleaned timings (seconds): {cleaned_timings}")
+    if passed_tables:
+        write_pipeline_state("dq_row_counts", row_counts)
+
+    # expiry and file cleanup run once, after every phase has committed its snapshots
+    ducklake_apply_retention(con)
     con.close()
     logger.info("Database connection closed")
     update_catalog_to_gcs(gcp_bucket,catalog_path)
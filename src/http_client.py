@@ -0,0 +1,224 @@
+from src.logger import setup_logging
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from requests.adapters import HTTPAdapter
+import datetime
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import polars as pl
+import requests
+from dotenv import load_dotenv
+load_dotenv()
+current_path = os.path.dirname(os.path.abspath(__file__))
+parent_path = os.path.abspath(os.path.join(current_path, ".."))
+
+logger = setup_logging()
+
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", os.path.join(parent_path, ".cache", "http"))
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "30"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "5"))
+HTTP_BACKOFF_SECONDS = float(os.getenv("HTTP_BACKOFF_SECONDS", "1"))
+# a Retry-After longer than this is treated as a hard failure instead of stalling the flow
+HTTP_MAX_RETRY_AFTER_SECONDS = float(os.getenv("HTTP_MAX_RETRY_AFTER_SECONDS", "300"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+# URLs with moving date windows (e.g. DONKI) create a new entry per run, so old entries are evicted
+HTTP_CACHE_MAX_AGE_DAYS = float(os.getenv("HTTP_CACHE_MAX_AGE_DAYS", "7"))
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# astronaut pages and the source tasks write the cache from several threads
+_eviction_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def get_http_session():
+    """One pooled session per process so connections to each API are reused across requests."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    result = session
+    return result
+
+
+def retry_after_seconds(header_value, now=None):
+    """Seconds to wait from a Retry-After header given as delta-seconds or an HTTP date; None if absent or unparseable."""
+    if not header_value:
+        return None
+    header_value = header_value.strip()
+    if header_value.isdigit():
+        result = float(header_value)
+        return result
+    try:
+        retry_at = parsedate_to_datetime(header_value)
+    except (TypeError, ValueError):
+        return None
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    result = max(0.0, (retry_at - now).total_seconds())
+    return result
+
+
+def cached_response_paths(url):
+    # the key is hashed so API keys in query strings never end up in file names
+    cache_key = hashlib.sha256(url.encode()).hexdigest()
+    result = (os.path.join(HTTP_CACHE_DIR, f"{cache_key}.json"), os.path.join(HTTP_CACHE_DIR, f"{cache_key}.body"))
+    return result
+
+
+def read_cached_response(url):
+    """Returns (validators, body) for a previously cached response, or None."""
+    metadata_path, body_path = cached_response_paths(url)
+    try:
+        with open(metadata_path, "r") as file:
+            validators = json.load(file)
+        with open(body_path, "rb") as file:
+            body = file.read()
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    result = (validators, body)
+    return result
+
+
+def touch_cached_response(url):
+    """Mark a revalidated entry as recently used so eviction keeps it."""
+    for path in cached_response_paths(url):
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+def evict_cached_responses(max_age_days=HTTP_CACHE_MAX_AGE_DAYS, max_bytes=HTTP_CACHE_MAX_BYTES, now=None):
+    """
+    Remove cache entries not used for max_age_days, then the least recently used ones
+    until the cache fits in max_bytes. Returns the number of entries removed.
+    """
+    now = now or time.time()
+    with _eviction_lock:
+        result = _evict_cached_responses(max_age_days, max_bytes, now)
+    return result
+
+def _evict_cached_responses(max_age_days, max_bytes, now):
+    entries = {}
+    for file_name in os.listdir(HTTP_CACHE_DIR):
+        cache_key, extension = os.path.splitext(file_name)
+        if extension not in (".json", ".body"):
+            continue
+        try:
+            file_stat = os.stat(os.path.join(HTTP_CACHE_DIR, file_name))
+        except FileNotFoundError:
+            # removed by another process since listdir
+            continue
+        last_used, size_bytes = entries.get(cache_key, (0, 0))
+        entries[cache_key] = (max(last_used, file_stat.st_mtime), size_bytes + file_stat.st_size)
+
+    total_bytes = sum(size_bytes for last_used, size_bytes in entries.values())
+    evicted = 0
+    for cache_key, (last_used, size_bytes) in sorted(entries.items(), key=lambda entry: entry[1][0]):
+        if now - last_used <= max_age_days * 86400 and total_bytes <= max_bytes:
+            break
+        for extension in (".json", ".body"):
+            try:
+                os.remove(os.path.join(HTTP_CACHE_DIR, f"{cache_key}{extension}"))
+            except FileNotFoundError:
+                pass
+        total_bytes -= size_bytes
+        evicted += 1
+    if evicted:
+        logger.info(f"Evicted {evicted} HTTP cache entries")
+    return evicted
+
+def write_cached_response(url, validators, body):
+    os.makedirs(HTTP_CACHE_DIR, exist_ok=True)
+    metadata_path, body_path = cached_response_paths(url)
+    # body first, so validators never point at a missing or partial body
+    with open(f"{body_path}.tmp", "wb") as file:
+        file.write(body)
+    os.replace(f"{body_path}.tmp", body_path)
+    with open(f"{metadata_path}.tmp", "w") as file:
+        json.dump(validators, file)
+    os.replace(f"{metadata_path}.tmp", metadata_path)
+    evict_cached_responses()
+
+
+def fetch_bytes(url, params=None, use_cache=True):
+    """
+    GET url and return the response body as bytes.
+
+    Uses the shared session and a timeout, retries connection errors and 429/5xx
+    responses with exponential backoff (honouring Retry-After), and revalidates
+    responses cached on disk with If-None-Match / If-Modified-Since.
+    """
+    request_url = requests.Request("GET", url, params=params).prepare().url
+    cached_response = read_cached_response(request_url) if use_cache else None
+    headers = {}
+    if cached_response:
+        validators, cached_body = cached_response
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+    session = get_http_session()
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        try:
+            response = session.get(request_url, headers=headers, timeout=HTTP_TIMEOUT_SECONDS)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt == HTTP_MAX_RETRIES:
+                raise
+            delay_seconds = HTTP_BACKOFF_SECONDS * 2 ** attempt
+            logger.warning(f"Request failed ({e}), retrying in {delay_seconds:.1f} seconds")
+            time.sleep(delay_seconds)
+            continue
+
+        if response.status_code == 304 and cached_response:
+            logger.info(f"Response not modified, using cached body ({len(cached_body)} bytes)")
+            touch_cached_response(request_url)
+            return cached_body
+
+        if response.status_code in RETRY_STATUS_CODES and attempt < HTTP_MAX_RETRIES:
+            delay_seconds = retry_after_seconds(response.headers.get("Retry-After"))
+            if delay_seconds is None:
+                delay_seconds = HTTP_BACKOFF_SECONDS * 2 ** attempt
+            if delay_seconds <= HTTP_MAX_RETRY_AFTER_SECONDS:
+                logger.warning(f"HTTP {response.status_code} from API, retrying in {delay_seconds:.1f} seconds")
+                time.sleep(delay_seconds)
+                continue
+
+        response.raise_for_status()
+        body = response.content
+        validators = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+        if use_cache and (validators["etag"] or validators["last_modified"]):
+            write_cached_response(request_url, validators, body)
+        return body
+
+
+def read_json_page(body, records_field="results"):
+    """
+    Parse one page of a paginated JSON API. Returns (records, metadata) where metadata
+    holds the page's other top-level fields (e.g. count and next).
+    """
+    page = pl.read_json(io.BytesIO(body), infer_schema_length=None)
+    metadata = page.drop(records_field).row(0, named=True)
+    if page[records_field].list.len()[0] == 0:
+        records = pl.DataFrame()
+    else:
+        records = page.select(pl.col(records_field).explode()).unnest(records_field)
+    return records, metadata
+
+
+def read_json_dataframe(body, records_field=None):
+    """
+    Parse a JSON body straight into polars. records_field selects a list of records
+    nested in a top-level object (e.g. "results" for paginated APIs).
+    """
+    if not body.strip():
+        result = pl.DataFrame()
+        return result
+    if records_field is not None:
+        result, metadata = read_json_page(body, records_field)
+        return result
+    result = pl.read_json(io.BytesIO(body), infer_schema_length=None)
+    return result
@@ -0,0 +1,184 @@
+from src.logger import setup_logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from google.cloud import storage
+from minio import Minio
+from requests.adapters import HTTPAdapter
+import io
+import math
+import os
+import threading
+import time
+import urllib3
+import uuid
+from dotenv import load_dotenv
+load_dotenv()
+
+logger = setup_logging()
+
+# GCS resumable chunks must be a multiple of 256 KiB
+GCS_UPLOAD_CHUNK_BYTES = int(os.getenv("GCS_UPLOAD_CHUNK_BYTES", str(8 * 1024 * 1024)))
+# objects at least this large are uploaded as parallel parts
+OBJECT_STORE_PARALLEL_THRESHOLD_BYTES = int(os.getenv("OBJECT_STORE_PARALLEL_THRESHOLD_BYTES", str(64 * 1024 * 1024)))
+OBJECT_STORE_PART_BYTES = int(os.getenv("OBJECT_STORE_PART_BYTES", str(16 * 1024 * 1024)))
+OBJECT_STORE_MAX_WORKERS = int(os.getenv("OBJECT_STORE_MAX_WORKERS", "4"))
+OBJECT_STORE_PART_RETRIES = int(os.getenv("OBJECT_STORE_PART_RETRIES", "3"))
+# a single GCS compose request accepts at most 32 source objects
+GCS_MAX_COMPOSE_PARTS = 32
+MIB = 1024 * 1024
+
+
+@lru_cache(maxsize=None)
+def get_gcs_client():
+    """One GCS client per process, with a connection pool large enough for parallel part uploads."""
+    client = storage.Client(project=os.getenv("GCP_PROJECT_NAME"))
+    adapter = HTTPAdapter(pool_connections=OBJECT_STORE_MAX_WORKERS, pool_maxsize=OBJECT_STORE_MAX_WORKERS * 2)
+    client._http.mount("https://", adapter)
+    result = client
+    return result
+
+
+@lru_cache(maxsize=None)
+def get_minio_client():
+    """One MinIO client per process; urllib3 retries failed requests, including individual parts."""
+    http_client = urllib3.PoolManager(
+        maxsize=OBJECT_STORE_MAX_WORKERS * 2,
+        retries=urllib3.Retry(
+            total=OBJECT_STORE_PART_RETRIES,
+            backoff_factor=0.5,
+            status_forcelist=[500, 502, 503, 504]
+        )
+    )
+    result = Minio(
+        os.getenv("MINIO_EXTERNAL_URL"),
+        access_key=os.getenv("MINIO_ACCESS_KEY"),
+        secret_key=os.getenv("MINIO_SECRET_KEY"),
+        secure=False,
+        http_client=http_client
+    )
+    return result
+
+
+def object_path(object_name, folder_name=None):
+    if folder_name:
+        result = f"{folder_name.strip('/')}/{object_name}"
+        return result
+    return object_name
+
+
+def file_object_size(file_object):
+    """Size of a seekable file-like object; the position is reset to 0."""
+    file_object.seek(0, io.SEEK_END)
+    result = file_object.tell()
+    file_object.seek(0)
+    return result
+
+
+def plan_upload_parts(object_size, part_size, max_parts=GCS_MAX_COMPOSE_PARTS):
+    """Split object_size bytes into (offset, length) parts of at least part_size, using at most max_parts."""
+    part_size = max(part_size, math.ceil(object_size / max_parts))
+    result = [(offset, min(part_size, object_size - offset)) for offset in range(0, object_size, part_size)]
+    return result
+
+
+def upload_part_with_retry(upload_part, part_number, retries=OBJECT_STORE_PART_RETRIES):
+    """Call upload_part(), retrying only this part with exponential backoff."""
+    for attempt in range(retries + 1):
+        try:
+            result = upload_part()
+            return result
+        except Exception as e:
+            if attempt == retries:
+                raise
+            backoff_seconds = 2 ** attempt
+            logger.warning(f"Upload of part {part_number} failed ({e}), retrying in {backoff_seconds} seconds")
+            time.sleep(backoff_seconds)
+
+
+def gcs_parallel_composite_upload(bucket, blob, file_object, object_size, content_type):
+    """
+    Upload file_object as parts in parallel, then compose them into blob.
+    Parts are read from the shared file object one at a time, so at most
+    OBJECT_STORE_MAX_WORKERS parts are held in memory.
+    """
+    parts = plan_upload_parts(object_size, OBJECT_STORE_PART_BYTES)
+    part_prefix = f"{blob.name}.parts/{uuid.uuid4().hex}"
+    part_blobs = [bucket.blob(f"{part_prefix}/{part_number:05d}") for part_number in range(len(parts))]
+    read_lock = threading.Lock()
+
+    def upload_part(part_number):
+        offset, length = parts[part_number]
+        with read_lock:
+            file_object.seek(offset)
+            part_bytes = file_object.read(length)
+
+        def send():
+            part_blobs[part_number].upload_from_file(io.BytesIO(part_bytes), size=length)
+
+        upload_part_with_retry(send, part_number)
+
+    try:
+        with ThreadPoolExecutor(max_workers=OBJECT_STORE_MAX_WORKERS) as executor:
+            list(executor.map(upload_part, range(len(parts))))
+        blob.content_type = content_type
+        blob.compose(part_blobs)
+    finally:
+        for part_blob in part_blobs:
+            try:
+                part_blob.delete()
+            except Exception as e:
+                logger.warning(f"Failed to delete upload part {part_blob.name}: {e}")
+    result = len(parts)
+    return result
+
+
+def write_object(file_object, object_name, folder_name=None, backend="gcs", bucket_name=None, content_type="application/x-parquet"):
+    """
+    Stream a seekable file-like object to object storage without copying it.
+
+    backend is "gcs" or "minio"; bucket_name defaults to GCP_BUCKET_NAME for GCS.
+    GCS objects up to GCS_UPLOAD_CHUNK_BYTES go in a single request, larger ones as a
+    chunked resumable upload, and objects above OBJECT_STORE_PARALLEL_THRESHOLD_BYTES as
+    parallel parts composed into the final object. MinIO uploads use S3 multipart with
+    OBJECT_STORE_PART_BYTES parts sent in parallel.
+    """
+    full_object_name = object_path(object_name, folder_name)
+    object_size = file_object_size(file_object)
+    tick = time.time()
+
+    match backend:
+        case "gcs":
+            bucket = get_gcs_client().bucket(bucket_name or os.getenv("GCP_BUCKET_NAME"))
+            blob = bucket.blob(full_object_name)
+            if object_size >= OBJECT_STORE_PARALLEL_THRESHOLD_BYTES:
+                part_count = gcs_parallel_composite_upload(bucket, blob, file_object, object_size, content_type)
+                upload_method = f"parallel composite, {part_count} parts"
+            else:
+                if object_size > GCS_UPLOAD_CHUNK_BYTES:
+                    blob.chunk_size = GCS_UPLOAD_CHUNK_BYTES
+                    upload_method = "resumable"
+                else:
+                    upload_method = "single request"
+                blob.upload_from_file(file_object, size=object_size, content_type=content_type)
+        case "minio":
+            get_minio_client().put_object(
+                bucket_name,
+                full_object_name,
+                file_object,
+                length=object_size,
+                content_type=content_type,
+                part_size=OBJECT_STORE_PART_BYTES,
+                num_parallel_uploads=OBJECT_STORE_MAX_WORKERS
+            )
+            upload_method = "multipart" if object_size > OBJECT_STORE_PART_BYTES else "single request"
+        case _:
+            raise ValueError(f"Unsupported object store backend: {backend}")
+
+    seconds = time.time() - tick
+    throughput = object_size / MIB / seconds if seconds > 0 else float("inf")
+    logger.info(
+        f"Wrote {full_object_name} to {backend} ({object_size / MIB:.1f} MiB in {seconds:.2f} seconds, "
+        f"{throughput:.1f} MiB/s, {upload_method})"
+    )
+    result = {"object_name": full_object_name, "bytes": object_size, "seconds": seconds}
+    return result
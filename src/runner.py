@@ -1,22 +1,94 @@
-
 from src.data_ingestion import ingest_API_data, ingest_exoplanets
-from src.utils import add_query_params, handle_date_adjustment
+from src.utils import add_query_params, read_pipeline_state, write_pipeline_state, incremental_start_date, table_name_from_file, INCREMENTAL_TABLES
 from src.logger import setup_logging
 from src.db_sync import db_sync
-from datetime import datetime, timezone
+from datetime import datetime, timezone, date, timedelta
 import os
 import time
 from prefect.client.schemas.schedules import CronSchedule
+from prefect.task_runners import ThreadPoolTaskRunner
+from prefect.futures import wait
 from prefect import flow
 logger = setup_logging()
 
-@flow(name="pipeline_runner")
+INGESTION_MAX_WORKERS = int(os.getenv("INGESTION_MAX_WORKERS", "4"))
+
+def ingestion_timeout(source_name, default_seconds):
+    """Per-source task timeout, overridable with e.g. NASA_DONKI_INGESTION_TIMEOUT_SECONDS."""
+    result = float(os.getenv(f"{source_name}_INGESTION_TIMEOUT_SECONDS", default_seconds))
+    return result
+
+def collect_ingestion_results(ingestion_futures):
+    """
+    Wait for every ingestion future ({file_name: future}) and return (results, failed_files).
+    A source that raised or timed out keeps its previous data; the other sources still load.
+    """
+    wait(list(ingestion_futures.values()))
+    ingestion_results = []
+    failed_files = []
+    for file_name, future in ingestion_futures.items():
+        try:
+            ingestion_results.append(future.result())
+        except Exception as e:
+            logger.error(f"Ingestion of {file_name} failed, keeping its previous data: {e}")
+            failed_files.append(file_name)
+    return ingestion_results, failed_files
+
+def sync_changed_sources(ingestion_results, full_refresh_tables, source_hashes):
+    """
+    Run db_sync for the sources whose files changed, then record their content hashes.
+    Hashes are only written after a successful sync, so a failed sync is retried with
+    the same files next run. Returns the tables that were synchronized.
+    """
+    changed_tables = [
+        table_name_from_file(ingestion_result["file_name"])
+        for ingestion_result in ingestion_results
+        if ingestion_result["changed"]
+    ]
+    if not changed_tables:
+        logger.info("No source changed since the last run, skipping database sync")
+        return changed_tables
+
+    logger.info(f"Synchronizing Data to Database for changed sources: {changed_tables}")
+    db_sync(full_refresh_tables, changed_tables)
+
+    for ingestion_result in ingestion_results:
+        if ingestion_result["content_hash"]:
+            source_hashes[ingestion_result["file_name"]] = ingestion_result["content_hash"]
+    write_pipeline_state("source_hashes", source_hashes)
+    return changed_tables
+
+@flow(name="pipeline_runner", task_runner=ThreadPoolTaskRunner(max_workers=INGESTION_MAX_WORKERS))
 def pipeline_runner():
     tick = time.time()
 
     today = datetime.now(timezone.utc).date()
-    start_date = handle_date_adjustment(today, years=5).strftime("%Y-%m-%d")
+
+    # incremental sources without a stored watermark (or forced to full mode) are fetched in full and rebuilt
+    stored_watermarks = read_pipeline_state("watermarks", {})
+    watermarks = {}
+    full_refresh_tables = []
+    for table_name in INCREMENTAL_TABLES:
+        if os.getenv(f"{table_name}_INGESTION_MODE", "incremental") == "full" or not stored_watermarks.get(table_name):
+            full_refresh_tables.append(table_name)
+        else:
+            watermarks[table_name] = stored_watermarks[table_name]
+    logger.info(f"Incremental watermarks: {watermarks}, full refresh: {full_refresh_tables}")
+
+    start_date = incremental_start_date(
+        today,
+        watermarks.get("NASA_DONKI"),
+        years=5,
+        overlap_days=int(os.getenv("DONKI_OVERLAP_DAYS", "2"))
+    ).strftime("%Y-%m-%d")
     end_date = today.strftime("%Y-%m-%d")
+    logger.info(f"Requesting DONKI notifications from {start_date}")
+
+    exoplanets_updated_since = None
+    if watermarks.get("NASA_EXOPLANETS"):
+        exoplanets_watermark = date.fromisoformat(str(watermarks["NASA_EXOPLANETS"])[:10])
+        exoplanets_updated_since = exoplanets_watermark - timedelta(days=int(os.getenv("EXOPLANETS_OVERLAP_DAYS", "2")))
+    logger.info(f"Requesting exoplanets updated since {exoplanets_updated_since or 'the beginning'}")
 
     nasa_donki_url = add_query_params(os.getenv("NASA_DONKI_API"), {
         "startDate": start_date,
@@ -27,8 +99,9 @@ def pipeline_runner():
     nasa_apod_url = add_query_params(os.getenv("NASA_APOD_API"), {
         "api_key": os.getenv("NASA_API_KEY")
     })
+    # ASTRONAUTS_IN_SPACE_ONLY=false widens the astronaut query to everyone, fetched page by page
     astronaut_url = add_query_params(os.getenv("THE_SPACE_DEVS_API"), {
-        "in_space": "true",
+        "in_space": "true" if os.getenv("ASTRONAUTS_IN_SPACE_ONLY", "true").lower() == "true" else None,
         "is_human": "true"
     })
 
@@ -37,17 +110,36 @@ def pipeline_runner():
     astronaut_filename = "astronauts.parquet"
     nasa_apod_filename = "nasa_apod.parquet"
 
-    ingest_API_data(astronaut_url, astronaut_filename)
-    ingest_API_data(nasa_apod_url, nasa_apod_filename)
-    ingest_API_data(nasa_donki_url, nasa_donki_filename)
-    ingest_exoplanets(nasa_exoplanets_filename)
+    # content hashes of the files loaded by the last successful sync; identical files are not re-uploaded
+    source_hashes = read_pipeline_state("source_hashes", {})
 
+    # sources are independent, so they are fetched concurrently and db_sync waits for all of them
+    ingestion_futures = {
+        astronaut_filename: ingest_API_data.with_options(timeout_seconds=ingestion_timeout("ASTRONAUTS", 300)).submit(
+            astronaut_url, astronaut_filename, source_hashes.get(astronaut_filename)
+        ),
+        nasa_apod_filename: ingest_API_data.with_options(timeout_seconds=ingestion_timeout("NASA_APOD", 300)).submit(
+            nasa_apod_url, nasa_apod_filename, source_hashes.get(nasa_apod_filename)
+        ),
+        nasa_donki_filename: ingest_API_data.with_options(timeout_seconds=ingestion_timeout("NASA_DONKI", 900)).submit(
+            nasa_donki_url, nasa_donki_filename, source_hashes.get(nasa_donki_filename)
+        ),
+        nasa_exoplanets_filename: ingest_exoplanets.with_options(timeout_seconds=ingestion_timeout("NASA_EXOPLANETS", 1800)).submit(
+            nasa_exoplanets_filename, exoplanets_updated_since, source_hashes.get(nasa_exoplanets_filename)
+        )
+    }
+    ingestion_results, failed_files = collect_ingestion_results(ingestion_futures)
 
     tock = time.time() - tick
-    logger.info(f"Data ingestion completed in {tock:.2f} seconds.")
+    sequential_seconds = sum(ingestion_result["seconds"] for ingestion_result in ingestion_results)
+    for ingestion_result in ingestion_results:
+        logger.info(f"{ingestion_result['file_name']} ingested in {ingestion_result['seconds']:.2f} seconds")
+    logger.info(f"Data ingestion completed in {tock:.2f} seconds ({sequential_seconds:.2f} seconds if run sequentially, max {INGESTION_MAX_WORKERS} concurrent tasks).")
 
-    logger.info("Synchronizing Data to Database")
-    db_sync()    
+    sync_changed_sources(ingestion_results, full_refresh_tables, source_hashes)
+    if failed_files:
+        # the run is still marked failed so the missing sources are noticed
+        raise RuntimeError(f"Ingestion failed for {failed_files}; the other sources were synchronized")
 
 if __name__ == "__main__":
     pipeline_runner.serve(
@@ -0,0 +1,161 @@
+from src.logger import setup_logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import os
+import re
+import time
+current_path = os.path.dirname(os.path.abspath(__file__))
+parent_path = os.path.abspath(os.path.join(current_path, ".."))
+
+logger = setup_logging()
+
+TARGET_TABLE_PATTERN = re.compile(
+    r"CREATE\s+(?:OR\s+REPLACE\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?([A-Za-z_]\w*\.[A-Za-z_]\w*)",
+    re.IGNORECASE
+)
+SOURCE_TABLE_PATTERN = re.compile(r"\b(?:FROM|JOIN)\s+([A-Za-z_]\w*\.[A-Za-z_]\w*)", re.IGNORECASE)
+
+
+def parse_sql_dependencies(sql):
+    """
+    Returns (target_table, source_tables) for a SQL file that builds one schema-qualified table.
+    Table names are upper-cased; references to the target itself are not dependencies.
+    """
+    target_match = TARGET_TABLE_PATTERN.search(sql)
+    if not target_match:
+        raise ValueError("SQL file does not create a schema-qualified table")
+
+    target_table = target_match.group(1).upper()
+    source_tables = {table.upper() for table in SOURCE_TABLE_PATTERN.findall(sql)}
+    source_tables.discard(target_table)
+    return target_table, source_tables
+
+
+def load_sql_nodes(sql_directories):
+    """Build the DAG nodes for every .sql file in the given directories (relative to the repo root)."""
+    nodes = {}
+    for sql_directory in sql_directories:
+        full_directory = os.path.join(parent_path, sql_directory)
+        for file_name in sorted(os.listdir(full_directory)):
+            if not file_name.endswith(".sql"):
+                continue
+            full_path = os.path.join(full_directory, file_name)
+            with open(full_path, "r") as file:
+                sql = file.read()
+
+            target_table, source_tables = parse_sql_dependencies(sql)
+            if target_table in nodes:
+                raise ValueError(f"{target_table} is built by both {nodes[target_table]['path']} and {full_path}")
+            nodes[target_table] = {"path": full_path, "sql": sql, "depends_on": source_tables}
+    return nodes
+
+
+def downstream_tables(nodes, changed_tables):
+    """All node targets that (transitively) depend on any of changed_tables."""
+    affected = {table.upper() for table in changed_tables}
+    result = set()
+    added = True
+    while added:
+        added = False
+        for target_table, node in nodes.items():
+            if target_table not in result and node["depends_on"] & (affected | result):
+                result.add(target_table)
+                added = True
+    return result
+
+
+def existing_tables(con):
+    rows = con.execute("""
+        SELECT table_schema || '.' || table_name FROM information_schema.tables
+        WHERE table_catalog = 'my_ducklake'
+    """).fetchall()
+    result = {row[0].upper() for row in rows}
+    return result
+
+
+def missing_tables(con, nodes, blocked_tables=()):
+    """
+    Node targets that do not exist yet and can be built from existing or missing tables,
+    e.g. a table added to the repo since the last deploy. Targets downstream of
+    blocked_tables are left out.
+    """
+    available = existing_tables(con)
+    blocked = downstream_tables(nodes, blocked_tables) | {table.upper() for table in blocked_tables}
+    candidates = {target_table for target_table in nodes if target_table not in available and target_table not in blocked}
+    result = set()
+    added = True
+    while added:
+        added = False
+        for target_table in candidates - result:
+            if nodes[target_table]["depends_on"] <= available | result:
+                result.add(target_table)
+                added = True
+    return result
+
+
+def run_sql_dag(con, nodes, changed_tables=None, max_workers=4, blocked_tables=()):
+    """
+    Execute SQL nodes in dependency order, running independent nodes in parallel on
+    separate cursors of con. With changed_tables (schema-qualified names) only the
+    nodes downstream of those tables, plus targets that do not exist yet, are built;
+    None runs every node. Missing targets downstream of blocked_tables are not built.
+
+    Returns {target_table: seconds} for the nodes that ran.
+    """
+    if changed_tables is None:
+        selected_tables = set(nodes)
+    else:
+        selected_tables = downstream_tables(nodes, changed_tables) | missing_tables(con, nodes, blocked_tables)
+
+    # dependencies outside the selected set are already up to date
+    pending_dependencies = {
+        target_table: nodes[target_table]["depends_on"] & selected_tables
+        for target_table in selected_tables
+    }
+    logger.info(f"Running SQL DAG for {sorted(selected_tables)} with up to {max_workers} workers")
+
+    timings = {}
+    failures = []
+
+    def execute_node(target_table, cursor):
+        tick = time.time()
+        try:
+            logger.info(f"Executing SQL file: {nodes[target_table]['path']}")
+            cursor.execute("USE my_ducklake")
+            cursor.execute(nodes[target_table]["sql"])
+        finally:
+            cursor.close()
+        tock = time.time() - tick
+        logger.info(f"Built {target_table} in {tock:.2f} seconds")
+        return tock
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        running = {}
+        while pending_dependencies or running:
+            if not failures:
+                ready_tables = [table for table, dependencies in pending_dependencies.items() if not dependencies]
+                for target_table in sorted(ready_tables):
+                    del pending_dependencies[target_table]
+                    # cursors are created on this thread; DuckDB connections are not thread-safe
+                    future = executor.submit(execute_node, target_table, con.cursor())
+                    running[future] = target_table
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                target_table = running.pop(future)
+                try:
+                    timings[target_table] = future.result()
+                except Exception as e:
+                    logger.error(f"Failed executing {nodes[target_table]['path']}: {e}")
+                    failures.append(e)
+                    continue
+                for dependencies in pending_dependencies.values():
+                    dependencies.discard(target_table)
+
+    if failures:
+        raise failures[0]
+    if pending_dependencies:
+        raise ValueError(f"SQL DAG has a dependency cycle among {sorted(pending_dependencies)}")
+    return timings
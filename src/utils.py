@@ -1,12 +1,20 @@
-from minio import Minio
 from src.logger import setup_logging
+from src.object_store import get_gcs_client, write_object
+from src.catalog_sync import publish_catalog
 import os
 import io
+import json
+import hashlib
+import datetime
+import resource
+import time
 import isodate
 import duckdb
 import polars as pl
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
 from urllib.parse import urlencode
-from google.cloud import storage
 import gcsfs
 from dotenv import load_dotenv
 load_dotenv()
@@ -15,6 +23,90 @@ parent_path = os.path.abspath(os.path.join(current_path, ".."))
 
 logger = setup_logging()
 
+# RAW_DATA tables that are merged by key instead of rebuilt on every sync.
+# watermark_column is persisted after each sync so ingestion can request only newer records.
+INCREMENTAL_TABLES = {
+    "NASA_DONKI": {
+        "merge_key": "messageID",
+        "watermark_column": "messageIssueTime",
+        "retention_years": 5
+    },
+    "NASA_EXOPLANETS": {
+        "merge_key": "pl_name",
+        "watermark_column": "rowupdate"
+    }
+}
+
+# DuckLake partition keys for RAW_DATA tables that are mostly read filtered by these columns.
+# (STAGED and CLEANED partitioning is declared in their SQL files.)
+PARTITIONED_TABLES = {
+    "NASA_DONKI": ["messageType"]
+}
+
+# Columns update_data adds to every RAW_DATA table; source files must not contain them.
+RAW_LINEAGE_COLUMNS = ("_source_file", "_ingestion_timestamp", "_record_id")
+
+# Snapshots kept for time travel: the latest SNAPSHOT_RETENTION_COUNT, plus anything
+# younger than SNAPSHOT_RETENTION_DAYS. Older snapshots and their files are removed
+# once per db_sync.
+SNAPSHOT_RETENTION_COUNT = int(os.getenv("SNAPSHOT_RETENTION_COUNT", "10"))
+SNAPSHOT_RETENTION_DAYS = int(os.getenv("SNAPSHOT_RETENTION_DAYS", "7"))
+
+# Expected columns and types of each API source after preprocessing (astronauts are
+# described after their agency/image structs are flattened). Missing columns are
+# filled with nulls and unexpected ones are kept as fetched; both are reported as drift.
+# A type of None declares a nested field that is expected but stored as fetched.
+SOURCE_SCHEMAS = {
+    "ASTRONAUTS": {
+        "id": pl.Int64,
+        "url": pl.Utf8,
+        "name": pl.Utf8,
+        "status": None,
+        "type": None,
+        "in_space": pl.Boolean,
+        "time_in_space": pl.Utf8,
+        "eva_time": pl.Utf8,
+        "age": pl.Int64,
+        "date_of_birth": pl.Utf8,
+        "date_of_death": pl.Utf8,
+        "nationality": None,
+        "bio": pl.Utf8,
+        "wiki": pl.Utf8,
+        "last_flight": pl.Utf8,
+        "first_flight": pl.Utf8,
+        "social_media_links": None,
+        "response_mode": pl.Utf8,
+        "flights_count": pl.Int64,
+        "landings_count": pl.Int64,
+        "spacewalks_count": pl.Int64,
+        "agency_name": pl.Utf8,
+        "agency_abbrev": pl.Utf8,
+        "image_url": pl.Utf8,
+        "thumbnail_url": pl.Utf8
+    },
+    "NASA_APOD": {
+        "resource": pl.Utf8,
+        "concept_tags": pl.Boolean,
+        "title": pl.Utf8,
+        "date": pl.Date,
+        "url": pl.Utf8,
+        "hdurl": pl.Utf8,
+        "media_type": pl.Utf8,
+        "explanation": pl.Utf8,
+        "concepts": pl.Utf8,
+        "thumbnail_url": pl.Utf8,
+        "service_version": pl.Utf8,
+        "copyright": pl.Utf8
+    },
+    "NASA_DONKI": {
+        "messageType": pl.Utf8,
+        "messageID": pl.Utf8,
+        "messageURL": pl.Utf8,
+        "messageIssueTime": pl.Utf8,
+        "messageBody": pl.Utf8
+    }
+}
+
 def gcs_path_exists(gcs_path):
     try:
         logger.info(f"Checking existence of GCS path: {gcs_path}")
@@ -53,9 +145,12 @@ def duckdb_con_init():
     logger.info("Connected to in-memory DuckDB database")
     return con
 
-def ducklake_init(con, data_path, catalog_path):
+def ducklake_init(con, data_path, catalog_path, read_only=False):
     logger.info(f"Attaching DuckLake with data path: {data_path}")
-    con.execute(f"ATTACH 'ducklake:{catalog_path}' AS my_ducklake (DATA_PATH '{data_path}')")
+    attach_options = f"DATA_PATH '{data_path}'"
+    if read_only:
+        attach_options += ", READ_ONLY"
+    con.execute(f"ATTACH 'ducklake:{catalog_path}' AS my_ducklake ({attach_options})")
     con.execute("USE my_ducklake")
     logger.info("DuckLake attached and activated successfully")
 
@@ -83,24 +178,245 @@ def schema_creation(con):
     con.execute("CREATE SCHEMA IF NOT EXISTS RAW")
     con.execute("CREATE SCHEMA IF NOT EXISTS STAGED")
     con.execute("CREATE SCHEMA IF NOT EXISTS CLEANED")
+    con.execute("CREATE SCHEMA IF NOT EXISTS AGGREGATES")
     logger.info("Database schemas created successfully")
 
-def ducklake_refresh(con): # ensures most up to date .parquet is used
-    logger.info("Refreshing DuckLake metadata to most up-to-date")
-    con.execute("CALL ducklake_expire_snapshots('my_ducklake', older_than => now())")
-    con.execute("CALL ducklake_cleanup_old_files('my_ducklake', cleanup_all => true)")
+def snapshots_to_expire(snapshots, keep_count=SNAPSHOT_RETENTION_COUNT, keep_days=SNAPSHOT_RETENTION_DAYS, now=None):
+    """
+    Ids of the (snapshot_id, snapshot_time) pairs outside the retention policy: a snapshot is
+    kept if it is one of the latest keep_count or younger than keep_days, so time travel
+    always reaches back at least that far.
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    cutoff = now - datetime.timedelta(days=keep_days)
+    newest_first = sorted(snapshots, key=lambda snapshot: snapshot[0], reverse=True)
+    result = sorted(
+        snapshot_id for snapshot_id, snapshot_time in newest_first[keep_count:]
+        if snapshot_time < cutoff
+    )
+    return result
+
+def ducklake_file_sizes(con):
+    """Bytes of every data and delete file the catalog still tracks, keyed by (kind, file id)."""
+    rows = con.execute("""
+        SELECT 'data', data_file_id, file_size_bytes FROM __ducklake_metadata_my_ducklake.ducklake_data_file
+        UNION ALL
+        SELECT 'delete', delete_file_id, file_size_bytes FROM __ducklake_metadata_my_ducklake.ducklake_delete_file
+    """).fetchall()
+    result = {(kind, file_id): size for kind, file_id, size in rows}
+    return result
+
+def ducklake_apply_retention(con, keep_count=SNAPSHOT_RETENTION_COUNT, keep_days=SNAPSHOT_RETENTION_DAYS):
+    """
+    Expire the snapshots outside the retention policy, then delete the files no remaining
+    snapshot references in one cleanup pass. Returns the number of snapshots expired and
+    files deleted, and the bytes those files held.
+    """
+    snapshots = con.execute("SELECT snapshot_id, snapshot_time FROM ducklake_snapshots('my_ducklake')").fetchall()
+    expired_ids = snapshots_to_expire(snapshots, keep_count, keep_days)
+    file_sizes_before = ducklake_file_sizes(con)
+    if expired_ids:
+        con.execute(f"CALL ducklake_expire_snapshots('my_ducklake', versions => {expired_ids})")
+    file_sizes_after = ducklake_file_sizes(con)
+    bytes_reclaimed = sum(size for file_key, size in file_sizes_before.items() if file_key not in file_sizes_after)
+
+    deleted_files = con.execute("CALL ducklake_cleanup_old_files('my_ducklake', cleanup_all => true)").fetchall()
+    logger.info(
+        f"Expired {len(expired_ids)} of {len(snapshots)} snapshots (keeping the latest {keep_count} and "
+        f"{keep_days} days), deleted {len(deleted_files)} files, reclaimed {bytes_reclaimed / 1024 / 1024:.1f} MiB"
+    )
+    result = {"snapshots_expired": len(expired_ids), "files_deleted": len(deleted_files), "bytes_reclaimed": bytes_reclaimed}
+    return result
 
 def update_catalog_to_gcs(gcp_bucket, catalog_path):
-    client = storage.Client(project=(os.getenv("GCP_PROJECT_NAME")))
-    bucket = client.bucket(gcp_bucket)
-    blob = bucket.blob("catalog.ducklake")
-    blob.upload_from_filename(catalog_path)
-    logger.info("Catalog uploaded to GCS successfully")
+    """Publish the local catalog as a new catalog generation (see src.catalog_sync)."""
+    pointer = publish_catalog(gcp_bucket, catalog_path)
+    logger.info(f"Catalog uploaded to GCS successfully (generation {pointer['sequence']})")
+
+def read_pipeline_state(state_name, default=None):
+    """
+    Read a small JSON document persisted between pipeline runs (e.g. ingestion watermarks).
+    Returns default when the state has never been written.
+    """
+    bucket = get_gcs_client().bucket(os.getenv("GCP_BUCKET_NAME"))
+    blob = bucket.blob(f"PIPELINE_STATE/{state_name}.json")
+    if not blob.exists():
+        logger.info(f"No pipeline state found for {state_name}")
+        return default
+    result = json.loads(blob.download_as_bytes())
+    return result
+
+def write_pipeline_state(state_name, state):
+    bucket = get_gcs_client().bucket(os.getenv("GCP_BUCKET_NAME"))
+    blob = bucket.blob(f"PIPELINE_STATE/{state_name}.json")
+    blob.upload_from_string(json.dumps(state, default=str), content_type="application/json")
+    logger.info(f"Pipeline state {state_name} updated")
+
+def compute_content_hash(file_object, chunk_size=1024 * 1024):
+    """SHA-256 of a seekable file-like object, read in chunks; the position is reset to 0 afterwards."""
+    file_object.seek(0)
+    content_hash = hashlib.sha256()
+    for chunk in iter(lambda: file_object.read(chunk_size), b""):
+        content_hash.update(chunk)
+    file_object.seek(0)
+    result = content_hash.hexdigest()
+    return result
 
-def update_data(con, logger, bucket_name, folder_path, storage_type="s3"):
+def table_name_from_file(file_name):
+    """Map a RAW_DATA object name (e.g. nasa_donki.parquet) to its table name (NASA_DONKI)."""
+    result = os.path.basename(file_name).replace('.parquet', '').upper().replace('-', '_').replace(' ', '_')
+    return result
+
+def ducklake_table_exists(con, schema_name, table_name):
+    table_count = con.execute("""
+        SELECT count(*) FROM information_schema.tables
+        WHERE table_catalog = 'my_ducklake' AND table_schema = ? AND table_name = ?
+    """, [schema_name, table_name]).fetchone()[0]
+    result = table_count > 0
+    return result
+
+def raw_file_select_query(file_path, file_name, record_id_offset="0"):
+    """
+    Select a RAW_DATA parquet file with its lineage columns. _record_id is the row's
+    position in the file (plus record_id_offset), which DuckDB reads alongside the data,
+    so the scan stays parallel instead of being numbered by a window function.
+    """
+    result = f"""
+    SELECT
+        * EXCLUDE (file_row_number),
+        '{file_name}' AS _source_file,
+        CURRENT_TIMESTAMP AS _ingestion_timestamp,
+        {record_id_offset} + file_row_number + 1 AS _record_id
+    FROM read_parquet('{file_path}', file_row_number = true)
+    """
+    return result
+
+def upsert_parquet_file(con, file_path, file_name, qualified_table_name, incremental_config):
+    """
+    Merge a parquet file into an existing table by its merge key: rows whose key appears
+    in the file are replaced, new keys are appended and rows older than the retention
+    window are dropped. Runs inside the caller's transaction; returns the rows inserted.
+    """
+    merge_key = incremental_config["merge_key"]
+    con.execute(f"""
+        DELETE FROM {qualified_table_name}
+        WHERE {merge_key} IN (SELECT {merge_key} FROM read_parquet('{file_path}'))
+    """)
+    record_id_offset = f"(SELECT coalesce(max(_record_id), 0) FROM {qualified_table_name})"
+    inserted_rows = con.execute(
+        f"INSERT INTO {qualified_table_name} BY NAME {raw_file_select_query(file_path, file_name, record_id_offset)}"
+    ).fetchone()[0]
+
+    retention_years = incremental_config.get("retention_years")
+    if retention_years:
+        today = datetime.datetime.now(datetime.timezone.utc).date()
+        retention_start = handle_date_adjustment(today, years=retention_years).strftime("%Y-%m-%d")
+        con.execute(
+            f"DELETE FROM {qualified_table_name} WHERE {incremental_config['watermark_column']} < ?",
+            [retention_start]
+        )
+    return inserted_rows
+
+def replace_table_from_parquet_file(con, file_path, file_name, qualified_table_name, partition_keys=None):
+    """Rebuild a table from a parquet file inside the caller's transaction; returns the rows loaded."""
+    select_query = raw_file_select_query(file_path, file_name)
+    if partition_keys:
+        # DuckLake only partitions data written after SET PARTITIONED BY, so create the table empty first
+        con.execute(f"CREATE OR REPLACE TABLE {qualified_table_name} AS {select_query} LIMIT 0")
+        con.execute(f"ALTER TABLE {qualified_table_name} SET PARTITIONED BY ({', '.join(partition_keys)})")
+        result = con.execute(f"INSERT INTO {qualified_table_name} {select_query}").fetchone()[0]
+        return result
+    result = con.execute(f"CREATE OR REPLACE TABLE {qualified_table_name} AS {select_query}").fetchone()[0]
+    return result
+
+def table_columns(con, schema_name, table_name):
+    rows = con.execute("""
+        SELECT column_name, data_type FROM information_schema.columns
+        WHERE table_catalog = 'my_ducklake' AND table_schema = ? AND table_name = ?
+    """, [schema_name, table_name]).fetchall()
+    result = dict(rows)
+    return result
+
+def check_raw_file_schemas(con, load_plan, folder_path):
+    """
+    Read the schema of every planned file from its parquet footer before anything is
+    written, so one bad file cannot leave RAW_DATA half loaded. Columns a merged file
+    shares with its target table must have the same types; columns the table does not
+    have yet are recorded in the plan as new_columns.
+    Raises ValueError listing every problem found.
+    """
+    problems = []
+    for load in load_plan:
+        try:
+            file_columns = dict(con.execute(
+                f"SELECT column_name, column_type FROM (DESCRIBE SELECT * FROM read_parquet('{load['file_path']}'))"
+            ).fetchall())
+        except duckdb.Error as e:
+            problems.append(f"{load['file_path']}: unreadable ({e})")
+            continue
+
+        reserved_columns = [column for column in RAW_LINEAGE_COLUMNS if column in file_columns]
+        if reserved_columns:
+            problems.append(f"{load['file_path']}: contains reserved columns {reserved_columns}")
+        if load["mode"] == "merge":
+            existing_columns = table_columns(con, folder_path, load["table_name"])
+            load["new_columns"] = {
+                column: column_type for column, column_type in file_columns.items() if column not in existing_columns
+            }
+            for column, column_type in file_columns.items():
+                if column in existing_columns and existing_columns[column] != column_type:
+                    problems.append(
+                        f"{load['file_path']}: column {column} is {column_type}, "
+                        f"{folder_path}.{load['table_name']} has {existing_columns[column]}"
+                    )
+    if problems:
+        raise ValueError(f"Schema check failed, nothing was loaded: {problems}")
+
+def record_watermarks(con, folder_path="RAW_DATA", tables=None):
+    """
+    Persist the newest watermark_column value of every incremental table. With tables,
+    only those watermarks are recomputed and the stored ones are kept for the rest.
+    """
+    watermarks = {} if tables is None else read_pipeline_state("watermarks", {})
+    for table_name, incremental_config in INCREMENTAL_TABLES.items():
+        if tables is not None and table_name not in tables:
+            continue
+        if not ducklake_table_exists(con, folder_path, table_name):
+            continue
+        watermark = con.execute(
+            f"SELECT max({incremental_config['watermark_column']}) FROM {folder_path}.{table_name}"
+        ).fetchone()[0]
+        watermarks[table_name] = watermark
+        logger.info(f"Watermark for {folder_path}.{table_name}: {watermark}")
+    write_pipeline_state("watermarks", watermarks)
+    return watermarks
+
+def incremental_start_date(today, watermark, years, overlap_days):
+    """
+    Start of the fetch window for an incremental source: the stored watermark minus a
+    small overlap, never earlier than the full `years` window. Without a watermark the
+    full window is used.
+    """
+    full_window_start = handle_date_adjustment(today, years)
+    if not watermark:
+        return full_window_start
+
+    watermark_date = datetime.date.fromisoformat(str(watermark)[:10])
+    overlap_start = watermark_date - datetime.timedelta(days=overlap_days)
+    result = max(overlap_start, full_window_start)
+    return result
+
+def update_data(con, logger, bucket_name, folder_path, storage_type="s3", full_refresh_tables=(), tables=None):
     """
     Refreshes DuckLake catalog tables from parquet files stored in a cloud bucket.
     storage_type: "s3" (MinIO or AWS) or "gs" (Google Cloud Storage)
+    Tables listed in INCREMENTAL_TABLES are merged into the existing table unless they
+    appear in full_refresh_tables (or do not exist yet), in which case they are rebuilt.
+    tables: optional collection of table names to refresh; other files are skipped.
+
+    Every file is schema-checked before loading starts, then all tables are loaded in a
+    single transaction, so a sync adds one DuckLake snapshot and either every table is
+    updated or none is. Returns {table_name: {"mode", "rows", "seconds"}}.
     """
     if storage_type not in ["s3", "gs"]:
         raise ValueError("storage_type must be 's3' or 'gs'")
@@ -115,57 +431,69 @@ def update_data(con, logger, bucket_name, folder_path, storage_type="s3"):
 
         logger.info(f"Found {len(file_paths)} files in {storage_type.upper()} bucket")
 
+        load_plan = []
         for file_path in file_paths:
             file_name = os.path.basename(file_path).replace('.parquet', '')
-            table_name = file_name.upper().replace('-', '_').replace(' ', '_')
-
-            logger.info(f"Processing file: {file_path} -> table: {folder_path}.{table_name}")
-
-            query = f"""
-            CREATE OR REPLACE TABLE {folder_path}.{table_name} AS
-            SELECT 
-                *,
-                '{file_name}' AS _source_file,
-                CURRENT_TIMESTAMP AS _ingestion_timestamp,
-                ROW_NUMBER() OVER () AS _record_id
-            FROM read_parquet('{file_path}');
-            """
+            table_name = table_name_from_file(file_name)
+            if tables is not None and table_name not in tables:
+                logger.info(f"Skipping unchanged source {file_path}")
+                continue
+
+            merge = (
+                table_name in INCREMENTAL_TABLES
+                and table_name not in full_refresh_tables
+                and ducklake_table_exists(con, folder_path, table_name)
+            )
+            load_plan.append({
+                "file_path": file_path,
+                "file_name": file_name,
+                "table_name": table_name,
+                "mode": "merge" if merge else "replace"
+            })
+
+        if not load_plan:
+            logger.info("No files to load")
+            return {}
+        check_raw_file_schemas(con, load_plan, folder_path)
+
+        load_stats = {}
+        tick = time.time()
+        con.execute("BEGIN TRANSACTION")
+        try:
+            for load in load_plan:
+                qualified_table_name = f"{folder_path}.{load['table_name']}"
+                logger.info(f"Processing file: {load['file_path']} -> table: {qualified_table_name} ({load['mode']})")
+                table_tick = time.time()
+                if load["mode"] == "merge":
+                    for column, column_type in load.get("new_columns", {}).items():
+                        # new upstream fields (see normalize_to_schema) extend the table; older rows read NULL
+                        logger.warning(f"Adding column {column} {column_type} to {qualified_table_name}")
+                        con.execute(f'ALTER TABLE {qualified_table_name} ADD COLUMN IF NOT EXISTS "{column}" {column_type}')
+                    row_count = upsert_parquet_file(
+                        con, load["file_path"], load["file_name"], qualified_table_name, INCREMENTAL_TABLES[load["table_name"]]
+                    )
+                else:
+                    row_count = replace_table_from_parquet_file(
+                        con, load["file_path"], load["file_name"], qualified_table_name, PARTITIONED_TABLES.get(load["table_name"])
+                    )
+                table_seconds = time.time() - table_tick
+                load_stats[load["table_name"]] = {"mode": load["mode"], "rows": row_count, "seconds": table_seconds}
+                logger.info(f"Loaded {row_count} rows into {qualified_table_name} in {table_seconds:.2f} seconds")
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
 
-            con.execute(query)
-            logger.info(f"Successfully created or updated {folder_path}.{table_name}")
+        logger.info(f"Loaded {len(load_stats)} {folder_path} tables in one transaction in {time.time() - tick:.2f} seconds: {load_stats}")
+        return load_stats
 
     except Exception as e:
         logger.error(f"Error processing files from {storage_type.upper()}: {e}")
         raise
 
-
-
 def write_data_to_minio(parquet_buffer, bucket_name, object_name, folder_name=None):
-    minio_client = Minio(
-        os.getenv("MINIO_EXTERNAL_URL"),
-        access_key=os.getenv("MINIO_ACCESS_KEY"),
-        secret_key=os.getenv("MINIO_SECRET_KEY"),
-        secure=False
-    )
-
-    parquet_buffer.seek(0)
-    data_bytes = parquet_buffer.read()
-
-    if folder_name:
-        folder_name = folder_name.strip("/")
-        full_object_name = f"{folder_name}/{object_name}"
-    else:
-        full_object_name = object_name
-
     try:
-        minio_client.put_object(
-            bucket_name,
-            full_object_name,
-            io.BytesIO(data_bytes),
-            length=len(data_bytes),
-            content_type="application/x-parquet",
-        )
-        logger.info(f"Successfully wrote {full_object_name} to bucket {bucket_name}")
+        write_object(parquet_buffer, object_name, folder_name, backend="minio", bucket_name=bucket_name)
     except Exception as e:
         logger.error(f"Failed to write data to MinIO: {e}")
 
@@ -224,6 +552,123 @@ def iso_to_human(iso_str):
     result = ", ".join(parts)
     return result
 
+# Day/time ISO-8601 durations as returned by The Space Devs API, e.g. P345DT8H18M1S
+ISO_DURATION_PATTERN = r"^P(?:(?<days>\d+)D)?(?:T(?:(?<hours>\d+)H)?(?:(?<minutes>\d+)M)?(?:(?<seconds>\d+(?:\.\d+)?)S)?)?$"
+
+def iso_duration_seconds_expr(column_name):
+    """
+    Polars expression for the whole seconds in an ISO-8601 duration column, truncated like
+    int(isodate.parse_duration(value).total_seconds()). Unparseable values become null.
+    """
+    components = pl.col(column_name).str.extract_groups(ISO_DURATION_PATTERN)
+    total_seconds = (
+        components.struct.field("days").cast(pl.Float64).fill_null(0) * 86400
+        + components.struct.field("hours").cast(pl.Float64).fill_null(0) * 3600
+        + components.struct.field("minutes").cast(pl.Float64).fill_null(0) * 60
+        + components.struct.field("seconds").cast(pl.Float64).fill_null(0)
+    )
+    result = (
+        pl.when(pl.col(column_name).str.contains(ISO_DURATION_PATTERN))
+        .then(total_seconds.cast(pl.Int64))
+        .otherwise(None)
+    )
+    return result
+
+def human_duration_expr(seconds_expr):
+    """Column-wise equivalent of the string iso_to_human builds from a number of seconds."""
+    days_count = seconds_expr // 86400
+    hours_count = (seconds_expr % 86400) // 3600
+    minutes_count = (seconds_expr % 3600) // 60
+    seconds_count = seconds_expr % 60
+    # each present component carries a trailing separator; the last one is stripped afterwards
+    parts = pl.concat_str([
+        pl.when(days_count > 0).then(days_count.cast(pl.Utf8) + " days, "),
+        pl.when(hours_count > 0).then(hours_count.cast(pl.Utf8) + " hours, "),
+        pl.when(minutes_count > 0).then(minutes_count.cast(pl.Utf8) + " minutes, "),
+        pl.when(seconds_count > 0).then(seconds_count.cast(pl.Utf8) + " seconds, ")
+    ], ignore_nulls=True).str.strip_suffix(", ")
+    result = (
+        pl.when(seconds_expr.is_null()).then(None)
+        .when(seconds_expr == 0).then(pl.lit("0 seconds"))
+        .otherwise(parts)
+    )
+    return result
+
+def detect_schema_drift(columns, expected_schema):
+    result = {
+        "missing_columns": [column for column in expected_schema if column not in columns],
+        "unexpected_columns": [column for column in columns if column not in expected_schema]
+    }
+    return result
+
+def normalize_to_schema(dataframe, expected_schema, source_name):
+    """
+    Cast and fill a source frame to its expected schema in a single lazy select.
+    Unexpected upstream fields are kept after the expected columns, so RAW_DATA holds
+    the data as fetched; schema drift (missing or new fields) is logged as metrics.
+    """
+    drift = detect_schema_drift(dataframe.columns, expected_schema)
+    drift_message = (
+        f"schema_drift source={source_name} "
+        f"missing_count={len(drift['missing_columns'])} unexpected_count={len(drift['unexpected_columns'])} "
+        f"missing_columns={drift['missing_columns']} unexpected_columns={drift['unexpected_columns']}"
+    )
+    if drift["missing_columns"]:
+        logger.warning(drift_message)
+    else:
+        logger.info(drift_message)
+
+    if dataframe.height == 0:
+        # e.g. an empty JSON array; literals would broadcast to a single row of nulls on a frame without columns
+        result = pl.DataFrame(schema={column: dtype or pl.Null for column, dtype in expected_schema.items()})
+        return result
+
+    present_columns = set(dataframe.columns)
+    expressions = []
+    for column, dtype in expected_schema.items():
+        if column not in present_columns:
+            expressions.append(pl.lit(None, dtype=dtype).alias(column))
+        elif dtype is None:
+            expressions.append(pl.col(column))
+        else:
+            expressions.append(pl.col(column).cast(dtype))
+    result = dataframe.lazy().select(
+        expressions + [pl.col(column) for column in drift["unexpected_columns"]]
+    ).collect()
+    return result
+
+def stream_csv_to_parquet(csv_stream, column_types, output_file, block_size=8 * 1024 * 1024):
+    """
+    Parse a CSV byte stream into Arrow record batches and write each batch as a parquet
+    row group to output_file, so only one block of rows is held in memory at a time.
+    Columns not in column_types are ignored. Returns the number of rows written.
+    """
+    reader = pa_csv.open_csv(
+        csv_stream,
+        read_options=pa_csv.ReadOptions(block_size=block_size),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=column_types,
+            include_columns=list(column_types),
+            strings_can_be_null=True
+        )
+    )
+    row_count = 0
+    with pq.ParquetWriter(output_file, reader.schema) as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+            row_count += batch.num_rows
+    output_file.seek(0)
+    result = row_count
+    return result
+
+def peak_memory_usage():
+    """Peak resident set size of this process and peak Arrow allocation, both in MiB."""
+    # ru_maxrss is reported in KiB on Linux
+    result = {
+        "peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "peak_arrow_mib": pa.default_memory_pool().max_memory() / (1024 * 1024)
+    }
+    return result
 
 def convert_dataframe_to_parquet(dataframe):
     buffer = io.BytesIO()
@@ -248,11 +693,15 @@ def preprocess_astronaut_data(astronauts_dataframe):
             pl.col("image").struct.field("thumbnail_url").alias("thumbnail_url")
         ]).alias("image_flat"),
     ).unnest(["agency_flat", "image_flat"]).drop(["agency", "image"])
+    astronauts_dataframe = normalize_to_schema(astronauts_dataframe, SOURCE_SCHEMAS["ASTRONAUTS"], "ASTRONAUTS")
 
-    # parse ISO dates
+    # parse ISO durations column-wise; seconds are kept for downstream aggregation
     astronauts_dataframe = astronauts_dataframe.with_columns(
-        pl.col("time_in_space").map_elements(iso_to_human, return_dtype=pl.Utf8).alias("time_in_space_human_readable"),
-        pl.col("eva_time").map_elements(iso_to_human, return_dtype=pl.Utf8).alias("eva_time_human_readable")
+        iso_duration_seconds_expr("time_in_space").alias("time_in_space_seconds"),
+        iso_duration_seconds_expr("eva_time").alias("eva_time_seconds")
+    ).with_columns(
+        human_duration_expr(pl.col("time_in_space_seconds")).alias("time_in_space_human_readable"),
+        human_duration_expr(pl.col("eva_time_seconds")).alias("eva_time_human_readable")
     )
     result = astronauts_dataframe
     return result
@@ -265,58 +714,25 @@ def handle_date_adjustment(from_date, years):
         return from_date.replace(month=2, day=28, year=from_date.year - years)
     
 
-def preprocess_apod_data(apod_dataframe):
-
-    expected_columns = {
-        "resource": pl.Utf8,
-        "concept_tags": pl.Boolean,
-        "title": pl.Utf8,
-        "date": pl.Date,
-        "url": pl.Utf8,
-        "hdurl": pl.Utf8,
-        "media_type": pl.Utf8,
-        "explanation": pl.Utf8,
-        "concepts": pl.Utf8,
-        "thumbnail_url": pl.Utf8,
-        "service_version": pl.Utf8,
-        "copyright": pl.Utf8
-    }
+def preprocess_donki_data(donki_dataframe):
+    result = normalize_to_schema(donki_dataframe, SOURCE_SCHEMAS["NASA_DONKI"], "NASA_DONKI")
+    return result
 
-    for col, dtype in expected_columns.items():
-        if col not in apod_dataframe.columns:
-            apod_dataframe = apod_dataframe.with_columns(pl.lit(None).cast(dtype).alias(col))
-        else:
-            apod_dataframe = apod_dataframe.with_columns(pl.col(col).cast(dtype))
-    
-    result = apod_dataframe.select(list(expected_columns.keys()))
+def preprocess_apod_data(apod_dataframe):
+    result = normalize_to_schema(apod_dataframe, SOURCE_SCHEMAS["NASA_APOD"], "NASA_APOD")
     return result
 
 def write_data_to_gcs(parquet_buffer, object_name, folder_name= None):
     """
-    Upload a BytesIO parquet_buffer to a GCS bucket using ADC.
+    Upload a parquet file object to a GCS bucket using ADC.
 
     Args:
-        parquet_buffer (io.BytesIO): Seekable in-memory parquet file
+        parquet_buffer (io.BytesIO | tempfile.SpooledTemporaryFile): Seekable parquet file, streamed without copying
         object_name (str): File name to store in the bucket
         folder_name (str, optional): Optional folder inside the bucket
     """
     try:
-        # Create client with ADC
-        client = storage.Client(project=(os.getenv("GCP_PROJECT_NAME")))
-        bucket = client.bucket(os.getenv("GCP_BUCKET_NAME"))
-
-        if folder_name:
-            folder_name = folder_name.strip("/")
-            full_object_name = f"{folder_name}/{object_name}"
-        else:
-            full_object_name = object_name
-
-        blob = bucket.blob(full_object_name)
-
-        parquet_buffer.seek(0)
-        blob.upload_from_file(parquet_buffer, content_type="application/x-parquet")
-
-        logger.info(f"Successfully wrote {full_object_name} to bucket.")
+        write_object(parquet_buffer, object_name, folder_name, backend="gcs")
     except Exception as e:
         logger.error(f"Failed to write {object_name} to bucket: {e}")
         raise
\ No newline at end of file
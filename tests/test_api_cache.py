@@ -0,0 +1,46 @@
+from api.cache import SnapshotLRUCache
+
+def test_cache_evicts_least_recently_used_by_size():
+    cache = SnapshotLRUCache(max_bytes=100)
+    cache.put(1, "a", "page a", 40)
+    cache.put(1, "b", "page b", 40)
+    cache.get(1, "a")
+    cache.put(1, "c", "page c", 40)
+
+    assert cache.get(1, "a") == "page a"
+    assert cache.get(1, "b") is None
+    assert cache.get(1, "c") == "page c"
+    assert cache.current_bytes == 80
+
+def test_cache_drops_entries_from_older_snapshots():
+    cache = SnapshotLRUCache(max_bytes=100)
+    cache.put(1, "a", "page a", 10)
+
+    assert cache.get(2, "a") is None
+    assert cache.current_bytes == 0
+    cache.put(1, "a", "stale page", 10)
+    assert cache.get(2, "a") is None
+
+def test_cache_never_serves_entries_from_another_snapshot():
+    cache = SnapshotLRUCache(max_bytes=100)
+    cache.put(2, "a", "page a at snapshot 2", 10)
+
+    # e.g. the catalog was rolled back to an older snapshot
+    assert cache.get(1, "a") is None
+    cache.put(1, "a", "page a at snapshot 1", 10)
+    assert cache.get(1, "a") == "page a at snapshot 1"
+    assert cache.get(2, "a") == "page a at snapshot 2"
+
+def test_interleaved_snapshots_do_not_empty_the_cache():
+    cache = SnapshotLRUCache(max_bytes=100)
+    cache.put(1, "a", "page a at snapshot 1", 10)
+    cache.put(2, "a", "page a at snapshot 2", 10)
+    cache.put(1, "b", "page b at snapshot 1", 10)
+    cache.put(2, "b", "page b at snapshot 2", 10)
+
+    assert cache.get(1, "b") == "page b at snapshot 1"
+    assert cache.get(2, "a") == "page a at snapshot 2"
+    assert cache.get(2, "b") == "page b at snapshot 2"
+    # snapshot 1 entries cached after snapshot 2 was first seen go when the next one arrives
+    assert cache.get(3, "a") is None
+    assert cache.current_bytes == 0
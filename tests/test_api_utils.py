@@ -0,0 +1,202 @@
+import gzip
+import json
+import threading
+import pytest
+import duckdb
+import pyarrow as pa
+import api.utils as api_utils
+from api.cache import SnapshotLRUCache
+from api.connection_manager import CatalogGeneration, DuckLakeConnectionManager
+from api.utils import (
+    encode_cursor, decode_cursor, negotiate_response_format, build_dataset_query, build_changes_query,
+    validate_snapshot, SnapshotExpiredError, export_dataset_stream, fetch_single_dataset
+)
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(4, "Kepler-22 b")
+    assert decode_cursor(4, cursor) == "Kepler-22 b"
+
+def test_cursor_rejects_other_dataset():
+    cursor = encode_cursor(1, 42)
+    with pytest.raises(ValueError):
+        decode_cursor(3, cursor)
+
+def test_cursor_rejects_garbage():
+    with pytest.raises(ValueError):
+        decode_cursor(1, "not-a-cursor")
+
+def test_negotiate_response_format():
+    assert negotiate_response_format(None, None) == "json"
+    assert negotiate_response_format("parquet", "application/json") == "parquet"
+    assert negotiate_response_format(None, "text/html, application/vnd.apache.arrow.stream;q=0.9") == "arrow"
+    with pytest.raises(ValueError):
+        negotiate_response_format("xml", None)
+
+
+def test_cursor_rejects_other_order_by():
+    cursor = encode_cursor(4, [1.5, "Kepler-22 b"], "-radius_earth_radii")
+    assert decode_cursor(4, cursor, "-radius_earth_radii") == [1.5, "Kepler-22 b"]
+    with pytest.raises(ValueError):
+        decode_cursor(4, cursor)
+
+def test_build_dataset_query_rejects_unlisted_columns():
+    with pytest.raises(ValueError):
+        build_dataset_query(1, 0, 10, columns="name,password")
+    with pytest.raises(ValueError):
+        build_dataset_query(1, 0, 10, filters=["bio:eq:x"])
+    with pytest.raises(ValueError):
+        build_dataset_query(1, 0, 10, filters=["age:like:4%"])
+    with pytest.raises(ValueError):
+        build_dataset_query(1, 0, 10, order_by="-bio")
+
+def test_build_dataset_query_returns_every_column_by_default():
+    con = duckdb.connect()
+    con.execute("CREATE SCHEMA CLEANED")
+    # unlisted_column is not in DATASET_CONFIG but is still part of the default response
+    con.execute("CREATE TABLE CLEANED.NASA_APOD AS SELECT DATE '2025-01-01' AS date, 'a' AS title, 1 AS unlisted_column")
+    query, params, helper_columns = build_dataset_query(2, 0, 10)
+    assert helper_columns == []
+    cursor = con.execute(query, params)
+    assert [description[0] for description in cursor.description] == ["date", "title", "unlisted_column"]
+
+def test_build_dataset_query_pages_with_compound_keyset():
+    con = duckdb.connect()
+    con.execute("CREATE SCHEMA CLEANED")
+    con.execute("""
+        CREATE TABLE CLEANED.NASA_EXOPLANETS AS
+        SELECT 'p' || lpad(i::VARCHAR, 2, '0') AS planet_name,
+               CASE WHEN i % 4 = 0 THEN NULL ELSE i % 3 END AS radius_earth_radii,
+               2000 + i AS discovery_year
+        FROM range(20) t(i)
+    """)
+    filters = ["discovery_year:gte:2002"]
+    expected = con.execute("""
+        SELECT radius_earth_radii FROM CLEANED.NASA_EXOPLANETS WHERE discovery_year >= 2002
+        ORDER BY radius_earth_radii DESC NULLS LAST, planet_name
+    """).fetchall()
+
+    pages = []
+    cursor = None
+    while True:
+        query, params, helper_columns = build_dataset_query(
+            4, 0, 5, cursor, columns="radius_earth_radii", filters=filters, order_by="-radius_earth_radii"
+        )
+        assert helper_columns == ["planet_name"]
+        rows = con.execute(query, params).fetchall()
+        pages.extend((row[0],) for row in rows)
+        if len(rows) < 5:
+            break
+        cursor = encode_cursor(4, [rows[-1][0], rows[-1][1]], "-radius_earth_radii")
+
+    assert pages == expected
+
+def test_validate_snapshot():
+    validate_snapshot(7, {5, 6, 7}, 7)
+    with pytest.raises(SnapshotExpiredError):
+        validate_snapshot(3, {5, 6, 7}, 7)
+    with pytest.raises(ValueError):
+        validate_snapshot(8, {5, 6, 7}, 7)
+
+def test_build_changes_query_returns_net_changes():
+    con = duckdb.connect()
+    apod_columns = "title, explanation, date, url, hdurl, thumbnail_url, copyright"
+    con.execute(f"""
+        CREATE TABLE apod_v1 AS
+        SELECT 'title ' || i AS title, 'x' AS explanation, DATE '2024-01-01' + i::INTEGER AS date,
+               'u' AS url, NULL::VARCHAR AS hdurl, 'u' AS thumbnail_url, NULL::VARCHAR AS copyright
+        FROM range(5) t(i)
+    """)
+    con.execute("CREATE TABLE apod_v2 AS SELECT * FROM apod_v1")
+    con.execute("UPDATE apod_v2 SET title = 'renamed' WHERE date = DATE '2024-01-02'")
+    con.execute("UPDATE apod_v2 SET copyright = 'NASA' WHERE date = DATE '2024-01-03'")
+    con.execute("DELETE FROM apod_v2 WHERE date = DATE '2024-01-04'")
+    con.execute("INSERT INTO apod_v2 SELECT 'new', 'x', DATE '2024-02-01', 'u', NULL, 'u', NULL")
+    # the change feed also reports a row that was deleted and re-inserted unchanged
+    con.execute(f"""
+        CREATE MACRO ducklake_table_changes(catalog_name, schema_name, table_name, start_snapshot, end_snapshot) AS TABLE
+        SELECT * FROM (SELECT {apod_columns} FROM apod_v1 EXCEPT SELECT {apod_columns} FROM apod_v2)
+        UNION ALL SELECT * FROM (SELECT {apod_columns} FROM apod_v2 EXCEPT SELECT {apod_columns} FROM apod_v1)
+        UNION ALL SELECT * FROM apod_v1 WHERE date = DATE '2024-01-05'
+    """)
+    expected = [
+        ("update", "2024-01-02", "renamed"),
+        ("update", "2024-01-03", "title 2"),
+        ("delete", "2024-01-04", "title 3"),
+        ("insert", "2024-02-01", "new")
+    ]
+
+    for table_recreated in (False, True):
+        changes = []
+        after_key = None
+        while True:
+            query, params = build_changes_query(2, 1, 2, 2, after_key, table_recreated)
+            query = query.replace("CLEANED.NASA_APOD AT (VERSION => 1)", "apod_v1")
+            query = query.replace("CLEANED.NASA_APOD AT (VERSION => 2)", "apod_v2")
+            rows = con.execute(query, params).fetchall()
+            changes.extend((row[0], str(row[3]), row[1]) for row in rows)
+            if len(rows) < 2:
+                break
+            after_key = rows[-1][3]
+        assert changes == expected
+
+@pytest.fixture
+def exoplanets_manager(monkeypatch):
+    def fake_attach(catalog_version):
+        con = duckdb.connect()
+        con.execute("ATTACH ':memory:' AS my_ducklake")
+        con.execute("CREATE SCHEMA my_ducklake.CLEANED")
+        con.execute("""
+            CREATE TABLE my_ducklake.CLEANED.NASA_EXOPLANETS AS
+            SELECT 'p' || lpad(i::VARCHAR, 3, '0') AS planet_name, (i * 1.5)::DOUBLE AS radius_earth_radii FROM range(25) t(i)
+        """)
+        return CatalogGeneration(con, catalog_version, snapshot_id=1)
+
+    manager = DuckLakeConnectionManager("catalog.ducklake", "data", max_concurrent_queries=1, max_concurrent_exports=1)
+    manager._catalog_version = lambda: 1
+    manager._attach = fake_attach
+    monkeypatch.setattr(api_utils, "connection_manager", manager)
+    yield manager
+    manager.close()
+
+def test_export_streams_compressed_arrow(exoplanets_manager):
+    chunks = list(export_dataset_stream(4, "arrow", "zstd", batch_size=10))
+    assert len(chunks) > 1
+
+    compressed = pa.BufferReader(b"".join(chunks))
+    table = pa.ipc.open_stream(pa.CompressedInputStream(compressed, "zstd")).read_all()
+    assert table.num_rows == 25
+    assert table.column("planet_name")[-1].as_py() == "p024"
+
+def test_export_streams_gzipped_ndjson(exoplanets_manager):
+    body = gzip.decompress(b"".join(export_dataset_stream(4, "ndjson", "gzip", batch_size=10)))
+    records = [json.loads(line) for line in body.decode("utf-8").splitlines()]
+    assert len(records) == 25
+    assert records[1] == {"planet_name": "p001", "radius_earth_radii": 1.5}
+
+def test_export_does_not_hold_a_query_slot(exoplanets_manager):
+    export = export_dataset_stream(4, "ndjson", batch_size=5)
+    next(export)
+
+    # the only query slot stays free while the export is mid-download
+    query_finished = threading.Event()
+
+    def run_query():
+        with exoplanets_manager.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM CLEANED.NASA_EXOPLANETS").fetchone()
+        query_finished.set()
+
+    threading.Thread(target=run_query, daemon=True).start()
+    assert query_finished.wait(5)
+    export.close()
+
+
+def test_page_is_cached_under_the_snapshot_it_was_read_from(exoplanets_manager, monkeypatch):
+    result_cache = SnapshotLRUCache(max_bytes=10 ** 6)
+    monkeypatch.setattr(api_utils, "result_cache", result_cache)
+
+    # the caller saw snapshot 0, but a newer catalog (snapshot 1) was attached before the query ran
+    table, next_cursor, snapshot_id = fetch_single_dataset(4, 0, 10, snapshot_id=0, columns="planet_name")
+    assert snapshot_id == 1
+    assert table.num_rows == 10
+    assert result_cache.get(0, ("page", 4, 0, 10, None, "planet_name", (), None, None)) is None
+    assert result_cache.get(1, ("page", 4, 0, 10, None, "planet_name", (), None, None)) == (table, next_cursor)
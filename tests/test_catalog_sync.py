@@ -0,0 +1,134 @@
+import json
+import pytest
+import src.catalog_sync as catalog_sync
+from google.api_core.exceptions import NotFound, NotModified, PreconditionFailed
+from src.catalog_sync import publish_catalog, download_catalog_if_changed, prune_local_catalogs
+
+class FakeBlob:
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+        self.generation = None
+
+    def _check_precondition(self, if_generation_match):
+        current_generation = self.bucket.generations.get(self.name, 0)
+        if if_generation_match is not None and if_generation_match != current_generation:
+            raise PreconditionFailed("generation mismatch")
+
+    def _store(self, data):
+        self.bucket.next_generation += 1
+        self.bucket.objects[self.name] = data
+        self.bucket.generations[self.name] = self.bucket.next_generation
+
+    def upload_from_filename(self, file_path, if_generation_match=None):
+        self._check_precondition(if_generation_match)
+        with open(file_path, "rb") as file:
+            self._store(file.read())
+
+    def upload_from_string(self, data, content_type=None, if_generation_match=None):
+        self._check_precondition(if_generation_match)
+        if self.bucket.before_pointer_write:
+            self.bucket.before_pointer_write()
+        self._check_precondition(if_generation_match)
+        self._store(data.encode())
+
+    def download_as_bytes(self, if_generation_not_match=None):
+        if self.name not in self.bucket.objects:
+            raise NotFound("missing")
+        if if_generation_not_match == self.bucket.generations[self.name]:
+            raise NotModified("unchanged")
+        self.generation = self.bucket.generations[self.name]
+        return self.bucket.objects[self.name]
+
+    def download_to_filename(self, file_path):
+        with open(file_path, "wb") as file:
+            file.write(self.bucket.objects[self.name])
+
+    def delete(self):
+        del self.bucket.objects[self.name]
+
+class FakeBucket:
+    def __init__(self):
+        self.objects = {}
+        self.generations = {}
+        self.next_generation = 0
+        self.before_pointer_write = None
+
+    def blob(self, name):
+        return FakeBlob(self, name)
+
+    def list_blobs(self, prefix):
+        return [FakeBlob(self, name) for name in self.objects if name.startswith(prefix)]
+
+class FakeClient:
+    def __init__(self, bucket):
+        self._bucket = bucket
+
+    def bucket(self, name):
+        return self._bucket
+
+@pytest.fixture
+def bucket(monkeypatch):
+    bucket = FakeBucket()
+    monkeypatch.setattr(catalog_sync, "get_gcs_client", lambda: FakeClient(bucket))
+    return bucket
+
+def test_publish_and_poll_catalog_generations(bucket, tmp_path):
+    catalog_path = tmp_path / "catalog.ducklake"
+    local_directory = tmp_path / "api"
+    catalog_path.write_bytes(b"first")
+    assert download_catalog_if_changed("bucket", str(local_directory)) is None
+
+    publish_catalog("bucket", str(catalog_path))
+    pointer_generation, local_path = download_catalog_if_changed("bucket", str(local_directory))
+    assert open(local_path, "rb").read() == b"first"
+    # an unchanged pointer is not downloaded again
+    assert download_catalog_if_changed("bucket", str(local_directory), pointer_generation) is None
+
+    catalog_path.write_bytes(b"second")
+    pointer = publish_catalog("bucket", str(catalog_path))
+    assert pointer["sequence"] == 2
+    new_generation, new_local_path = download_catalog_if_changed("bucket", str(local_directory), pointer_generation)
+    assert new_generation != pointer_generation
+    assert open(new_local_path, "rb").read() == b"second"
+
+    prune_local_catalogs(str(local_directory), {new_local_path})
+    assert [path.name for path in local_directory.iterdir()] == ["catalog-0000000002.ducklake"]
+
+def test_concurrent_publish_does_not_overwrite_pointer(bucket, tmp_path):
+    catalog_path = tmp_path / "catalog.ducklake"
+    catalog_path.write_bytes(b"ours")
+
+    def competing_publish():
+        bucket.before_pointer_write = None
+        bucket.blob(catalog_sync.CATALOG_POINTER_OBJECT).upload_from_string(json.dumps({"sequence": 1, "object_name": "theirs"}))
+
+    bucket.before_pointer_write = competing_publish
+    with pytest.raises(PreconditionFailed):
+        publish_catalog("bucket", str(catalog_path))
+
+    pointer = json.loads(bucket.objects[catalog_sync.CATALOG_POINTER_OBJECT])
+    assert pointer["object_name"] == "theirs"
+    # the losing publisher's catalog upload is removed
+    assert list(bucket.objects) == [catalog_sync.CATALOG_POINTER_OBJECT]
+
+def test_poller_installs_new_catalog_and_prunes_the_previous_one(monkeypatch, tmp_path):
+    import api.catalog_poller as catalog_poller
+
+    class FakeManager:
+        catalog_path = str(tmp_path / "catalog-0000000001.ducklake")
+
+        def use_catalog(self, catalog_path):
+            self.catalog_path = catalog_path
+
+    (tmp_path / "catalog-0000000001.ducklake").write_bytes(b"first")
+    (tmp_path / "catalog-0000000002.ducklake").write_bytes(b"second")
+    new_local_path = str(tmp_path / "catalog-0000000002.ducklake")
+    monkeypatch.setattr(catalog_poller, "download_catalog_if_changed", lambda bucket, directory, generation: (7, new_local_path))
+    manager = FakeManager()
+    poller = catalog_poller.CatalogPoller(manager, "bucket", str(tmp_path), 60)
+
+    assert poller.poll()
+    assert manager.catalog_path == new_local_path
+    assert poller.pointer_generation == 7
+    assert [path.name for path in tmp_path.iterdir()] == ["catalog-0000000002.ducklake"]
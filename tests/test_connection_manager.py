@@ -0,0 +1,126 @@
+import os
+import subprocess
+import sys
+import threading
+import duckdb
+import pytest
+import api.connection_manager as connection_manager_module
+from api.connection_manager import CatalogGeneration, DuckLakeConnectionManager, build_replica
+
+def test_build_replica_copies_only_requested_schemas(tmp_path):
+    con = duckdb.connect()
+    con.execute("ATTACH ':memory:' AS my_ducklake")
+    for schema_name in ["STAGED", "CLEANED", "AGGREGATES"]:
+        con.execute(f"CREATE SCHEMA my_ducklake.{schema_name}")
+    con.execute("CREATE TABLE my_ducklake.STAGED.A AS SELECT 1 AS x")
+    con.execute("CREATE TABLE my_ducklake.CLEANED.A AS SELECT range AS x FROM range(5)")
+    con.execute("CREATE TABLE my_ducklake.AGGREGATES.A AS SELECT 'total' AS aggregate, 5 AS value")
+
+    replica_path = str(tmp_path / "replica-1.duckdb")
+    build_replica(con, replica_path, ["CLEANED", "AGGREGATES"])
+
+    assert not os.path.exists(f"{replica_path}.building")
+    replica = duckdb.connect(replica_path, read_only=True)
+    tables = replica.execute("SELECT schema_name, table_name FROM duckdb_tables() ORDER BY ALL").fetchall()
+    assert tables == [("AGGREGATES", "A"), ("CLEANED", "A")]
+    assert replica.execute("SELECT count(*) FROM CLEANED.A").fetchone()[0] == 5
+
+def wait_for_refresh(manager):
+    for _ in range(100):
+        if manager._refreshing_version is None:
+            break
+        threading.Event().wait(0.05)
+
+@pytest.mark.parametrize("serving_mode", ["ducklake", "replica"])
+def test_old_generation_serves_until_new_one_is_ready(tmp_path, serving_mode):
+    manager = DuckLakeConnectionManager("catalog.ducklake", "data", serving_mode=serving_mode, replica_directory=str(tmp_path))
+    catalog_version = {"value": 1}
+    build_started = threading.Event()
+    release_build = threading.Event()
+
+    def fake_attach(version):
+        if version == 2:
+            build_started.set()
+            release_build.wait(5)
+        return CatalogGeneration(duckdb.connect(), version, snapshot_id=version * 10)
+
+    manager._catalog_version = lambda: catalog_version["value"]
+    manager._attach = fake_attach
+    manager.start()
+    assert manager.current_snapshot_id() == 10
+
+    catalog_version["value"] = 2
+    assert manager.current_snapshot_id() == 10
+    assert build_started.wait(5)
+    assert manager.current_snapshot_id() == 10
+
+    release_build.set()
+    wait_for_refresh(manager)
+    assert manager.current_snapshot_id() == 20
+    manager.close()
+
+def test_catalog_stays_writable_and_changes_are_reattached(tmp_path, monkeypatch):
+    catalog_path = str(tmp_path / "catalog.ducklake")
+
+    def write_snapshot(snapshot_id):
+        # a separate process, like db_sync, needs a read-write lock on the shared catalog
+        subprocess.run([sys.executable, "-c", (
+            "import duckdb; con = duckdb.connect(%r); "
+            "con.execute('CREATE TABLE IF NOT EXISTS snapshots (snapshot_id INTEGER)'); "
+            "con.execute('INSERT INTO snapshots VALUES (%d)'); con.close()"
+        ) % (catalog_path, snapshot_id)], check=True)
+
+    def fake_attach_ducklake(catalog_copy_path, data_path):
+        con = duckdb.connect()
+        con.execute(f"ATTACH '{catalog_copy_path}' AS my_ducklake (READ_ONLY)")
+        snapshot_id = con.execute("SELECT max(snapshot_id) FROM my_ducklake.snapshots").fetchone()[0]
+        return con, snapshot_id
+
+    monkeypatch.setattr(connection_manager_module, "attach_ducklake", fake_attach_ducklake)
+    write_snapshot(1)
+    manager = DuckLakeConnectionManager(catalog_path, "data")
+    manager.start()
+    assert manager.current_snapshot_id() == 1
+    first_generation = manager._generation
+
+    write_snapshot(2)
+    os.utime(catalog_path, ns=(0, os.stat(catalog_path).st_mtime_ns + 1))
+    # the change is noticed by the next request and attached in the background
+    assert manager.current_snapshot_id() == 1
+    wait_for_refresh(manager)
+    with manager.cursor() as cursor:
+        assert cursor.execute("SELECT max(snapshot_id) FROM snapshots").fetchone()[0] == 2
+    assert manager.current_snapshot_id() == 2
+    # the retired generation is closed and its private catalog copy removed
+    assert not os.path.exists(first_generation.catalog_copy_path)
+    manager.close()
+
+
+def test_failed_refresh_is_not_retried_until_the_catalog_changes(tmp_path):
+    manager = DuckLakeConnectionManager("catalog.ducklake", "data", serving_mode="replica", replica_directory=str(tmp_path))
+    catalog_version = {"value": 1}
+    attempts = []
+
+    def fake_attach(version):
+        attempts.append(version)
+        if version == 2:
+            raise RuntimeError("replica build failed")
+        return CatalogGeneration(duckdb.connect(), version, snapshot_id=version * 10)
+
+    manager._catalog_version = lambda: catalog_version["value"]
+    manager._attach = fake_attach
+    manager.start()
+
+    catalog_version["value"] = 2
+    manager.current_snapshot_id()
+    wait_for_refresh(manager)
+    for _ in range(5):
+        assert manager.current_snapshot_id() == 10
+    assert attempts == [1, 2]
+
+    catalog_version["value"] = 3
+    manager.current_snapshot_id()
+    wait_for_refresh(manager)
+    assert manager.current_snapshot_id() == 30
+    assert attempts == [1, 2, 3]
+    manager.close()
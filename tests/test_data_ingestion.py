@@ -0,0 +1,48 @@
+import importlib
+import io
+import json
+from urllib.parse import urlparse, parse_qs
+from src.utils import SOURCE_SCHEMAS, compute_content_hash
+
+data_ingestion = importlib.import_module("src.data_ingestion")
+
+def test_fetch_paginated_dataframe_fetches_every_page(monkeypatch):
+    records = [{"id": index, "name": f"astronaut {index}", "wiki": None if index < 3 else "w"} for index in range(7)]
+    requested_offsets = []
+
+    def fake_fetch_bytes(url):
+        query = parse_qs(urlparse(url).query)
+        offset = int(query["offset"][0])
+        requested_offsets.append(offset)
+        # the server caps page size at 3 regardless of the requested limit
+        page = records[offset:offset + 3]
+        return json.dumps({"count": len(records), "next": None, "results": page}).encode()
+
+    monkeypatch.setattr(data_ingestion, "fetch_bytes", fake_fetch_bytes)
+    dataframe = data_ingestion.fetch_paginated_dataframe("https://api.example/astronaut/?is_human=true", page_size=5, max_concurrency=2)
+
+    assert sorted(requested_offsets) == [0, 3, 6]
+    assert dataframe["id"].to_list() == list(range(7))
+    assert dataframe["wiki"].null_count() == 3
+
+def test_empty_donki_response_is_skipped(monkeypatch):
+    monkeypatch.setenv("NASA_DONKI_API", "https://donki.example")
+    monkeypatch.setattr(data_ingestion, "fetch_bytes", lambda url: b"[]")
+
+    dataframe = data_ingestion.fetch_api_dataframe("https://donki.example/notifications?startDate=2026-10-01")
+    assert dataframe.is_empty()
+    assert dataframe.schema == SOURCE_SCHEMAS["NASA_DONKI"]
+
+    result = data_ingestion.ingest_API_data.fn("https://donki.example/notifications", "nasa_donki.parquet", "previous")
+    assert result["changed"] is False
+    assert result["content_hash"] == "previous"
+
+def test_unchanged_payload_is_not_uploaded(monkeypatch):
+    uploads = []
+    monkeypatch.setattr(data_ingestion, "write_data_to_gcs", lambda buffer, name, folder: uploads.append(name))
+    payload = io.BytesIO(b"parquet bytes")
+    previous_hash = compute_content_hash(io.BytesIO(b"parquet bytes"))
+    assert data_ingestion.upload_if_changed(payload, "astronauts.parquet", previous_hash) == (previous_hash, False)
+    assert uploads == []
+    assert data_ingestion.upload_if_changed(io.BytesIO(b"new bytes"), "astronauts.parquet", previous_hash)[1] is True
+    assert uploads == ["astronauts.parquet"]
@@ -0,0 +1,61 @@
+import duckdb
+from src.data_quality import run_data_quality_checks
+
+EXOPLANET_RULES = {
+    "STAGED.NASA_EXOPLANETS": {
+        "not_null": ["planet_name"],
+        "unique": ["planet_name"],
+        "ranges": {"system_distance": (0, None), "radius_earth_radii": (0, None)},
+        "max_row_count_drop": 0.1
+    }
+}
+
+def create_staged_exoplanets(con, rows):
+    con.execute("CREATE SCHEMA IF NOT EXISTS STAGED")
+    con.execute("CREATE OR REPLACE TABLE STAGED.NASA_EXOPLANETS (planet_name VARCHAR, system_distance DOUBLE, radius_earth_radii DOUBLE)")
+    con.executemany("INSERT INTO STAGED.NASA_EXOPLANETS VALUES (?, ?, ?)", rows)
+
+def test_data_quality_passes_clean_table():
+    con = duckdb.connect()
+    create_staged_exoplanets(con, [("a", 1.0, 1.0), ("b", 2.0, None)])
+
+    reports = run_data_quality_checks(con, tables=["STAGED.NASA_EXOPLANETS"], previous_row_counts={"STAGED.NASA_EXOPLANETS": 2}, rules_by_table=EXOPLANET_RULES)
+
+    assert reports["STAGED.NASA_EXOPLANETS"]["passed"]
+    assert reports["STAGED.NASA_EXOPLANETS"]["row_count"] == 2
+
+def test_data_quality_reports_violations_with_limited_samples():
+    con = duckdb.connect()
+    create_staged_exoplanets(con, [("a", 1.0, 1.0), ("a", 2.0, 1.0), (None, -5.0, 1.0), (None, 3.0, 1.0)])
+
+    report = run_data_quality_checks(
+        con,
+        tables=["STAGED.NASA_EXOPLANETS"],
+        previous_row_counts={"STAGED.NASA_EXOPLANETS": 100},
+        sample_size=1,
+        rules_by_table=EXOPLANET_RULES
+    )["STAGED.NASA_EXOPLANETS"]
+    failed_checks = {(check["rule"], check["column"]): check for check in report["checks"] if not check["passed"]}
+
+    assert not report["passed"]
+    assert failed_checks[("not_null", "planet_name")]["violations"] == 2
+    assert len(failed_checks[("not_null", "planet_name")]["samples"]) == 1
+    assert failed_checks[("unique", "planet_name")]["violations"] == 1
+    assert failed_checks[("range", "system_distance")]["samples"][0]["system_distance"] == -5.0
+    assert ("row_count_drop", None) in failed_checks
+
+def test_donki_fails_only_when_every_message_column_is_null():
+    con = duckdb.connect()
+    con.execute("CREATE SCHEMA STAGED")
+    con.execute("""
+        CREATE TABLE STAGED.NASA_DONKI AS
+        SELECT * FROM (VALUES ('m1', 'FLR', NULL, 'body'), ('m2', NULL, NULL, NULL))
+        AS t(message_id, message_type, message_issue_time_human_readable, message_body)
+    """)
+    assert run_data_quality_checks(con, tables=["STAGED.NASA_DONKI"])["STAGED.NASA_DONKI"]["passed"]
+
+    con.execute("INSERT INTO STAGED.NASA_DONKI VALUES (NULL, NULL, NULL, NULL)")
+    report = run_data_quality_checks(con, tables=["STAGED.NASA_DONKI"])["STAGED.NASA_DONKI"]
+    assert not report["passed"]
+    assert report["checks"][0]["rule"] == "not_all_null"
+    assert report["checks"][0]["violations"] == 1
@@ -0,0 +1,80 @@
+import datetime
+import os
+import src.http_client as http_client
+from src.http_client import retry_after_seconds, fetch_bytes, read_json_dataframe, write_cached_response, evict_cached_responses
+
+class FakeResponse:
+    def __init__(self, status_code, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append(headers)
+        return self.responses.pop(0)
+
+def test_retry_after_seconds_parses_delta_and_http_date():
+    now = datetime.datetime(2025, 1, 1, 12, 0, 0, tzinfo=datetime.timezone.utc)
+    assert retry_after_seconds("7") == 7.0
+    assert retry_after_seconds("Wed, 01 Jan 2025 12:00:30 GMT", now=now) == 30.0
+    assert retry_after_seconds("soon") is None
+    assert retry_after_seconds(None) is None
+
+def test_fetch_bytes_retries_rate_limit_and_revalidates_cache(monkeypatch, tmp_path):
+    sleeps = []
+    monkeypatch.setattr(http_client, "HTTP_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(http_client.time, "sleep", sleeps.append)
+    session = FakeSession([
+        FakeResponse(429, headers={"Retry-After": "3"}),
+        FakeResponse(200, b'[{"a": 1}]', {"ETag": '"v1"'}),
+        FakeResponse(304)
+    ])
+    monkeypatch.setattr(http_client, "get_http_session", lambda: session)
+
+    assert fetch_bytes("https://api.example/data") == b'[{"a": 1}]'
+    assert sleeps == [3.0]
+    assert fetch_bytes("https://api.example/data") == b'[{"a": 1}]'
+    assert session.requests[-1] == {"If-None-Match": '"v1"'}
+
+def test_read_json_dataframe_unpacks_nested_records():
+    body = b'{"count": 2, "next": null, "results": [{"name": "a", "age": 40}, {"name": "b", "age": null}]}'
+    dataframe = read_json_dataframe(body, records_field="results")
+    assert dataframe.columns == ["name", "age"]
+    assert dataframe["name"].to_list() == ["a", "b"]
+    assert read_json_dataframe(b'{"count": 0, "next": null, "results": []}', records_field="results").is_empty()
+
+def test_cache_evicts_old_and_least_recently_used_entries(monkeypatch, tmp_path):
+    monkeypatch.setattr(http_client, "HTTP_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(http_client, "HTTP_CACHE_MAX_BYTES", 10 ** 9)
+    now = 1_000_000_000
+    urls = [f"https://donki.example/notifications?startDate=2026-10-{day + 1:02d}" for day in range(10)]
+    for day, url in enumerate(urls):
+        write_cached_response(url, {"etag": f'"{day}"'}, b"x" * 100)
+    for day, url in enumerate(urls):
+        for path in http_client.cached_response_paths(url):
+            os.utime(path, (now - (9 - day) * 86400, now - (9 - day) * 86400))
+
+    # entries older than 3 days are removed
+    assert evict_cached_responses(max_age_days=3, max_bytes=10 ** 9, now=now) == 6
+    assert len(os.listdir(tmp_path)) == 8
+    # then the least recently used until the cache fits
+    assert evict_cached_responses(max_age_days=3, max_bytes=250, now=now) == 2
+    assert http_client.read_cached_response("https://donki.example/notifications?startDate=2026-10-10") is not None
+    assert http_client.read_cached_response("https://donki.example/notifications?startDate=2026-10-08") is None
+
+
+def test_cache_eviction_skips_entries_removed_concurrently(monkeypatch, tmp_path):
+    monkeypatch.setattr(http_client, "HTTP_CACHE_DIR", str(tmp_path))
+    write_cached_response("https://donki.example/notifications", {"etag": '"1"'}, b"x" * 100)
+    listed = os.listdir(tmp_path) + ["0" * 64 + ".json", "0" * 64 + ".body"]
+    monkeypatch.setattr(http_client.os, "listdir", lambda path: listed)
+    assert evict_cached_responses(max_age_days=7, max_bytes=0) == 1
@@ -0,0 +1,50 @@
+import io
+import src.object_store as object_store
+from src.object_store import plan_upload_parts, gcs_parallel_composite_upload
+
+class FakeBlob:
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+        self.content_type = None
+
+    def upload_from_file(self, file_object, size=None, content_type=None):
+        self.bucket.failures_left -= 1
+        if self.bucket.failures_left >= 0:
+            raise ConnectionError("transient failure")
+        self.bucket.objects[self.name] = file_object.read(size)
+
+    def compose(self, sources):
+        self.bucket.objects[self.name] = b"".join(self.bucket.objects[source.name] for source in sources)
+
+    def delete(self):
+        del self.bucket.objects[self.name]
+
+class FakeBucket:
+    def __init__(self, failures=0):
+        self.objects = {}
+        self.failures_left = failures
+
+    def blob(self, name):
+        return FakeBlob(self, name)
+
+def test_plan_upload_parts_covers_object_within_part_limit():
+    parts = plan_upload_parts(100, 30)
+    assert parts == [(0, 30), (30, 30), (60, 30), (90, 10)]
+
+    parts = plan_upload_parts(1000, 10, max_parts=32)
+    assert len(parts) <= 32
+    assert sum(length for offset, length in parts) == 1000
+
+def test_parallel_composite_upload_retries_parts_and_cleans_up(monkeypatch):
+    monkeypatch.setattr(object_store, "OBJECT_STORE_PART_BYTES", 10)
+    monkeypatch.setattr(object_store.time, "sleep", lambda seconds: None)
+    payload = bytes(range(256)) * 4
+    bucket = FakeBucket(failures=2)
+    destination = bucket.blob("RAW_DATA/file.parquet")
+
+    part_count = gcs_parallel_composite_upload(bucket, destination, io.BytesIO(payload), len(payload), "application/x-parquet")
+
+    assert part_count == 32
+    assert bucket.objects == {"RAW_DATA/file.parquet": payload}
+    assert destination.content_type == "application/x-parquet"
@@ -0,0 +1,58 @@
+import pytest
+import src.runner as runner
+from src.runner import collect_ingestion_results, sync_changed_sources
+
+class FakeFuture:
+    def __init__(self, result=None, error=None):
+        self._result = result
+        self._error = error
+
+    def result(self):
+        if self._error:
+            raise self._error
+        return self._result
+
+def ingestion_result(file_name, content_hash, changed):
+    return {"file_name": file_name, "seconds": 1.0, "content_hash": content_hash, "changed": changed}
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    calls = {"db_sync": [], "state": {}}
+
+    def fake_db_sync(full_refresh_tables, changed_tables):
+        if calls.get("fail_sync"):
+            raise RuntimeError("sync failed")
+        calls["db_sync"].append(changed_tables)
+
+    monkeypatch.setattr(runner, "wait", lambda futures: None)
+    monkeypatch.setattr(runner, "db_sync", fake_db_sync)
+    monkeypatch.setattr(runner, "write_pipeline_state", lambda name, state: calls["state"].__setitem__(name, dict(state)))
+    return calls
+
+def test_failed_source_does_not_block_the_others(pipeline):
+    futures = {
+        "astronauts.parquet": FakeFuture(ingestion_result("astronauts.parquet", "a2", True)),
+        "nasa_donki.parquet": FakeFuture(error=TimeoutError("task timed out after 900 seconds")),
+        "nasa_apod.parquet": FakeFuture(ingestion_result("nasa_apod.parquet", "p2", True))
+    }
+    results, failed_files = collect_ingestion_results(futures)
+    assert failed_files == ["nasa_donki.parquet"]
+
+    source_hashes = {"nasa_donki.parquet": "d1"}
+    assert sync_changed_sources(results, [], source_hashes) == ["ASTRONAUTS", "NASA_APOD"]
+    assert pipeline["db_sync"] == [["ASTRONAUTS", "NASA_APOD"]]
+    # the failed source keeps the hash of the file that was last loaded
+    assert pipeline["state"]["source_hashes"] == {"nasa_donki.parquet": "d1", "astronauts.parquet": "a2", "nasa_apod.parquet": "p2"}
+
+def test_unchanged_sources_skip_the_sync(pipeline):
+    results = [ingestion_result("astronauts.parquet", "a1", False), ingestion_result("nasa_apod.parquet", "p1", False)]
+    assert sync_changed_sources(results, [], {"astronauts.parquet": "a1", "nasa_apod.parquet": "p1"}) == []
+    assert pipeline["db_sync"] == []
+    assert pipeline["state"] == {}
+
+def test_hashes_are_only_written_after_a_successful_sync(pipeline):
+    pipeline["fail_sync"] = True
+    results = [ingestion_result("astronauts.parquet", "a2", True)]
+    with pytest.raises(RuntimeError):
+        sync_changed_sources(results, [], {"astronauts.parquet": "a1"})
+    assert "source_hashes" not in pipeline["state"]
@@ -0,0 +1,150 @@
+import duckdb
+from src.sql_dag import parse_sql_dependencies, load_sql_nodes, downstream_tables, run_sql_dag
+
+def test_parse_sql_dependencies():
+    sql = "CREATE OR REPLACE TABLE STAGED.NASA_DONKI AS SELECT messageID FROM RAW_DATA.NASA_DONKI WHERE messageID IS NOT NULL;"
+    assert parse_sql_dependencies(sql) == ("STAGED.NASA_DONKI", {"RAW_DATA.NASA_DONKI"})
+
+def test_repo_sql_lineages():
+    nodes = load_sql_nodes(["SQL/staging", "SQL/cleaned_aggregation", "SQL/aggregates"])
+    assert nodes["CLEANED.NASA_DONKI"]["depends_on"] == {"STAGED.NASA_DONKI"}
+    assert downstream_tables(nodes, ["RAW_DATA.NASA_DONKI"]) == {"STAGED.NASA_DONKI", "CLEANED.NASA_DONKI", "AGGREGATES.NASA_DONKI"}
+
+def test_exoplanet_radius_histogram_aggregate():
+    con = duckdb.connect()
+    for schema_name in ["CLEANED", "AGGREGATES"]:
+        con.execute(f"CREATE SCHEMA {schema_name}")
+    con.execute("""
+        CREATE TABLE CLEANED.NASA_EXOPLANETS AS
+        SELECT * FROM (VALUES
+            ('a', 'h1', 10.0, 2001, 0, 'Transit', 0.2, 1.0),
+            ('b', 'h1', 20.0, 2001, 1, 'Transit', 0.7, 1.2),
+            ('c', 'h2', NULL, 2003, 0, 'RV', 34.5, 12.0),
+            ('d', 'h3', 30.0, 2003, 0, 'RV', NULL, 0.4)
+        ) t(planet_name, host_star, system_distance, discovery_year, controversial_flag,
+            discovery_method, radius_earth_radii, star_radius_solar_radii)
+    """)
+    node = load_sql_nodes(["SQL/aggregates"])["AGGREGATES.NASA_EXOPLANETS"]
+    con.execute(node["sql"])
+
+    histogram = con.execute("""
+        SELECT label, value FROM AGGREGATES.NASA_EXOPLANETS
+        WHERE aggregate = 'radius_histogram' ORDER BY position
+    """).fetchall()
+    assert len(histogram) == 69
+    assert histogram[0] == ("0.0–0.5", 1)
+    assert histogram[1] == ("0.5–1.0", 1)
+    assert histogram[-1] == ("34.0–34.5", 1)
+    scalars = dict(con.execute("SELECT aggregate, value FROM AGGREGATES.NASA_EXOPLANETS WHERE label IS NULL").fetchall())
+    assert scalars == {"total_exoplanets": 4, "average_system_distance": 20, "unique_host_stars": 3, "controversial_count": 1}
+
+def test_run_sql_dag_builds_only_downstream_tables():
+    con = duckdb.connect()
+    con.execute("ATTACH ':memory:' AS my_ducklake")
+    con.execute("USE my_ducklake")
+    for schema_name in ["RAW_DATA", "STAGED", "CLEANED"]:
+        con.execute(f"CREATE SCHEMA {schema_name}")
+    con.execute("CREATE TABLE RAW_DATA.A AS SELECT 1 AS x")
+    con.execute("CREATE TABLE RAW_DATA.B AS SELECT 2 AS x")
+    con.execute("CREATE TABLE STAGED.B AS SELECT 0 AS x")
+
+    nodes = {}
+    for sql in [
+        "CREATE OR REPLACE TABLE STAGED.A AS SELECT x FROM RAW_DATA.A",
+        "CREATE OR REPLACE TABLE STAGED.B AS SELECT x FROM RAW_DATA.B",
+        "CREATE OR REPLACE TABLE CLEANED.A AS SELECT x + 10 AS x FROM STAGED.A",
+    ]:
+        target_table, source_tables = parse_sql_dependencies(sql)
+        nodes[target_table] = {"path": target_table, "sql": sql, "depends_on": source_tables}
+
+    timings = run_sql_dag(con, nodes, changed_tables=["RAW_DATA.A"], max_workers=2)
+
+    assert set(timings) == {"STAGED.A", "CLEANED.A"}
+    assert con.execute("SELECT x FROM CLEANED.A").fetchone()[0] == 11
+    # STAGED.B already exists and RAW_DATA.B did not change
+    assert con.execute("SELECT x FROM STAGED.B").fetchone()[0] == 0
+
+def test_run_sql_dag_builds_missing_tables_without_changes():
+    con = duckdb.connect()
+    con.execute("ATTACH ':memory:' AS my_ducklake")
+    con.execute("USE my_ducklake")
+    for schema_name in ["STAGED", "CLEANED", "AGGREGATES"]:
+        con.execute(f"CREATE SCHEMA {schema_name}")
+    con.execute("CREATE TABLE STAGED.A AS SELECT 1 AS x")
+    con.execute("CREATE TABLE STAGED.B AS SELECT 2 AS x")
+    con.execute("CREATE TABLE CLEANED.A AS SELECT 1 AS x")
+
+    nodes = {}
+    for sql in [
+        "CREATE OR REPLACE TABLE CLEANED.A AS SELECT x FROM STAGED.A",
+        "CREATE OR REPLACE TABLE AGGREGATES.A AS SELECT count(*) AS n FROM CLEANED.A",
+        "CREATE OR REPLACE TABLE CLEANED.B AS SELECT x FROM STAGED.B",
+        "CREATE OR REPLACE TABLE AGGREGATES.B AS SELECT count(*) AS n FROM CLEANED.B",
+        "CREATE OR REPLACE TABLE CLEANED.C AS SELECT x FROM STAGED.C",
+    ]:
+        target_table, source_tables = parse_sql_dependencies(sql)
+        nodes[target_table] = {"path": target_table, "sql": sql, "depends_on": source_tables}
+
+    timings = run_sql_dag(con, nodes, changed_tables=[], max_workers=2)
+    # CLEANED.C is skipped because its source does not exist either
+    assert set(timings) == {"AGGREGATES.A", "CLEANED.B", "AGGREGATES.B"}
+
+    con.execute("DROP TABLE AGGREGATES.B")
+    con.execute("DROP TABLE CLEANED.B")
+    assert run_sql_dag(con, nodes, changed_tables=[], blocked_tables=["STAGED.B"]) == {}
+
+def test_cleaned_astronauts_migrates_a_baseline_table():
+    con = duckdb.connect()
+    for schema_name in ["STAGED", "CLEANED"]:
+        con.execute(f"CREATE SCHEMA {schema_name}")
+    # CLEANED.ASTRONAUTS as built before the duration seconds columns existed
+    con.execute("""
+        CREATE TABLE CLEANED.ASTRONAUTS AS
+        SELECT 1::BIGINT AS id, 'a' AS name, 'NASA' AS agency, 'NASA' AS agency_abbrev, NULL AS image_url,
+               '1 day' AS time_in_space, NULL AS eva_time, 40 AS age, NULL AS bio, NULL AS wiki,
+               0 AS spacewalks_count, NULL AS url, NULL AS thumbnail_url
+    """)
+    con.execute("""
+        CREATE TABLE STAGED.ASTRONAUTS AS
+        SELECT 1::BIGINT AS id, 'a' AS name, 'NASA' AS agency, 'NASA' AS agency_abbrev, NULL AS image_url,
+               '1 day' AS time_in_space, NULL AS eva_time, 86400::BIGINT AS time_in_space_seconds,
+               NULL::BIGINT AS eva_time_seconds, 40 AS age, NULL AS bio, NULL AS wiki,
+               0 AS spacewalks_count, NULL AS url, NULL AS thumbnail_url
+    """)
+    con.execute(load_sql_nodes(["SQL/cleaned_aggregation"])["CLEANED.ASTRONAUTS"]["sql"])
+
+    assert con.execute("SELECT id, time_in_space_seconds FROM CLEANED.ASTRONAUTS").fetchall() == [(1, 86400)]
+
+def test_astronauts_keep_their_upstream_id_when_rows_shift():
+    con = duckdb.connect()
+    for schema_name in ["RAW_DATA", "STAGED", "CLEANED"]:
+        con.execute(f"CREATE SCHEMA {schema_name}")
+    nodes = load_sql_nodes(["SQL/staging", "SQL/cleaned_aggregation"])
+
+    def load_raw(astronauts):
+        con.execute("""
+            CREATE OR REPLACE TABLE RAW_DATA.ASTRONAUTS (
+                _record_id BIGINT, id BIGINT, name VARCHAR, agency_name VARCHAR, agency_abbrev VARCHAR,
+                image_url VARCHAR, time_in_space_human_readable VARCHAR, eva_time_human_readable VARCHAR,
+                time_in_space_seconds BIGINT, eva_time_seconds BIGINT, age BIGINT, bio VARCHAR, wiki VARCHAR,
+                spacewalks_count BIGINT, url VARCHAR, thumbnail_url VARCHAR
+            )
+        """)
+        for record_id, (astronaut_id, name) in enumerate(astronauts, start=1):
+            con.execute(
+                "INSERT INTO RAW_DATA.ASTRONAUTS (_record_id, id, name) VALUES (?, ?, ?)", [record_id, astronaut_id, name]
+            )
+        con.execute(nodes["STAGED.ASTRONAUTS"]["sql"])
+        con.execute(nodes["CLEANED.ASTRONAUTS"]["sql"])
+
+    # a page boundary shift repeats astronaut 30
+    load_raw([(10, "a"), (20, "b"), (30, "c"), (30, "c")])
+    existing_rows = con.execute("SELECT rowid, id FROM CLEANED.ASTRONAUTS ORDER BY id").fetchall()
+    # upstream inserts astronaut 5 first; everyone else moves down one row
+    load_raw([(5, "new"), (10, "a"), (20, "b"), (30, "c")])
+
+    assert con.execute("SELECT id, name FROM CLEANED.ASTRONAUTS ORDER BY id").fetchall() == [
+        (5, "new"), (10, "a"), (20, "b"), (30, "c")
+    ]
+    # existing astronauts were not rewritten, so the change feed has no false update/delete pairs
+    assert con.execute("SELECT rowid, id FROM CLEANED.ASTRONAUTS WHERE id <> 5 ORDER BY id").fetchall() == existing_rows
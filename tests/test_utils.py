@@ -1,6 +1,12 @@
+import pytest
+import duckdb
 import polars as pl
-from datetime import datetime
-from src.utils import add_query_params, iso_to_human, handle_date_adjustment, convert_dataframe_to_parquet, preprocess_apod_data
+import io
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datetime import datetime, timedelta, timezone
+from src.utils import add_query_params, iso_to_human, handle_date_adjustment, convert_dataframe_to_parquet, preprocess_apod_data, incremental_start_date, compute_content_hash, table_name_from_file, iso_duration_seconds_expr, human_duration_expr, normalize_to_schema, detect_schema_drift, stream_csv_to_parquet, snapshots_to_expire
+from src.utils import check_raw_file_schemas, replace_table_from_parquet_file, upsert_parquet_file, preprocess_astronaut_data, SOURCE_SCHEMAS, record_watermarks
 
 def test_add_query_params():
     url = "https://example.com"
@@ -13,6 +19,17 @@ def test_iso_to_human():
     expected = "345 days, 8 hours, 18 minutes, 1 seconds"
     assert iso_to_human(iso_string) == expected
 
+def test_vectorized_iso_duration_matches_iso_to_human():
+    iso_strings = ["P345DT8H18M1S", "PT0S", "PT30H", "PT1.9S", "P1DT0H0M0S", "PT59M60S", "PT5M"]
+    test_dataframe = pl.DataFrame({"duration": iso_strings + [None]}).with_columns(
+        iso_duration_seconds_expr("duration").alias("seconds")
+    ).with_columns(
+        human_duration_expr(pl.col("seconds")).alias("human_readable")
+    )
+
+    assert test_dataframe["human_readable"].to_list() == [iso_to_human(value) for value in iso_strings] + [None]
+    assert test_dataframe["seconds"].to_list()[:2] == [29837881, 0]
+
 def test_handle_date_adjustment():
     today_dt = datetime.strptime("2025-09-01T12:34:56Z", "%Y-%m-%dT%H:%M:%SZ")
     today_date = today_dt.date()
@@ -48,3 +65,128 @@ def test_preprocess_apod_data():
 
     assert fake_apod_preprocessed_dataframe.shape == (1, 12)
     assert fake_apod_preprocessed_dataframe.columns == expected_columns
+
+def test_incremental_start_date():
+    today = datetime.strptime("2025-09-01", "%Y-%m-%d").date()
+    assert incremental_start_date(today, "2025-08-30T14:05Z", years=5, overlap_days=2).strftime("%Y-%m-%d") == "2025-08-28"
+    assert incremental_start_date(today, None, years=5, overlap_days=2).strftime("%Y-%m-%d") == "2020-09-01"
+    assert incremental_start_date(today, "2019-01-01T00:00Z", years=5, overlap_days=2).strftime("%Y-%m-%d") == "2020-09-01"
+
+def test_compute_content_hash_is_stable_for_identical_parquet():
+    test_dataframe = pl.DataFrame({'column1': [1, 2, 3]})
+    first_buffer = convert_dataframe_to_parquet(test_dataframe)
+    second_buffer = convert_dataframe_to_parquet(test_dataframe)
+    changed_buffer = convert_dataframe_to_parquet(test_dataframe.with_columns(pl.col('column1') + 1))
+
+    assert compute_content_hash(first_buffer) == compute_content_hash(second_buffer)
+    assert compute_content_hash(first_buffer) != compute_content_hash(changed_buffer)
+    assert first_buffer.tell() == 0
+
+def test_table_name_from_file():
+    assert table_name_from_file("nasa_donki.parquet") == "NASA_DONKI"
+    assert table_name_from_file("gs://bucket/RAW_DATA/astronauts.parquet") == "ASTRONAUTS"
+
+def test_normalize_to_schema_fills_missing_and_keeps_unexpected_columns():
+    schema = {"a": pl.Int64, "b": pl.Utf8}
+    dataframe = pl.DataFrame({"a": ["1", "2"], "extra": [True, False]})
+    assert detect_schema_drift(dataframe.columns, schema) == {"missing_columns": ["b"], "unexpected_columns": ["extra"]}
+
+    result = normalize_to_schema(dataframe, schema, "TEST")
+    assert result.columns == ["a", "b", "extra"]
+    assert result.schema == {"a": pl.Int64, "b": pl.Utf8, "extra": pl.Boolean}
+    assert result["b"].null_count() == 2
+
+def test_stream_csv_to_parquet_writes_typed_row_groups():
+    csv_stream = io.BytesIO(b"pl_name,sy_dist,ignored\n" + b"".join(f"p{i},{i}.5,x\n".encode() for i in range(1000)) + b"last,,x\n")
+    output_file = io.BytesIO()
+
+    row_count = stream_csv_to_parquet(csv_stream, {"pl_name": pa.string(), "sy_dist": pa.float64()}, output_file, block_size=4096)
+
+    parquet_file = pq.ParquetFile(output_file)
+    assert row_count == 1001
+    assert parquet_file.metadata.num_row_groups > 1
+    table = parquet_file.read()
+    assert table.schema.names == ["pl_name", "sy_dist"]
+    assert table.column("sy_dist").type == pa.float64()
+    assert table.column("sy_dist")[-1].as_py() is None
+
+def test_snapshots_to_expire_keeps_latest_count_and_recent_days():
+    now = datetime(2026, 10, 18, tzinfo=timezone.utc)
+    snapshots = [(snapshot_id, now - timedelta(days=20 - snapshot_id)) for snapshot_id in range(1, 21)]
+
+    # snapshots 13-20 are at most 7 days old, 18-20 are the latest three
+    assert snapshots_to_expire(snapshots, keep_count=3, keep_days=7, now=now) == list(range(1, 13))
+    # the latest snapshots are kept even when all of them are old
+    assert snapshots_to_expire(snapshots, keep_count=3, keep_days=7, now=now + timedelta(days=30)) == list(range(1, 18))
+    assert snapshots_to_expire(snapshots, keep_count=25, keep_days=0, now=now) == []
+
+def test_raw_file_loads_number_records_and_check_schemas(tmp_path):
+    con = duckdb.connect()
+    con.execute("ATTACH ':memory:' AS my_ducklake")
+    con.execute("USE my_ducklake")
+    con.execute("CREATE SCHEMA RAW_DATA")
+    first_file = str(tmp_path / "exoplanets.parquet")
+    update_file = str(tmp_path / "exoplanets_update.parquet")
+    bad_file = str(tmp_path / "exoplanets_bad.parquet")
+    con.execute(f"COPY (SELECT 'p' || i AS pl_name, i AS rowupdate FROM range(5) t(i)) TO '{first_file}'")
+    con.execute(f"COPY (SELECT 'p' || i AS pl_name, i * 10 AS rowupdate FROM range(3, 7) t(i)) TO '{update_file}'")
+    con.execute(f"COPY (SELECT 'p1' AS pl_name, 'late' AS rowupdate, 1 AS _record_id) TO '{bad_file}'")
+
+    assert replace_table_from_parquet_file(con, first_file, "exoplanets", "RAW_DATA.NASA_EXOPLANETS") == 5
+    assert upsert_parquet_file(con, update_file, "exoplanets_update", "RAW_DATA.NASA_EXOPLANETS", {"merge_key": "pl_name"}) == 4
+    rows = con.execute("SELECT pl_name, rowupdate, _record_id FROM RAW_DATA.NASA_EXOPLANETS ORDER BY _record_id").fetchall()
+    assert rows == [("p0", 0, 1), ("p1", 1, 2), ("p2", 2, 3), ("p3", 30, 4), ("p4", 40, 5), ("p5", 50, 6), ("p6", 60, 7)]
+
+    load_plan = [
+        {"file_path": update_file, "table_name": "NASA_EXOPLANETS", "mode": "merge"},
+        {"file_path": bad_file, "table_name": "NASA_EXOPLANETS", "mode": "merge"}
+    ]
+    with pytest.raises(ValueError) as error:
+        check_raw_file_schemas(con, load_plan, "RAW_DATA")
+    assert "reserved columns ['_record_id']" in str(error.value)
+    assert "column rowupdate is VARCHAR" in str(error.value)
+    check_raw_file_schemas(con, load_plan[:1], "RAW_DATA")
+    assert load_plan[0]["new_columns"] == {}
+
+    drift_file = str(tmp_path / "exoplanets_drift.parquet")
+    con.execute(f"COPY (SELECT 'p9' AS pl_name, 9::BIGINT AS rowupdate, 'Transit' AS discoverymethod) TO '{drift_file}'")
+    drift_plan = [{"file_path": drift_file, "table_name": "NASA_EXOPLANETS", "mode": "merge"}]
+    check_raw_file_schemas(con, drift_plan, "RAW_DATA")
+    assert drift_plan[0]["new_columns"] == {"discoverymethod": "VARCHAR"}
+
+def test_record_watermarks_keeps_stored_values_for_skipped_tables(monkeypatch):
+    import src.utils as utils
+    state = {"watermarks": {"NASA_DONKI": "2024-01-01T00:00Z", "NASA_EXOPLANETS": "2024-01-01"}}
+    monkeypatch.setattr(utils, "read_pipeline_state", lambda name, default=None: dict(state.get(name, default)))
+    monkeypatch.setattr(utils, "write_pipeline_state", lambda name, value: state.__setitem__(name, value))
+    con = duckdb.connect()
+    con.execute("ATTACH ':memory:' AS my_ducklake")
+    con.execute("USE my_ducklake")
+    con.execute("CREATE SCHEMA RAW_DATA")
+    con.execute("CREATE TABLE RAW_DATA.NASA_DONKI AS SELECT '2024-02-01T00:00Z' AS messageIssueTime")
+    con.execute("CREATE TABLE RAW_DATA.NASA_EXOPLANETS AS SELECT '2024-03-01' AS rowupdate")
+    # NASA_EXOPLANETS failed to ingest, so only NASA_DONKI moves forward
+    record_watermarks(con, tables=["NASA_DONKI"])
+    assert state["watermarks"] == {"NASA_DONKI": "2024-02-01T00:00Z", "NASA_EXOPLANETS": "2024-01-01"}
+
+def test_full_astronaut_record_matches_the_declared_schema():
+    record = {
+        "id": 276, "url": "https://ll.thespacedevs.com/2.3.0/astronauts/276/", "name": "Sunita Williams",
+        "status": {"id": 1, "name": "Active"}, "type": {"id": 2, "name": "Government"}, "in_space": True,
+        "time_in_space": "P608DT19H", "eva_time": "PT62H6M", "age": 60, "date_of_birth": "1965-09-19",
+        "date_of_death": None, "nationality": [{"id": 1, "name": "United States"}], "bio": "bio",
+        "wiki": "https://en.wikipedia.org/wiki/Sunita_Williams", "last_flight": "2024-06-05T14:52:15Z",
+        "first_flight": "2006-12-10T01:47:35Z", "social_media_links": [], "response_mode": "normal",
+        "flights_count": 3, "landings_count": 2, "spacewalks_count": 9,
+        "agency": {"name": "National Aeronautics and Space Administration", "abbrev": "NASA"},
+        "image": {"image_url": "https://example.com/a.jpg", "thumbnail_url": "https://example.com/t.jpg"}
+    }
+    dataframe = preprocess_astronaut_data(pl.DataFrame([record]))
+
+    # only the duration columns derived after normalization go beyond the declared schema
+    assert detect_schema_drift(dataframe.columns, SOURCE_SCHEMAS["ASTRONAUTS"])["unexpected_columns"] == [
+        "time_in_space_seconds", "eva_time_seconds", "time_in_space_human_readable", "eva_time_human_readable"
+    ]
+    assert dataframe["id"].to_list() == [276]
+    # nested fields are kept as fetched
+    assert dataframe["status"].struct.field("name").to_list() == ["Active"]